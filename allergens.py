@@ -0,0 +1,151 @@
+"""Allergen matching over normalized ingredient words, with a small local ontology.
+
+    ingredient_allergens("1 cup Greek yogurt")        # DAIRY
+    ingredient_allergens("1/2 tsp nutmeg")            # 0: nutmeg is not a nut
+    allergy_bits("nuts")                              # PEANUT | TREE_NUT
+    recipe_matches(recipe["ingredients"], "dairy")    # True if any ingredient is dairy
+
+An ingredient line is lowercased and split into words, and each word is
+folded to its singular ("berries" -> "berry"). Known phrases are then
+matched longest first, so "almond milk" is a tree nut and not dairy,
+"peanut butter" is a peanut and not dairy, and "eggplant" is not an egg.
+Modifiers such as "dairy-free" or "vegan" clear those allergens for their
+whole line. The result is a bitmask with one bit per entry of
+ALLERGENS.
+
+An allergy is either one of the ALLERGY_GROUPS ("dairy", "nuts", "gluten",
+"seafood", ...), which stands for its allergens, or any other word or
+phrase ("strawberries", "cheddar"), which matches ingredient lines that
+contain it as whole words. RecipeIndex computes a mask per recipe at load
+time, so excluding a group is a bitwise AND.
+"""
+import re
+
+from normalize import singular
+
+ALLERGENS = ["dairy", "egg", "peanut", "tree_nut", "wheat", "gluten", "soy", "fish", "shellfish", "sesame"]
+(DAIRY, EGG, PEANUT, TREE_NUT, WHEAT, GLUTEN, SOY, FISH, SHELLFISH, SESAME) = (1 << i for i in range(len(ALLERGENS)))
+
+# Ingredient words and phrases and the allergens they carry; 0 marks look-alikes that carry none
+TERMS = {
+    DAIRY: ["milk", "cheese", "yogurt", "yoghurt", "butter", "buttermilk", "cream", "sour cream", "whey", "casein",
+            "ghee", "kefir", "curd", "custard", "feta", "parmesan", "mozzarella", "cheddar", "ricotta",
+            "mascarpone", "brie", "gouda", "paneer", "halloumi", "quark", "skyr", "creme fraiche", "ice cream",
+            "lactose", "dairy"],
+    EGG: ["egg", "egg white", "egg yolk", "mayonnaise", "mayo", "aioli", "meringue"],
+    PEANUT: ["peanut", "groundnut", "peanut butter", "peanut oil"],
+    TREE_NUT: ["almond", "walnut", "cashew", "pecan", "pistachio", "hazelnut", "macadamia", "brazil nut",
+               "pine nut", "chestnut", "praline", "marzipan", "almond milk", "almond butter", "almond flour",
+               "cashew milk", "hazelnut milk"],
+    TREE_NUT | PEANUT: ["nut", "mixed nut", "nut butter"],
+    WHEAT | GLUTEN: ["wheat", "flour", "bread", "breadcrumb", "crouton", "pasta", "spaghetti", "noodle",
+                     "couscous", "semolina", "bulgur", "spelt", "farro", "seitan", "tortilla", "pita", "naan",
+                     "cracker", "bagel", "wheat flour", "whole wheat", "wrap"],
+    GLUTEN: ["barley", "rye", "malt", "beer"],
+    SOY: ["soy", "soya", "soybean", "tofu", "tempeh", "edamame", "miso", "tamari", "soy milk"],
+    SOY | WHEAT | GLUTEN: ["soy sauce"],
+    FISH: ["fish", "salmon", "tuna", "cod", "anchovy", "sardine", "trout", "mackerel", "halibut", "tilapia",
+           "haddock", "herring", "fish sauce", "worcestershire"],
+    SHELLFISH: ["shellfish", "shrimp", "prawn", "crab", "lobster", "crayfish", "clam", "mussel", "oyster",
+                "scallop", "squid", "calamari"],
+    SESAME: ["sesame", "tahini", "hummus"],
+    TREE_NUT | DAIRY: ["pesto", "nutella"],
+    0: ["water chestnut", "coconut milk", "coconut cream", "coconut flour", "oat milk", "rice milk", "cocoa butter",
+        "shea butter", "cream of tartar", "egg plant", "rice noodle", "corn tortilla", "rice flour", "chickpea flour",
+        "buckwheat flour", "oat flour", "corn flour", "potato flour"],
+}
+
+# Words that clear allergens for their whole ingredient line
+MODIFIERS = {"vegan": DAIRY | EGG | FISH | SHELLFISH}
+
+# Allergies that stand for allergen groups rather than a single word
+ALLERGY_GROUPS = {
+    "dairy": DAIRY, "milk": DAIRY, "lactose": DAIRY,
+    "egg": EGG,
+    "peanut": PEANUT,
+    "nut": PEANUT | TREE_NUT, "tree nut": TREE_NUT,
+    "wheat": WHEAT,
+    "gluten": GLUTEN, "celiac": GLUTEN, "coeliac": GLUTEN,
+    "soy": SOY, "soya": SOY,
+    "fish": FISH,
+    "shellfish": SHELLFISH, "crustacean": SHELLFISH,
+    "seafood": FISH | SHELLFISH,
+    "sesame": SESAME,
+}
+# "dairy-free", "nut free", "non-dairy", ... clear what their group stands for
+for _word, _bits in ALLERGY_GROUPS.items():
+    MODIFIERS.setdefault(f"{_word} free", _bits | (WHEAT if _bits & GLUTEN else 0))
+    MODIFIERS.setdefault(f"non {_word}", _bits)
+
+WORD = re.compile(r"[a-z]+")
+
+
+def words(text):
+    """Lowercased singular words of a text ("Greek Yogurts, plain" -> ["greek", "yogurt", "plain"])"""
+    return [singular(word) for word in WORD.findall(text.lower())]
+
+
+def _phrases(table):
+    """First word -> [(words, value)], longest phrase first"""
+    phrases = {}
+    for text, value in table:
+        key = tuple(words(text))
+        phrases.setdefault(key[0], []).append((key, value))
+    for candidates in phrases.values():
+        candidates.sort(key=lambda candidate: -len(candidate[0]))
+    return phrases
+
+
+TERM_PHRASES = _phrases((term, bits) for bits, terms in TERMS.items() for term in terms)
+MODIFIER_PHRASES = _phrases(MODIFIERS.items())
+
+
+def _match(tokens, i, phrases):
+    for key, value in phrases.get(tokens[i], ()):
+        if tuple(tokens[i:i + len(key)]) == key:
+            return key, value
+    return None, None
+
+
+def ingredient_allergens(line):
+    """Allergen bitmask of one ingredient line"""
+    tokens = words(line)
+    bits = cleared = 0
+    i = 0
+    while i < len(tokens):
+        key, value = _match(tokens, i, MODIFIER_PHRASES)
+        if key is not None:
+            cleared |= value
+            i += len(key)
+            continue
+        key, value = _match(tokens, i, TERM_PHRASES)
+        if key is not None:
+            bits |= value
+            i += len(key)
+        else:
+            i += 1
+    return bits & ~cleared
+
+
+def allergy_bits(allergy):
+    """Allergen bitmask an allergy stands for, or 0 if it is a plain word to look for"""
+    return ALLERGY_GROUPS.get(" ".join(words(allergy)), 0)
+
+
+def contains_words(line, allergy):
+    """Whether an ingredient line holds an allergy's words, in order, as whole words"""
+    key, tokens = words(allergy), words(line)
+    return bool(key) and any(tokens[i:i + len(key)] == key for i in range(len(tokens) - len(key) + 1))
+
+
+def recipe_matches(ingredients, allergy):
+    """Whether any ingredient line of a recipe triggers an allergy; the slow path RecipeIndex precomputes"""
+    bits = allergy_bits(allergy)
+    if bits:
+        return any(ingredient_allergens(line) & bits for line in ingredients)
+    return any(contains_words(line, allergy) for line in ingredients)
+
+
+def parse_allergies(text):
+    """Allergies from a free-text answer: "nuts,dairy; shellfish and eggs" -> ["nuts", "dairy", "shellfish", "eggs"]"""
+    return [item.strip() for item in re.split(r"\s*[,;/]\s*|\s+and\s+|\s+&\s+", text.strip()) if item.strip()]
@@ -0,0 +1,81 @@
+"""Allergy exclusion with RecipeIndex's precomputed allergen masks against per-recipe matching.
+
+Builds a RecipeIndex over --recipes recipes (the bundled ones plus
+synthetic ones) and, per allergy, times excluding it with
+RecipeIndex.filter (first lookup and remembered) against the same
+matching done recipe by recipe, and against the substring test the app
+used before (`allergy in ingredient.lower()`). Every filter is checked
+against the per-recipe result; "changed" counts the recipes whose verdict
+differs from the substring test's. The matching itself, look-alikes such
+as nutmeg and eggplant included, is tested in tests/test_allergens.py.
+Run from the repository root:
+
+    python -m benchmarks.bench_allergens [--recipes 100000] [--repeat 20]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from allergens import ingredient_allergens, recipe_matches
+from nutribot_engine import load_recipes
+from recipe_index import RecipeIndex
+from benchmarks.synthetic import synthetic_recipes
+
+ALLERGIES = ["nuts", "dairy", "eggs", "gluten", "shellfish", "honey", "sweet potato"]
+
+
+def timed(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return np.median(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--recipes", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    recipes = load_recipes() + synthetic_recipes(max(args.recipes - len(load_recipes()), 0))
+    lines = {ingredient for recipe in recipes for ingredient in recipe["ingredients"]}
+    start = time.perf_counter()
+    for line in lines:
+        ingredient_allergens(line)
+    normalize = time.perf_counter() - start
+    start = time.perf_counter()
+    index = RecipeIndex(recipes)
+    built = time.perf_counter() - start
+    print(f"{len(recipes)} recipes, {len(lines)} distinct ingredient lines normalized at "
+          f"{len(lines) / normalize:,.0f} lines/s; RecipeIndex {built:.2f} s; median of {args.repeat}")
+    print(f"{'allergy':<14} {'excluded':>9} {'changed':>8} {'first':>9} {'index':>9} {'per recipe':>11} "
+          f"{'substring':>10}")
+    for allergy in ALLERGIES:
+        expected = [i for i, recipe in enumerate(recipes) if recipe_matches(recipe["ingredients"], allergy)]
+        substring = [i for i, recipe in enumerate(recipes)
+                     if any(allergy in ingredient.lower() for ingredient in recipe["ingredients"])]
+        kept = index.filter(allergies=[allergy])
+        assert index.ids(index.all & ~kept) == expected, allergy
+        changed = len(set(expected) ^ set(substring))
+
+        def first():
+            index._with_allergy.clear()
+            index.filter(allergies=[allergy])
+
+        cold = timed(first, args.repeat)
+        warm = timed(lambda: index.filter(allergies=[allergy]), args.repeat)
+        slow = max(args.repeat // 10, 1)
+        per_recipe = timed(lambda: [recipe for recipe in recipes
+                                    if not recipe_matches(recipe["ingredients"], allergy)], slow)
+        plain = timed(lambda: [recipe for recipe in recipes
+                               if not any(allergy in ingredient.lower() for ingredient in recipe["ingredients"])],
+                      slow)
+        print(f"{allergy:<14} {len(expected):>9} {changed:>8} {cold:>7.2f}ms {warm:>7.3f}ms {per_recipe:>9.1f}ms "
+              f"{plain:>8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
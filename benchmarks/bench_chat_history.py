@@ -0,0 +1,96 @@
+"""Rerun time and session memory of the chat transcript at different lengths.
+
+Compares the original render loop, which kept every message in a list and
+redrew all of them on each Streamlit rerun, with ChatHistory, which redraws
+only the live window and keeps older messages in compressed pages. Reruns
+are timed through streamlit.testing. Run from the repository root:
+
+    python -m benchmarks.bench_chat_history [--sizes 10 1000 10000] [--reruns 5]
+"""
+import argparse
+import random
+import time
+import tracemalloc
+
+from streamlit.testing.v1 import AppTest
+
+from chat_history import ChatHistory
+from benchmarks.synthetic import QUERIES
+
+
+def render_list():
+    import streamlit as st
+    for message in st.session_state.chat_history:
+        with st.chat_message(message["role"]):
+            st.markdown(message["content"])
+
+
+def render_paged():
+    import streamlit as st
+    history = st.session_state.chat_history
+    earlier_shown = min(st.session_state.earlier_shown, history.earlier_count)
+    if history.earlier_count > earlier_shown:
+        st.button(f"Load earlier messages ({history.earlier_count - earlier_shown} more)")
+    for message in history.earlier(earlier_shown) + history.live:
+        with st.chat_message(message["role"]):
+            st.markdown(message["content"])
+
+
+def synthetic_messages(n, seed=0):
+    rng = random.Random(seed)
+    messages = []
+    for i in range(n):
+        if i % 2 == 0:
+            messages.append({"role": "user", "content": rng.choice(QUERIES)})
+        else:
+            # Replies are a few hundred characters of markdown, like the app's
+            lines = [f"- {rng.choice(QUERIES)}: {rng.randint(50, 900)} calories" for _ in range(rng.randint(3, 12))]
+            messages.append({"role": "assistant", "content": "Here's what I found:\n\n" + "\n".join(lines)})
+    return messages
+
+
+def build(kind, messages):
+    tracemalloc.start()
+    if kind == "list":
+        history = [dict(message) for message in messages]
+    else:
+        history = ChatHistory()
+        for message in messages:
+            history.append(dict(message))
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return history, size
+
+
+def rerun_seconds(render, history, reruns):
+    app = AppTest.from_function(render, default_timeout=120)
+    app.session_state["chat_history"] = history
+    app.session_state["earlier_shown"] = 0
+    app.run()
+    assert not app.exception, app.exception
+    start = time.perf_counter()
+    for _ in range(reruns):
+        app.run()
+    return (time.perf_counter() - start) / reruns
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 10_000])
+    parser.add_argument("--reruns", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'messages':>9} {'store':>7} {'memory KB':>10} {'rerun ms':>9}")
+    for n in args.sizes:
+        messages = synthetic_messages(n)
+        for kind, render in (("list", render_list), ("paged", render_paged)):
+            history, size = build(kind, messages)
+            if kind == "paged":
+                assert list(history) == messages
+                assert history.earlier(len(messages)) + history.live == messages
+            seconds = rerun_seconds(render, history, args.reruns)
+            print(f"{n:>9} {kind:>7} {size / 1024:>10.1f} {seconds * 1000:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
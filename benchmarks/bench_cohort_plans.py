@@ -0,0 +1,78 @@
+"""Profiles per second of cohort meal planning, per profile and grouped, from 1 to N worker processes.
+
+Builds an engine over --recipes synthetic recipes and a cohort of
+--profiles profiles drawn from the goal, preference and allergy
+combinations of synthetic.PROFILES. The baseline plans each profile with
+its own generate_meal_plan call, as the chat does; the cohort runs use
+cohort_plans.plan_cohort, which filters recipes once per group, with 1 to
+--max-workers processes (default: one per CPU). Every run has to produce
+exactly the output of the single-process one. On a machine with one CPU,
+extra workers can only add overhead. Run from the repository root:
+
+    python -m benchmarks.bench_cohort_plans [--profiles 20000] [--recipes 10000] [--optimize]
+"""
+import argparse
+import json
+import os
+import random
+import time
+
+from cohort_plans import plan_cohort, profile_seed
+from nutribot_engine import NutriBot, UserProfile, load_recipes
+from benchmarks.synthetic import PROFILES, synthetic_recipes
+
+
+def cohort(n, seed=0):
+    rng = random.Random(seed)
+    profiles = []
+    for i in range(n):
+        spec = rng.choice(PROFILES)
+        profiles.append((f"p{i}", UserProfile(goal=spec["goal"], dietary_preferences=list(spec["preferences"]),
+                                              allergies=list(spec["allergies"]))))
+    return profiles
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profiles", type=int, default=20_000)
+    parser.add_argument("--recipes", type=int, default=10_000)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--optimize", action="store_true", help="plan with the meal optimizer (use fewer --profiles)")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    bot = NutriBot(recipes=load_recipes() + synthetic_recipes(max(args.recipes - len(load_recipes()), 0)))
+    bot.recipe_index
+    if args.optimize:
+        bot.meal_optimizer
+    profiles = cohort(args.profiles, args.seed)
+    print(f"{len(profiles)} profiles, {len(PROFILES)} distinct groups, {len(bot.recipes)} recipes, "
+          f"{args.days} days, optimize={args.optimize}, {os.cpu_count()} CPU(s)")
+
+    start = time.perf_counter()
+    expected = {}
+    for profile_id, profile in profiles:
+        plan = bot.generate_meal_plan(profile.goal, profile.dietary_preferences, profile.allergies, args.days,
+                                      args.optimize, seed=profile_seed(args.seed, profile_id))
+        expected[profile_id] = json.dumps({"id": profile_id, "plan": plan})
+    elapsed = time.perf_counter() - start
+    print(f"{'per profile':<16} {elapsed:8.2f} s {len(profiles) / elapsed:>10,.0f} profiles/s")
+
+    single = None
+    for workers in range(1, args.max_workers + 1):
+        start = time.perf_counter()
+        lines = list(plan_cohort(profiles, bot, args.days, args.optimize, args.seed, workers))
+        elapsed = time.perf_counter() - start
+        if single is None:
+            single = elapsed
+            # Grouping reorders the plans but must not change any of them
+            assert sorted(lines) == sorted(expected.values())
+            reference = lines
+        assert lines == reference, f"{workers} workers changed the output"
+        print(f"{f'{workers} worker(s)':<16} {elapsed:8.2f} s {len(profiles) / elapsed:>10,.0f} profiles/s "
+              f"{single / elapsed:6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
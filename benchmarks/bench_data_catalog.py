@@ -0,0 +1,155 @@
+"""Data reload time per changed dataset against a full engine rebuild, and request latency while reloads run.
+
+Writes the bundled datasets, with --recipes recipes (the bundled ones plus
+synthetic ones), to a temporary data directory and serves them through a
+DataCatalog whose engine has built every index the app warms up. Each
+dataset's file is then rewritten in turn and DataCatalog.reload timed:
+only the indexes that depend on it are rebuilt. The baseline is a fresh
+engine over all four files, built and warmed the same way, which is what
+a restart costs. Then a thread answers chat messages in a loop, once while
+nothing changes and once while the recipes are reloaded over and over,
+and reports its latencies. Before timing, it checks that reloads share
+the unchanged indexes, that they drop cached replies only when those
+could change, that a broken file keeps the current snapshot, and that a
+request keeps the snapshot it started on. Run from the repository root:
+
+    python -m benchmarks.bench_data_catalog [--recipes 20000] [--reloads 5]
+"""
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from data_catalog import DATASETS, DataCatalog
+from nutribot_engine import UserProfile, load_recipes
+from response_cache import ResponseCache
+from benchmarks.synthetic import synthetic_recipes
+
+QUERIES = ["how many calories in an apple", "what is protein", "give me a vegan recipe",
+           "browse vegan recipes by most protein", "what helps my bones"]
+
+
+def write_json(path, data):
+    # Written aside and renamed into place, as a deploy should, so a reload never reads half a file
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(path + ".tmp", path)
+
+
+def warm(engine):
+    """Build what the app builds before serving"""
+    engine.recipe_nutrients, engine.semantic_index, engine.recipe_browser, engine.fuzzy_index
+
+
+def check(directory, data):
+    catalog = DataCatalog.from_directory(directory, response_cache=ResponseCache())
+    profile = UserProfile(goal="Weight Loss")
+    warm(catalog.engine)
+    old = catalog.engine
+    assert old.respond("what is protein", profile).startswith("**Protein**: Essential")
+
+    facts = dict(data["nutrition_facts"], protein="Reloaded protein fact.")
+    write_json(os.path.join(directory, "nutrition_facts.json"), facts)
+    assert catalog.reload() == ["nutrition_facts"] and catalog.version == 2
+    new = catalog.engine
+    assert new is not old and new.recipe_index is old.recipe_index and new.recipe_browser is old.recipe_browser
+    assert new.semantic_index is not old.semantic_index and new.response_cache is not old.response_cache
+    assert "semantic_index" in new.__dict__, "indexes the old snapshot had built are rebuilt before the swap"
+    assert new.respond("what is protein", profile) == "**Protein**: Reloaded protein fact."
+    # A request that started before the swap finishes on its own snapshot
+    assert old.respond("what is protein", profile).startswith("**Protein**: Essential")
+
+    write_json(os.path.join(directory, "meal_plans.json"), data["meal_plans"])
+    assert catalog.reload() == ["meal_plans"] and catalog.engine.response_cache is new.response_cache
+    assert catalog.reload() == []
+
+    with open(os.path.join(directory, "recipes.json"), "w", encoding="utf-8") as f:
+        f.write('[{"name": "half written')
+    try:
+        catalog.reload()
+        raise AssertionError("a broken file must not load")
+    except ValueError:
+        pass
+    assert catalog.version == 3 and catalog.errors == 1
+    write_json(os.path.join(directory, "recipes.json"), data["recipes"])
+    os.remove(os.path.join(directory, "nutrition_facts.json"))
+    assert sorted(catalog.reload()) == ["nutrition_facts", "recipes"] and catalog.version == 4
+    assert catalog.engine.respond("what is protein", profile).startswith("**Protein**: Essential")
+    write_json(os.path.join(directory, "nutrition_facts.json"), data["nutrition_facts"])
+    catalog.reload()
+
+
+def latencies(catalog, stop, profile):
+    samples = []
+    i = 0
+    while not stop.is_set():
+        engine = catalog.engine
+        start = time.perf_counter()
+        engine.respond(QUERIES[i % len(QUERIES)], profile)
+        samples.append(time.perf_counter() - start)
+        i += 1
+    return samples
+
+
+def serve_while(catalog, profile, action):
+    stop, result = threading.Event(), []
+    thread = threading.Thread(target=lambda: result.extend(latencies(catalog, stop, profile)))
+    thread.start()
+    action()
+    stop.set()
+    thread.join()
+    samples = np.array(result) * 1000
+    return len(samples), np.median(samples), np.percentile(samples, 99), samples.max()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--recipes", type=int, default=20_000)
+    parser.add_argument("--reloads", type=int, default=5)
+    args = parser.parse_args()
+
+    data = {name: load() for name, (_, load) in DATASETS.items()}
+    data["recipes"] = load_recipes() + synthetic_recipes(max(args.recipes - len(load_recipes()), 0))
+    with tempfile.TemporaryDirectory() as directory:
+        for name, (filename, _) in DATASETS.items():
+            write_json(os.path.join(directory, filename), data[name])
+        check(directory, data)
+
+        start = time.perf_counter()
+        catalog = DataCatalog.from_directory(directory, response_cache=ResponseCache(max_bytes=0))
+        warm(catalog.engine)
+        restart = time.perf_counter() - start
+        print(f"{len(data['recipes'])} recipes; full rebuild (restart) {restart * 1000:.0f} ms")
+        print(f"{'changed file':<22} {'reload':>10} {'vs restart':>11}")
+        for name, (filename, _) in DATASETS.items():
+            times = []
+            for _ in range(args.reloads):
+                write_json(os.path.join(directory, filename), data[name])
+                start = time.perf_counter()
+                assert catalog.reload() == [name]
+                times.append(time.perf_counter() - start)
+            reload = np.median(times)
+            print(f"{filename:<22} {reload * 1000:>7.1f} ms {restart / reload:>10.1f}x")
+
+        profile = UserProfile(goal="Muscle Gain", allergies=["nuts"])
+        recipes_path = os.path.join(directory, "recipes.json")
+
+        def reload_recipes():
+            for _ in range(args.reloads):
+                write_json(recipes_path, data["recipes"])
+                catalog.reload()
+
+        idle = serve_while(catalog, profile, lambda: time.sleep(max(restart, 0.5) * args.reloads))
+        busy = serve_while(catalog, profile, reload_recipes)
+        print(f"\n{'requests':<24} {'count':>7} {'p50':>9} {'p99':>9} {'max':>9}")
+        for name, (count, p50, p99, worst) in (("no reloads", idle), ("recipes reloading", busy)):
+            print(f"{name:<24} {count:>7} {p50:>6.2f} ms {p99:>6.2f} ms {worst:>6.1f} ms")
+        print(f"snapshot version {catalog.version}, {catalog.reloads} reloads")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""Import cost of the headless engine and batch throughput of NutriBot.respond_many.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_engine [--batch 10000]
+"""
+import argparse
+import subprocess
+import sys
+import time
+
+from nutribot_engine import NutriBot, UserProfile
+from benchmarks.synthetic import QUERIES
+
+IMPORT_PROBE = "import time; t = time.perf_counter(); import nutribot_engine; print(time.perf_counter() - t)"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch", type=int, default=10_000)
+    args = parser.parse_args()
+
+    imports = [float(subprocess.run([sys.executable, "-c", IMPORT_PROBE], check=True, capture_output=True,
+                                    text=True).stdout) for _ in range(5)]
+    start = time.perf_counter()
+    bot = NutriBot()
+    construct = time.perf_counter() - start
+
+    profiles = [UserProfile(goal="Weight Loss"), UserProfile(goal="Muscle Gain", dietary_preferences=["keto"])]
+    queries = [QUERIES[i % len(QUERIES)] for i in range(args.batch)]
+    batch_profiles = [profiles[i % len(profiles)] for i in range(args.batch)]
+    bot.respond_many(queries[:len(QUERIES)], batch_profiles[:len(QUERIES)])  # warm the lazy indexes
+
+    start = time.perf_counter()
+    bot.respond_many(queries, batch_profiles)
+    elapsed = time.perf_counter() - start
+
+    print(f"import nutribot_engine: {min(imports) * 1000:.1f} ms (best of 5, fresh interpreter)")
+    print(f"NutriBot(): {construct * 1000:.1f} ms")
+    print(f"respond_many({args.batch}): {elapsed * 1000:.1f} ms, {args.batch / elapsed:,.0f} queries/s, "
+          f"cache hit ratio {bot.response_cache.stats()['hit_ratio']:.1%}")
+
+
+if __name__ == "__main__":
+    main()
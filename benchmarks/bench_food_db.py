@@ -0,0 +1,108 @@
+"""Cold start time and per-worker memory: memory-mapped FoodDatabase vs in-memory dicts.
+
+Each measurement runs in a fresh interpreter, the way a Streamlit worker
+starts. Besides opening the foods and looking names up, it times the whole
+engine start: opening the foods, building a NutriBot over them and
+answering a first food question, and reports the memory the worker holds
+after that. Run from the repository root:
+
+    python -m benchmarks.bench_food_db [--sizes 1000 100000 1000000]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from food_db import write_database
+from benchmarks.synthetic import synthetic_food_data
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORKER = """
+import json, sys, time
+def memory_kb():
+    # Resident and proportional set size; PSS splits shared mmap pages between processes
+    fields = {}
+    for path in ("/proc/self/status", "/proc/self/smaps_rollup"):
+        try:
+            with open(path) as f:
+                for line in f:
+                    if line.startswith(("VmRSS:", "Pss:")):
+                        key, value = line.split(":")
+                        fields[key] = int(value.split()[0])
+        except OSError:
+            pass
+    return fields.get("VmRSS", 0), fields.get("Pss", 0)
+
+mode, path = sys.argv[1], sys.argv[2]
+with open(sys.argv[3]) as f:
+    probes = json.load(f)
+import numpy, food_db, nutribot_engine  # import cost is paid by both modes in the app
+baseline_rss, baseline_pss = memory_kb()
+start = time.perf_counter()
+if mode == "dict":
+    with open(path) as f:
+        foods = json.load(f)
+else:
+    foods = food_db.FoodDatabase.open(path)
+opened = time.perf_counter() - start
+open_rss, _ = memory_kb()
+start = time.perf_counter()
+for name in probes:
+    foods[name]
+lookups = time.perf_counter() - start
+rss, pss = memory_kb()
+start = time.perf_counter()
+engine = nutribot_engine.NutriBot(food_data=foods)
+reply = engine.respond("how many calories in " + probes[-1], nutribot_engine.UserProfile())
+assert reply.startswith("**Nutritional information for " + probes[-1]), reply
+started = opened + time.perf_counter() - start
+engine_rss, engine_pss = memory_kb()
+print(json.dumps({"open_ms": opened * 1000, "lookup_us": lookups / len(probes) * 1e6,
+                  "open_rss_mb": (open_rss - baseline_rss) / 1024,
+                  "rss_mb": (rss - baseline_rss) / 1024, "pss_mb": (pss - baseline_pss) / 1024,
+                  "engine_ms": started * 1000, "engine_rss_mb": (engine_rss - baseline_rss) / 1024,
+                  "engine_pss_mb": (engine_pss - baseline_pss) / 1024}))
+"""
+
+
+def run_worker(mode, path, probes_path):
+    output = subprocess.run([sys.executable, "-c", WORKER, mode, path, probes_path],
+                            cwd=ROOT, check=True, capture_output=True, text=True).stdout
+    return json.loads(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    # +RSS/+PSS are measured after the probe lookups, which fault in pages spread over the whole file
+    # engine columns cover opening the foods, building a NutriBot and its first reply
+    print(f"{'rows':>9} {'mode':>5} {'file MB':>8} {'open ms':>9} {'open RSS MB':>12} {'lookup us':>10} "
+          f"{'+RSS MB':>8} {'+PSS MB':>8} {'engine ms':>10} {'engine RSS':>11} {'engine PSS':>11}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            foods = synthetic_food_data(size)
+            names = list(foods)
+            json_path = os.path.join(tmp, f"foods-{size}.json")
+            db_path = os.path.join(tmp, f"foods-{size}.nfdb")
+            with open(json_path, "w") as f:
+                json.dump(foods, f)
+            write_database(foods, db_path)
+            probes_path = os.path.join(tmp, f"probes-{size}.json")
+            with open(probes_path, "w") as f:
+                json.dump(names[::max(1, size // 1000)], f)
+
+            for mode, path in (("dict", json_path), ("mmap", db_path)):
+                result = run_worker(mode, path, probes_path)
+                print(f"{size:>9} {mode:>5} {os.path.getsize(path) / 2**20:>8.1f} {result['open_ms']:>9.2f} "
+                      f"{result['open_rss_mb']:>12.1f} {result['lookup_us']:>10.2f} "
+                      f"{result['rss_mb']:>8.1f} {result['pss_mb']:>8.1f} {result['engine_ms']:>10.1f} "
+                      f"{result['engine_rss_mb']:>11.1f} {result['engine_pss_mb']:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
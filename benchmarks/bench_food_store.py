@@ -0,0 +1,72 @@
+"""Memory per food and query latency of FoodStore against the dict-of-dicts loader layout.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_food_store [--sizes 1000 100000 1000000]
+"""
+import argparse
+import sys
+import time
+
+from food_store import FoodStore
+from benchmarks.synthetic import synthetic_food_data
+
+
+def deep_size(foods):
+    total = sys.getsizeof(foods)
+    for name, info in foods.items():
+        total += sys.getsizeof(name) + sys.getsizeof(info)
+        total += sum(sys.getsizeof(value) for value in info.values())
+    return total
+
+
+def store_size(store):
+    total = store.nbytes + sys.getsizeof(store.names) + sys.getsizeof(store.index)
+    total += sum(sys.getsizeof(name) for name in store.names)
+    return total
+
+
+def timed_ms(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def dict_top_protein_per_calorie(foods, category, n):
+    scored = [(name, info["protein"] / info["calories"]) for name, info in foods.items()
+              if info["category"] == category and info["calories"]]
+    scored.sort(key=lambda item: item[1], reverse=True)
+    return scored[:n]
+
+
+def dict_fiber_at_least(foods, grams):
+    return [name for name, info in foods.items() if info["fiber"] >= grams]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'rows':>9} {'dict B/food':>12} {'store B/food':>13} "
+          f"{'top-N dict ms':>14} {'top-N store ms':>15} {'fiber dict ms':>14} {'fiber store ms':>15}")
+    for size in args.sizes:
+        foods = synthetic_food_data(size)
+        store = FoodStore.from_dict(foods)
+
+        top_dict, expected = timed_ms(lambda: dict_top_protein_per_calorie(foods, "protein", 10), args.repeat)
+        top_store, actual = timed_ms(lambda: store.top("protein", 10, per="calories", category="protein"), args.repeat)
+        assert [name for name, _ in actual] == [name for name, _ in expected]
+
+        fiber_dict, expected = timed_ms(lambda: dict_fiber_at_least(foods, 5), args.repeat)
+        fiber_store, actual = timed_ms(lambda: store.select(minimum={"fiber": 5}), args.repeat)
+        assert actual == expected
+
+        print(f"{size:>9} {deep_size(foods) / size:>12.0f} {store_size(store) / size:>13.0f} "
+              f"{top_dict:>14.3f} {top_store:>15.3f} {fiber_dict:>14.3f} {fiber_store:>15.3f}")
+
+
+if __name__ == "__main__":
+    main()
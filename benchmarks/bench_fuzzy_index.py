@@ -0,0 +1,75 @@
+"""Recall and latency of the trigram FuzzyIndex on misspelled food names.
+
+Each probe takes a random key and applies one typo (a dropped, doubled,
+swapped or substituted letter, or a trailing "s"). Recall counts how often
+the original key comes back first or among the top five. The exact
+substring match the chat branches used before finds none of them. Run from
+the repository root:
+
+    python -m benchmarks.bench_fuzzy_index [--sizes 1000 500000] [--probes 2000]
+"""
+import argparse
+import random
+import string
+import time
+
+import numpy as np
+
+from fuzzy_index import DEFAULT_THRESHOLD, FuzzyIndex
+from benchmarks.bench_router import APP_FOOD_KEYS
+from benchmarks.synthetic import synthetic_food_data
+
+
+def misspell(word, rng):
+    letters = [i for i, ch in enumerate(word) if ch.isalpha()]
+    i = rng.choice(letters)
+    kind = rng.choice(["drop", "double", "swap", "substitute", "plural"])
+    if kind == "drop":
+        return word[:i] + word[i + 1:]
+    if kind == "double":
+        return word[:i] + word[i] + word[i:]
+    if kind == "swap" and i + 1 < len(word) and word[i + 1].isalpha():
+        return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+    if kind == "plural":
+        return word + "s"
+    return word[:i] + rng.choice(string.ascii_lowercase.replace(word[i], "")) + word[i + 1:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 500_000])
+    parser.add_argument("--probes", type=int, default=2000)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args()
+
+    base = dict.fromkeys(APP_FOOD_KEYS)
+    print(f"{'keys':>8} {'build s':>8} {'index MB':>9} {'top-1':>7} {'top-5':>7} "
+          f"{'p50 us':>7} {'p99 us':>7} {'max us':>8}")
+    for size in args.sizes:
+        keys = list(synthetic_food_data(size, base=base))
+        start = time.perf_counter()
+        index = FuzzyIndex(keys, threshold=args.threshold)
+        build = time.perf_counter() - start
+
+        rng = random.Random(1)
+        targets = [rng.choice(keys) for _ in range(args.probes)]
+        probes = [misspell(key, rng) for key in targets]
+        assert not any(probe in keys for probe in probes[:100] if probe not in targets[:100])
+
+        first = top5 = 0
+        latencies = []
+        for probe, target in zip(probes, targets):
+            start = time.perf_counter()
+            matches = index.lookup(probe)
+            latencies.append(time.perf_counter() - start)
+            found = [match.key for match in matches]
+            first += bool(found) and found[0] == target
+            top5 += target in found
+        latencies = np.array(latencies) * 1e6
+        print(f"{size:>8} {build:>8.2f} {index.nbytes / 2**20:>9.1f} {first / len(probes):>7.1%} "
+              f"{top5 / len(probes):>7.1%} {np.percentile(latencies, 50):>7.0f} "
+              f"{np.percentile(latencies, 99):>7.0f} {latencies.max():>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
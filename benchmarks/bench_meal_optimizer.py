@@ -0,0 +1,67 @@
+"""Solution quality vs time for MealPlanOptimizer, compared with random meal picks.
+
+Quality is the mean absolute relative deviation of each day's calories and
+macro grams from the plan targets (0% is a perfect match). Run from the
+repository root:
+
+    python -m benchmarks.bench_meal_optimizer [--recipes 50000] [--days 7]
+"""
+import argparse
+import random
+import time
+from itertools import cycle
+
+import numpy as np
+
+from meal_optimizer import MEAL_SLOTS, MealPlanOptimizer, daily_targets
+from nutribot_engine import load_food_data
+from recipe_index import RecipeIndex
+from recipe_nutrients import RecipeNutrients
+from benchmarks.synthetic import BASE_PLANS, PROFILES, synthetic_recipes
+
+
+def deviation(optimizer, plan, targets):
+    days = np.array([optimizer.nutrients[list(day)].sum(axis=0) for day in plan])
+    return float((np.abs(days - targets) / targets).mean() * 100)
+
+
+def random_plan(index, suitable, days, rng):
+    pools = [index.ids(suitable, meal_type) or index.ids(suitable) for meal_type in MEAL_SLOTS]
+    return [tuple(rng.choice(pool) for pool in pools) for _ in range(days)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--recipes", type=int, default=50_000)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--budgets", type=float, nargs="+", default=[0.0, 0.01, 0.05, 0.2])
+    args = parser.parse_args()
+
+    recipes = synthetic_recipes(args.recipes)
+    index = RecipeIndex(recipes)
+    optimizer = MealPlanOptimizer(index, RecipeNutrients(recipes, load_food_data()))
+    rng = random.Random(0)
+    cases = []
+    for profile, plan_key in zip(PROFILES, cycle(BASE_PLANS)):
+        suitable = index.filter(profile["preferences"], profile["allergies"])
+        if index.ids(suitable):
+            cases.append((suitable, daily_targets(BASE_PLANS[plan_key])))
+
+    baseline = np.mean([deviation(optimizer, random_plan(index, suitable, args.days, rng), targets)
+                        for suitable, targets in cases])
+    print(f"{args.recipes} recipes, {args.days}-day plans, {len(cases)} profiles")
+    print(f"{'mode':>14} {'mean ms':>8} {'max ms':>8} {'deviation':>10}")
+    print(f"{'random':>14} {'-':>8} {'-':>8} {baseline:>9.1f}%")
+    for budget in args.budgets:
+        timings, deviations = [], []
+        for seed, (suitable, targets) in enumerate(cases):
+            start = time.perf_counter()
+            plan = optimizer.plan(targets, suitable, args.days, time_budget=budget, seed=seed)
+            timings.append((time.perf_counter() - start) * 1000)
+            deviations.append(deviation(optimizer, plan, targets))
+        print(f"{f'budget {budget * 1000:.0f}ms':>14} {np.mean(timings):>8.1f} {max(timings):>8.1f} "
+              f"{np.mean(deviations):>9.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Overhead of the metrics instrumentation on NutriBot.respond_many.
+
+Replays the benchmark query mix with metrics disabled (the default), enabled,
+and enabled with the slow-request profiler sampling every request, and
+times a bare disabled timer on its own. Ends with an excerpt of the
+Prometheus export. Run from the repository root:
+
+    python -m benchmarks.bench_metrics [--batch 20000] [--repeats 5]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from metrics import Metrics, SlowRequestProfiler
+from nutribot_engine import NutriBot, UserProfile
+from benchmarks.synthetic import QUERIES
+
+
+def best_of(repeats, fn, *args):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(*args)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch", type=int, default=20_000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    metrics = Metrics()
+    bot = NutriBot(metrics=metrics)
+    profiles = [UserProfile(goal="Weight Loss"), UserProfile(goal="Muscle Gain", dietary_preferences=["keto"])]
+    queries = [QUERIES[i % len(QUERIES)] for i in range(args.batch)]
+    batch_profiles = [profiles[i % len(profiles)] for i in range(args.batch)]
+    bot.respond_many(queries[:len(QUERIES)], batch_profiles[:len(QUERIES)])  # warm the lazy indexes
+
+    disabled = best_of(args.repeats, bot.respond_many, queries, batch_profiles)
+    metrics.enabled = True
+    enabled = best_of(args.repeats, bot.respond_many, queries, batch_profiles)
+    requests = sum(h["count"] for h in metrics.to_json()["histograms"] if h["name"] == "nutribot_request_seconds")
+    assert requests == args.batch * args.repeats, requests
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # A zero threshold writes out every request, the worst case for the profiler
+        metrics.profiler = SlowRequestProfiler(os.path.join(tmp, "slow.folded"), threshold=0.0)
+        profiled = best_of(1, bot.respond_many, queries, batch_profiles)
+        metrics.profiler = None
+
+    off = Metrics()
+
+    def disabled_timers(n):
+        for _ in range(n):
+            with off.timer("nutribot_stage_seconds", stage="route"):
+                pass
+
+    null_timer = best_of(args.repeats, disabled_timers, 1_000_000) / 1_000_000
+
+    print(f"{'metrics disabled':<28} {args.batch / disabled:>10,.0f} queries/s")
+    print(f"{'metrics enabled':<28} {args.batch / enabled:>10,.0f} queries/s  ({enabled / disabled - 1:+.1%})")
+    print(f"{'enabled + profiler (every)':<28} {args.batch / profiled:>10,.0f} queries/s  "
+          f"({profiled / disabled - 1:+.1%})")
+    print(f"{'disabled timer':<28} {null_timer * 1e9:>10.0f} ns per with block")
+    print()
+    lines = metrics.to_prometheus().splitlines()
+    print("\n".join(line for line in lines if line.startswith("nutribot_stage_seconds_count")
+                    or line.startswith("nutribot_response_cache_total")))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Write throughput and read latency of ProfileStore with many users.
+
+Seeds a fresh database with one profile per user, then replays a stream of
+"Add a glass" clicks and profile saves spread over every user (popular
+users click more often). Batched throughput uses the background flusher; the
+baseline commits after every write, as a naive store would. Reads are timed
+from a cold store (empty cache) and after warming up, and once more while a
+writer thread keeps the store busy. Run from the repository root:
+
+    python -m benchmarks.bench_profile_store [--users 100000] [--writes 1000000]
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from nutribot_engine import UserProfile
+from profile_store import ProfileStore
+from benchmarks.synthetic import PROFILES
+
+
+def user_profile(i):
+    spec = PROFILES[i % len(PROFILES)]
+    return UserProfile(name=f"user {i}", goal=spec["goal"].title(), dietary_preferences=spec["preferences"],
+                       allergies=spec["allergies"], onboarded=True)
+
+
+def write_stream(users, writes, seed=0):
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) ** 0.8 for rank in range(users)]
+    picks = rng.choices(range(users), weights, k=writes)
+    return [(f"u{i}", rng.random() < 0.9) for i in picks]
+
+
+def replay(store, stream):
+    start = time.perf_counter()
+    for user_id, is_glass in stream:
+        if is_glass:
+            store.add_glass(user_id)
+        else:
+            store.save_profile(user_id, user_profile(int(user_id[1:])))
+    store.flush()
+    return time.perf_counter() - start
+
+
+def read_latencies(store, user_ids):
+    latencies = []
+    for user_id in user_ids:
+        start = time.perf_counter()
+        store.get_profile(user_id)
+        store.glasses(user_id)
+        latencies.append(time.perf_counter() - start)
+    return np.array(latencies) * 1e6
+
+
+def describe(latencies):
+    return f"p50 {np.percentile(latencies, 50):7.1f} us  p99 {np.percentile(latencies, 99):7.1f} us"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--writes", type=int, default=1_000_000)
+    parser.add_argument("--baseline-writes", type=int, default=5000)
+    parser.add_argument("--reads", type=int, default=100_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "users.db")
+        store = ProfileStore(path)
+        start = time.perf_counter()
+        for i in range(args.users):
+            store.save_profile(f"u{i}", user_profile(i))
+        store.flush()
+        print(f"seeded {args.users} profiles in {time.perf_counter() - start:.2f} s")
+
+        stream = write_stream(args.users, args.writes)
+        flushes = store.flushes
+        seconds = replay(store, stream)
+        print(f"{'batched writes':<22} {len(stream) / seconds:>10.0f} ops/s  "
+              f"({store.flushes - flushes} flushes, {store.rows_written} rows written in total)")
+        store.close()
+
+        naive = ProfileStore(path, flush_interval=None, max_pending=1)
+        seconds = replay(naive, write_stream(args.users, args.baseline_writes, seed=1))
+        print(f"{'commit per write':<22} {args.baseline_writes / seconds:>10.0f} ops/s")
+        naive.close()
+
+        rng = random.Random(2)
+        user_ids = [f"u{rng.randrange(args.users)}" for _ in range(args.reads)]
+        store = ProfileStore(path)
+        print(f"{'reads, cold cache':<22} {describe(read_latencies(store, user_ids))}")
+        print(f"{'reads, warm cache':<22} {describe(read_latencies(store, user_ids))}")
+
+        # Reads while another thread clicks "Add a glass" as fast as it can
+        done = threading.Event()
+
+        def writer():
+            stream = write_stream(args.users, 200_000, seed=3)
+            while not done.is_set():
+                for user_id, _ in stream[:10_000]:
+                    store.add_glass(user_id)
+                stream = stream[10_000:] or write_stream(args.users, 200_000, seed=4)
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        print(f"{'reads during writes':<22} {describe(read_latencies(store, user_ids))}")
+        done.set()
+        thread.join()
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
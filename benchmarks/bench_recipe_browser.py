@@ -0,0 +1,122 @@
+"""Latency of recipe browsing pages, first and deep, against filtering and sorting the whole catalog.
+
+Builds a RecipeBrowser over --recipes recipes (the bundled ones plus
+synthetic ones) and, for a mix of queries, times the first page with a
+fresh match mask (a new filter; RecipeIndex still remembers allergy
+lookups), the first page again (mask remembered), and a page deep into
+the results reached by cursor. The baseline is what the recipe branch
+did: a list comprehension over every recipe (with allergens.py matching
+exclusions per recipe), here followed by a sort and a slice. Every
+query's pages are checked against that baseline, in full, on a smaller
+catalog first. Run from the repository root:
+
+    python -m benchmarks.bench_recipe_browser [--recipes 100000] [--repeat 50]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from allergens import recipe_matches
+from nutribot_engine import load_food_data, load_recipes
+from recipe_browser import RecipeBrowser, Query
+from recipe_index import RecipeIndex
+from recipe_nutrients import RecipeNutrients
+from benchmarks.synthetic import synthetic_recipes
+
+QUERIES = {
+    "all by name": Query(),
+    "vegan dinner by most protein": Query(diets=("vegan",), meal_type="dinner", sort="protein", descending=True),
+    "keto, no dairy, <=600 kcal": Query(diets=("keto",), exclude=("dairy",),
+                                       ranges=(("calories", None, 600),), sort="calories"),
+    ">=40g protein by least fat": Query(ranges=(("protein", 40, None),), sort="fat"),
+    "300-400 kcal by calories": Query(ranges=(("calories", 300, 400),), sort="calories"),
+    "narrow: paleo breakfast, 3 excl.": Query(diets=("paleo",), meal_type="breakfast",
+                                              exclude=("nuts", "honey", "soy"), ranges=(("fiber", 10, None),),
+                                              sort="name"),
+}
+
+
+def naive(recipes, values, query):
+    """Matching ids in order, the way a scan of the recipe list would find them"""
+    ids = []
+    for i, recipe in enumerate(recipes):
+        if query.diets and not any(diet in recipe["diet_types"] for diet in query.diets):
+            continue
+        if query.meal_type and recipe["meal_type"] != query.meal_type:
+            continue
+        if any(recipe_matches(recipe["ingredients"], item) for item in query.exclude):
+            continue
+        if all((low is None or values[nutrient][i] >= low) and (high is None or values[nutrient][i] <= high)
+               for nutrient, low, high in query.ranges):
+            ids.append(i)
+    key = (lambda i: recipes[i]["name"].lower()) if query.sort == "name" else (lambda i: values[query.sort][i])
+    ids.sort(key=key)
+    return ids[::-1] if query.descending else ids
+
+
+def all_pages(browser, query, limit):
+    ids, cursor = [], None
+    while True:
+        page = browser.search(query, cursor, limit)
+        ids += page.ids
+        cursor = page.next_cursor
+        if cursor is None:
+            return ids
+
+
+def timed(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return np.median(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--recipes", type=int, default=100_000)
+    parser.add_argument("--page-size", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    small = load_recipes() + synthetic_recipes(5000, seed=1)
+    browser = RecipeBrowser(RecipeIndex(small), RecipeNutrients(small, load_food_data()))
+    for query in QUERIES.values():
+        assert all_pages(browser, query, 7) == naive(small, browser.values, query), query
+
+    recipes = load_recipes() + synthetic_recipes(max(args.recipes - len(load_recipes()), 0))
+    start = time.perf_counter()
+    index = RecipeIndex(recipes)
+    built_index = time.perf_counter() - start
+    nutrients = RecipeNutrients(recipes, load_food_data())
+    start = time.perf_counter()
+    browser = RecipeBrowser(index, nutrients)
+    built = time.perf_counter() - start
+    print(f"{len(recipes)} recipes; RecipeIndex {built_index:.2f} s, RecipeBrowser {built:.2f} s; "
+          f"page size {args.page_size}, median of {args.repeat}")
+    print(f"{'query':<34} {'matches':>8} {'new filter':>11} {'page 1':>9} {'deep page':>10} {'scan+sort':>10}")
+    for name, query in QUERIES.items():
+        limit = args.page_size
+
+        def fresh():
+            browser._masks.clear()
+            browser.search(query, None, limit)
+
+        cold = timed(fresh, max(args.repeat // 5, 1))
+        page = browser.search(query, None, limit)
+        first = timed(lambda: browser.search(query, None, limit), args.repeat)
+        # A cursor about halfway through the results, found by paging there once
+        cursor, seen = page.next_cursor, limit
+        while cursor and seen < page.total // 2:
+            step = browser.search(query, cursor, 1000)
+            seen += len(step.ids)
+            cursor = step.next_cursor
+        deep = timed(lambda: browser.search(query, cursor, limit), args.repeat) if cursor else float("nan")
+        scan = timed(lambda: naive(recipes, browser.values, query)[:limit], max(args.repeat // 25, 1))
+        print(f"{name:<34} {page.total:>8} {cold:>9.2f}ms {first:>7.3f}ms {deep:>8.3f}ms {scan:>8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
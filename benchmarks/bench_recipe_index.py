@@ -0,0 +1,69 @@
+"""Recipe filtering for generate_meal_plan: RecipeIndex vs the original per-recipe loops.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_recipe_index [--sizes 5 5000 50000]
+"""
+import argparse
+import time
+
+from allergens import recipe_matches
+from recipe_index import RecipeIndex
+from benchmarks.synthetic import PROFILES, synthetic_recipes
+
+
+def legacy_filter(recipes, preferences, allergies):
+    """Filtering as generate_meal_plan did it before the index, with allergies matched per recipe by allergens.py"""
+    suitable_recipes = []
+    for recipe in recipes:
+        compatible = True
+        if preferences:
+            has_matching_diet = False
+            for diet in recipe["diet_types"]:
+                if diet in preferences:
+                    has_matching_diet = True
+                    break
+            if preferences and not has_matching_diet:
+                compatible = False
+        if compatible and allergies:
+            for allergy in allergies:
+                if recipe_matches(recipe["ingredients"], allergy):
+                    compatible = False
+                    break
+        if compatible:
+            suitable_recipes.append(recipe)
+    return {meal_type: [r for r in suitable_recipes if r["meal_type"] == meal_type]
+            for meal_type in ("breakfast", "lunch", "dinner")}
+
+
+def indexed_filter(index, preferences, allergies):
+    suitable = index.filter(preferences, allergies)
+    return {meal_type: index.select(suitable, meal_type) for meal_type in ("breakfast", "lunch", "dinner")}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5, 5_000, 50_000])
+    args = parser.parse_args()
+
+    print(f"{'recipes':>8} {'build ms':>9} {'loop ms':>9} {'index ms':>9} {'speedup':>8}")
+    for size in args.sizes:
+        recipes = synthetic_recipes(size)
+        start = time.perf_counter()
+        index = RecipeIndex(recipes)
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        expected = [legacy_filter(recipes, p["preferences"], p["allergies"]) for p in PROFILES]
+        legacy = (time.perf_counter() - start) / len(PROFILES)
+
+        start = time.perf_counter()
+        actual = [indexed_filter(index, p["preferences"], p["allergies"]) for p in PROFILES]
+        indexed = (time.perf_counter() - start) / len(PROFILES)
+        assert actual == expected
+
+        print(f"{size:>8} {build * 1000:>9.1f} {legacy * 1000:>9.3f} {indexed * 1000:>9.3f} {legacy / indexed:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Bulk-import throughput of RecipeNutrients and the cost of keeping it current.
+
+Imports synthetic recipes whose ingredient lines use the benchmark's
+ingredient vocabulary, resolved against the app's foods plus one row per
+remaining ingredient; every tenth recipe states no nutritional_info, so
+its vector is the ingredient estimate. Checks first that the bundled
+recipes come out at their stated per-serving figures. Also times
+reparsing every line without the memo, a save/load round trip, a reload
+after editing 1% of the recipes, and a single food row change. Run from
+the repository root:
+
+    python -m benchmarks.bench_recipe_nutrients [--recipes 100000]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+
+from nutribot_engine import load_food_data, load_recipes
+from recipe_nutrients import RecipeNutrients, parse_ingredient, parse_nutritional_info, resolve_food, servings
+from benchmarks.synthetic import CATEGORIES, INGREDIENTS, synthetic_recipes
+
+
+def ingredient_foods(seed=0):
+    rng = random.Random(seed)
+    foods = load_food_data()
+    for name in INGREDIENTS:
+        foods.setdefault(name, {
+            "calories": rng.randint(10, 600),
+            "protein": round(rng.uniform(0, 40), 1),
+            "carbs": round(rng.uniform(0, 80), 1),
+            "fat": round(rng.uniform(0, 50), 1),
+            "fiber": round(rng.uniform(0, 15), 1),
+            "category": rng.choice(CATEGORIES),
+        })
+    return foods
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--recipes", type=int, default=100_000)
+    args = parser.parse_args()
+
+    bundled = RecipeNutrients(load_recipes(), load_food_data())
+    for i, recipe in enumerate(bundled.recipes):
+        vector = bundled.vector(i)
+        assert all(vector[name] == value for name, value in parse_nutritional_info(recipe["nutritional_info"]).items())
+
+    foods = ingredient_foods()
+    recipes = synthetic_recipes(args.recipes)
+    for recipe in recipes[::10]:
+        del recipe["nutritional_info"]
+    lines = sum(len(recipe["ingredients"]) for recipe in recipes)
+
+    def unmemoised():
+        for recipe in recipes:
+            for line in recipe["ingredients"]:
+                ingredient = parse_ingredient(line)
+                resolve_food(ingredient.name, foods)
+                servings(ingredient)
+
+    _, parse_all = timed(unmemoised)
+    nutrients, build = timed(RecipeNutrients, recipes, foods)
+    print(f"{len(recipes)} recipes ({nutrients.estimated.sum()} estimated), {lines} ingredient lines, "
+          f"{len(nutrients._lines)} distinct, {nutrients.resolved_ratio:.0%} resolved")
+    print(f"{'parse every line, no memo':<32} {parse_all:>7.2f} s {len(recipes) / parse_all:>10.0f} recipes/s")
+    print(f"{'bulk import':<32} {build:>7.2f} s {len(recipes) / build:>10.0f} recipes/s")
+
+    # The vectorised import must agree with summing each recipe on its own, and serve stated figures first
+    sample = random.Random(1).sample(range(len(recipes)), min(1000, len(recipes)))
+    for i in sample:
+        expected = sum((amount * np.array([foods[key][c] for c in ("calories", "protein", "carbs", "fat", "fiber")])
+                        for key, amount in nutrients.uses(i)), np.zeros(5))
+        assert np.allclose(nutrients.estimates[i], expected), i
+        if "nutritional_info" in recipes[i]:
+            expected = [parse_nutritional_info(recipes[i]["nutritional_info"])[c]
+                        for c in ("calories", "protein", "carbs", "fat", "fiber")]
+        assert np.allclose(nutrients.matrix[i], expected), i
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "recipe_nutrients.npz")
+        _, save = timed(nutrients.save, path)
+        loaded, load = timed(RecipeNutrients.load, path, recipes, foods)
+        assert not loaded.recomputed and np.array_equal(loaded.matrix, nutrients.matrix)
+        assert np.array_equal(loaded.estimates, nutrients.estimates)
+        assert np.array_equal(loaded.estimated, nutrients.estimated)
+        print(f"{'save':<32} {save:>7.2f} s {os.path.getsize(path) / 2**20:>10.1f} MB")
+        print(f"{'load, nothing changed':<32} {load:>7.2f} s {len(recipes) / load:>10.0f} recipes/s")
+
+        edited = list(recipes)
+        rng = random.Random(2)
+        for i in rng.sample(range(len(recipes)), len(recipes) // 100):
+            edited[i] = dict(edited[i], ingredients=edited[i]["ingredients"][:-1] + ["2 cups quinoa"])
+        reloaded, reload = timed(RecipeNutrients.load, path, edited, foods)
+        assert np.allclose(reloaded.matrix, RecipeNutrients(edited, foods).matrix)
+        print(f"{'load, 1% of recipes edited':<32} {reload:>7.2f} s {len(reloaded.recomputed):>10} recomputed")
+
+    foods["quinoa"] = dict(foods["quinoa"], calories=foods["quinoa"]["calories"] + 10)
+    affected, update = timed(nutrients.update_food, "quinoa")
+    fresh = RecipeNutrients(recipes, foods)
+    assert np.allclose(nutrients.matrix, fresh.matrix) and np.allclose(nutrients.estimates, fresh.estimates)
+    print(f"{'one food row changed':<32} {update:>7.2f} s {len(affected):>10} recomputed")
+
+
+if __name__ == "__main__":
+    main()
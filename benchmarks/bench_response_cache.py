@@ -0,0 +1,79 @@
+"""Hit ratio of ResponseCache when replaying a skewed chat query log.
+
+The log mixes a handful of popular questions (Zipf-distributed) with a
+long tail of one-off food lookups, spread over a few user profiles. Only
+messages routed to cacheable intents go through the cache, as in
+get_chatbot_response. Run from the repository root:
+
+    python -m benchmarks.bench_response_cache [--queries 200000]
+"""
+import argparse
+import random
+import time
+
+from intent_router import IntentRouter
+from nutribot_engine import UserProfile
+from response_cache import CACHEABLE_INTENTS, ResponseCache, response_cache_key
+from benchmarks.bench_router import APP_FOOD_KEYS, APP_NUTRIENT_KEYS
+from benchmarks.synthetic import QUERIES, synthetic_food_data
+
+PROFILES = [
+    UserProfile(goal="Weight Loss"),
+    UserProfile(goal="Muscle Gain", dietary_preferences=["Keto"]),
+    UserProfile(goal="Maintenance", dietary_preferences=["Vegetarian"], allergies=["nuts"]),
+]
+
+
+def query_log(size, tail_foods, seed=0):
+    rng = random.Random(seed)
+    weights = [1 / rank for rank in range(1, len(QUERIES) + 1)]
+    log = []
+    for _ in range(size):
+        if rng.random() < 0.8:
+            query = rng.choices(QUERIES, weights)[0]
+        else:
+            query = f"how many calories in {rng.choice(tail_foods)}"
+        log.append((query, rng.choice(PROFILES)))
+    return log
+
+
+def build_response(query):
+    # Stand-in for the reply builders: a few hundred characters per answer
+    return ("**Answer** " + query + " ") * (5 + len(query) % 20)
+
+
+def replay(log, router, cache):
+    start = time.perf_counter()
+    for query, profile in log:
+        query = query.lower()
+        route = router.route(query)
+        if route.intent not in CACHEABLE_INTENTS:
+            continue
+        key = response_cache_key(query, profile)
+        if cache.get(key) is None:
+            cache.put(key, build_response(query))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--queries", type=int, default=200_000)
+    parser.add_argument("--budgets-kb", type=int, nargs="+", default=[16, 64, 256, 1024, 4096])
+    args = parser.parse_args()
+
+    foods = list(synthetic_food_data(20_000, base=dict.fromkeys(APP_FOOD_KEYS)))
+    router = IntentRouter(foods, APP_NUTRIENT_KEYS)
+    log = query_log(args.queries, foods)
+
+    print(f"{args.queries} queries, {len(QUERIES)} popular questions, {len(foods)} foods in the long tail")
+    print(f"{'budget KB':>10} {'entries':>8} {'hit ratio':>10} {'evictions':>10} {'us/query':>9}")
+    for budget in args.budgets_kb:
+        cache = ResponseCache(max_bytes=budget * 1024, ttl=None)
+        elapsed = replay(log, router, cache)
+        stats = cache.stats()
+        print(f"{budget:>10} {stats['entries']:>8} {stats['hit_ratio']:>10.1%} {stats['evictions']:>10} "
+              f"{elapsed / len(log) * 1e6:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Routing cost of the compiled IntentRouter against the original if/elif cascade.
+
+"db router" is the router a database-backed engine uses, which looks food
+names up in the food database's hash index instead of compiling them. Run
+from the repository root:
+
+    python -m benchmarks.bench_router [--sizes 15 10000 1000000]
+"""
+import argparse
+import os
+import resource
+import tempfile
+import time
+
+from food_db import FoodDatabase, write_database
+from intent_router import IntentRouter, RECIPE_DIET_TYPES
+from nutribot_engine import load_food_data, load_nutrition_facts
+from benchmarks.synthetic import QUERIES, synthetic_food_data
+
+APP_FOOD_KEYS = list(load_food_data())
+APP_NUTRIENT_KEYS = list(load_nutrition_facts())
+
+
+def legacy_route(user_input, food_keys, nutrient_keys):
+    """The condition cascade get_chatbot_response used before the router"""
+    if "meal plan" in user_input or "plan for" in user_input:
+        return "meal_plan", None
+    elif "recipe" in user_input:
+        for diet in RECIPE_DIET_TYPES:
+            if diet in user_input:
+                return "recipe", diet
+        return "recipe", None
+    elif any(nutrient in user_input for nutrient in nutrient_keys):
+        if "what is" in user_input or "tell me about" in user_input or "benefits" in user_input:
+            for nutrient in nutrient_keys:
+                if nutrient in user_input:
+                    return "nutrition", nutrient
+        return "nutrition", None
+    elif any(food in user_input for food in food_keys):
+        for food in food_keys:
+            if food in user_input:
+                return "food", food
+    elif "diet" in user_input or "weight loss" in user_input or "protein" in user_input:
+        return "diet", None
+    elif "healthy eating" in user_input or "healthy diet" in user_input:
+        return "healthy_eating", None
+    elif "water" in user_input and ("track" in user_input or "log" in user_input or "add" in user_input):
+        return "water", None
+    elif "breakfast" in user_input or "morning meal" in user_input:
+        return "breakfast", None
+    return "fallback", None
+
+
+def router_route(router, user_input):
+    route = router.route(user_input)
+    if route.intent == "recipe":
+        return route.intent, route.first("diet")
+    if route.intent == "nutrition":
+        if route.has("what is", "tell me about", "benefits"):
+            return route.intent, route.first("nutrient")
+        return route.intent, None
+    if route.intent == "food":
+        return route.intent, route.first("food")
+    return route.intent, None
+
+
+def per_query_us(fn, queries, budget):
+    """Mean microseconds per query, repeating the corpus until the time budget is spent"""
+    calls = 0
+    start = time.perf_counter()
+    while True:
+        for query in queries:
+            fn(query)
+        calls += len(queries)
+        elapsed = time.perf_counter() - start
+        if elapsed >= budget:
+            return elapsed / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[15, 10_000, 1_000_000])
+    parser.add_argument("--budget", type=float, default=1.0, help="seconds per measurement")
+    args = parser.parse_args()
+
+    queries = QUERIES
+    print(f"{'food keys':>10} {'build s':>8} {'states':>10} {'rss MB':>8} "
+          f"{'cascade us':>11} {'router us':>10} {'speedup':>8} {'db router us':>13}")
+    for size in args.sizes:
+        foods = synthetic_food_data(size, base=load_food_data())
+        food_keys = list(foods)
+        start = time.perf_counter()
+        router = IntentRouter(food_keys, APP_NUTRIENT_KEYS)
+        build = time.perf_counter() - start
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+        for query in queries:
+            expected = legacy_route(query, food_keys, APP_NUTRIENT_KEYS)
+            actual = router_route(router, query)
+            assert actual == expected, (query, expected, actual)
+
+        legacy = per_query_us(lambda q: legacy_route(q, food_keys, APP_NUTRIENT_KEYS), queries, args.budget)
+        routed = per_query_us(lambda q: router_route(router, q), queries, args.budget)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "foods.nfdb")
+            write_database(foods, path)
+            database = FoodDatabase.open(path)
+            db_router = IntentRouter((), APP_NUTRIENT_KEYS, food_index=database.store.index)
+            for query in queries:
+                assert router_route(db_router, query) == router_route(router, query), query
+            db_routed = per_query_us(lambda q: router_route(db_router, q), queries, args.budget)
+        print(f"{size:>10} {build:>8.2f} {len(router._matcher):>10} {rss:>8.0f} "
+              f"{legacy:>11.1f} {routed:>10.1f} {legacy / routed:>7.1f}x {db_routed:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Build time and query latency of SemanticIndex, exact and approximate, at scale.
+
+Indexes synthetic nutrition facts and recipes, then answers a mix of
+questions: free-text ones like the app receives and random combinations of
+two or three corpus words. Approximate search reads the heaviest
+--max-postings entries of each query term; its recall@10 is the share of
+exact top-10 scores it matches (synthetic recipes tie often, so any
+document scoring at least the exact tenth best counts). Also times a
+save/load round trip. Run from the repository root:
+
+    python -m benchmarks.bench_semantic_index [--docs 1000000] [--max-postings 10000]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+
+from nutribot_engine import load_nutrition_facts, load_recipes
+from semantic_index import SemanticIndex, documents
+from benchmarks.synthetic import (BASES, DIET_TYPES, INGREDIENTS, MEAL_TYPES, PREPARATIONS, synthetic_nutrition_facts,
+                                  synthetic_recipes)
+
+QUESTIONS = [
+    "what helps my bones?", "something filling for dinner", "gut health", "anything with lentils",
+    "quick vegan lunch", "high protein breakfast with eggs", "roasted salmon and sweet potato",
+    "what is good for my immune system", "energy for workouts", "a warm soup with beans",
+]
+
+
+def queries(n, seed=0):
+    rng = random.Random(seed)
+    words = INGREDIENTS + BASES + PREPARATIONS + DIET_TYPES + MEAL_TYPES
+    result = list(QUESTIONS)
+    while len(result) < n:
+        result.append(" ".join(rng.sample(words, rng.randint(2, 3))))
+    return result
+
+
+def latencies(index, texts, **options):
+    result = []
+    for text in texts:
+        start = time.perf_counter()
+        index.search(text, k=10, **options)
+        result.append(time.perf_counter() - start)
+    return np.array(result) * 1000
+
+
+def describe(ms):
+    return f"p50 {np.percentile(ms, 50):6.2f} ms  p99 {np.percentile(ms, 99):6.2f} ms  max {ms.max():6.2f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=1_000_000)
+    parser.add_argument("--facts", type=int, default=10_000, help="how many of the documents are nutrition facts")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--max-postings", type=int, default=10_000)
+    args = parser.parse_args()
+
+    facts = synthetic_nutrition_facts(args.facts, base=load_nutrition_facts())
+    recipes = load_recipes() + synthetic_recipes(max(args.docs - len(facts) - len(load_recipes()), 0))
+    docs = documents(facts, recipes)
+
+    start = time.perf_counter()
+    index = SemanticIndex(docs)
+    build = time.perf_counter() - start
+    print(f"{len(index)} documents, {len(index.terms)} terms, {len(index.doc_ids)} postings, "
+          f"{index.nbytes / 2**20:.0f} MB; built in {build:.1f} s ({len(index) / build:,.0f} docs/s)")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "semantic_index.npz")
+        start = time.perf_counter()
+        index.save(path)
+        save = time.perf_counter() - start
+        start = time.perf_counter()
+        loaded = SemanticIndex.load(path)
+        load = time.perf_counter() - start
+        assert loaded.search(QUESTIONS[0], k=10) == index.search(QUESTIONS[0], k=10)
+        print(f"save {save:.2f} s, load {load:.2f} s, {os.path.getsize(path) / 2**20:.0f} MB on disk")
+
+    texts = queries(args.queries)
+    index.search(texts[0])  # allocate the score buffer
+    exact = latencies(index, texts, max_postings=0)
+    approximate = latencies(index, texts, max_postings=args.max_postings)
+    recalls = []
+    for text in texts:
+        expected = index.search(text, k=10, max_postings=0)
+        if expected:
+            found = index.search(text, k=10, max_postings=args.max_postings)
+            # Approximate scores can only be lower than the exact ones
+            recalls.append(sum(hit.score >= expected[-1].score - 1e-6 for hit in found) / len(expected))
+    recall = np.mean(recalls)
+    print(f"{'exact':<24} {describe(exact)}")
+    print(f"{'max_postings ' + str(args.max_postings):<24} {describe(approximate)}  recall@10 {recall:.1%}")
+    for question in QUESTIONS[:3]:
+        hits = index.search(question, k=3, max_postings=args.max_postings)
+        print(f"  {question!r}: " + ", ".join(f"{hit.kind} {hit.key} ({hit.score:.2f})" for hit in hits))
+
+
+if __name__ == "__main__":
+    main()
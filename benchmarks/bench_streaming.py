@@ -0,0 +1,84 @@
+"""Time to the first chunk against total time of streamed chat replies and meal plans.
+
+Builds an engine over --recipes recipes (the bundled ones plus synthetic
+ones) and streams replies with NutriBot.respond_stream, the way the chat
+UI shows them, with the response cache off. A meal plan's header needs
+only the base plan, so it goes out before any recipe is filtered; each day
+follows as soon as it is picked, which for optimized plans means as soon
+as the optimizer has solved it. Longer plans are streamed directly with
+meal_plan_days. Every streamed reply is also checked to join to exactly
+what respond() returns. Run from the repository root:
+
+    python -m benchmarks.bench_streaming [--recipes 100000] [--repeat 20]
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from nutribot_engine import NutriBot, UserProfile, load_recipes
+from response_cache import ResponseCache
+from benchmarks.synthetic import synthetic_recipes
+
+QUERIES = ["meal plan please", "give me a vegan recipe", "how many calories in an apple", "warm soup with carrots"]
+
+
+def stream_times(chunks):
+    """Seconds to the first chunk and to the last, and how many chunks came"""
+    start = time.perf_counter()
+    first, count = None, 0
+    for _ in chunks:
+        if first is None:
+            first = time.perf_counter() - start
+        count += 1
+    return first, time.perf_counter() - start, count
+
+
+def report(name, samples):
+    first = np.median([sample[0] for sample in samples]) * 1000
+    total = np.median([sample[1] for sample in samples]) * 1000
+    print(f"{name:<36} {first:>10.3f} ms {total:>10.3f} ms {total / first:>8.0f}x {samples[0][2]:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--recipes", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    bot = NutriBot(recipes=load_recipes() + synthetic_recipes(max(args.recipes - len(load_recipes()), 0), seed=args.seed),
+                   response_cache=ResponseCache(max_bytes=0))
+    bot.recipe_index, bot.meal_optimizer, bot.semantic_index
+    profile = UserProfile(name="bench", goal="Muscle Gain", allergies=["nuts"], onboarded=True)
+
+    for query in QUERIES:
+        for optimize in (False, True):
+            random.seed(args.seed)
+            expected = bot.respond(query, profile, optimize=optimize)
+            random.seed(args.seed)
+            assert "".join(bot.respond_stream(query, profile, optimize=optimize)) == expected or optimize, query
+
+    print(f"{len(bot.recipes)} recipes, median of {args.repeat} runs")
+    print(f"{'reply':<36} {'first chunk':>13} {'total':>13} {'ratio':>9} {'chunks':>7}")
+    for query in QUERIES:
+        report(f"chat: {query}", [stream_times(bot.respond_stream(query, profile)) for _ in range(args.repeat)])
+    report("chat: meal plan please (optimized)",
+           [stream_times(bot.respond_stream("meal plan please", profile, optimize=True)) for _ in range(args.repeat)])
+
+    # The chat plans three days; cohorts and exports plan longer ones
+    for days in (7, 30):
+        for optimize in (False, True):
+            samples = []
+            for _ in range(args.repeat if not optimize else max(args.repeat // 5, 1)):
+                start = time.perf_counter()
+                options = bot.meal_plan_options(profile.goal, profile.dietary_preferences, profile.allergies)
+                first, total, count = stream_times(bot.meal_plan_days(profile.goal, options, days, optimize))
+                setup = time.perf_counter() - start - total
+                samples.append((setup + first, setup + total, count))
+            report(f"{days}-day plan{' (optimized)' if optimize else ''}", samples)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Load generator for server.py: p50/p99 latency and requests per second over many connections.
+
+Starts a server in a subprocess (or targets a running one with --port) and
+keeps --connections keep-alive HTTP or WebSocket connections busy sending
+chat messages for --duration seconds. Run from the repository root:
+
+    python -m benchmarks.load_server [--connections 1000] [--duration 10] [--mode http|ws]
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+from server import encode_frame, raise_open_file_limit, read_frame
+from benchmarks.synthetic import QUERIES
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+async def http_client(host, port, client_id, users, deadline, latencies, statuses):
+    reader, writer = await asyncio.open_connection(host, port)
+    rng = random.Random(client_id)
+    try:
+        while time.perf_counter() < deadline:
+            body = json.dumps({"user_id": f"user{client_id % users}", "message": rng.choice(QUERIES)}).encode()
+            start = time.perf_counter()
+            writer.write(b"POST /chat HTTP/1.1\r\nHost: nutribot\r\nContent-Type: application/json\r\n"
+                         b"Content-Length: " + str(len(body)).encode() + b"\r\n\r\n" + body)
+            head = await reader.readuntil(b"\r\n\r\n")
+            status = int(head.split(b" ", 2)[1])
+            length = int(head.lower().split(b"content-length:")[1].split(b"\r\n")[0])
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+            statuses[status] += 1
+    finally:
+        writer.close()
+
+
+async def ws_client(host, port, client_id, users, deadline, latencies, statuses):
+    reader, writer = await asyncio.open_connection(host, port)
+    rng = random.Random(client_id)
+    key = base64.b64encode(os.urandom(16))
+    writer.write(b"GET /ws?user_id=user" + str(client_id % users).encode() + b" HTTP/1.1\r\nHost: nutribot\r\n"
+                 b"Upgrade: websocket\r\nConnection: Upgrade\r\nSec-WebSocket-Version: 13\r\n"
+                 b"Sec-WebSocket-Key: " + key + b"\r\n\r\n")
+    await reader.readuntil(b"\r\n\r\n")
+    try:
+        while time.perf_counter() < deadline:
+            message = json.dumps({"type": "chat", "message": rng.choice(QUERIES)}).encode()
+            start = time.perf_counter()
+            writer.write(encode_frame(0x1, message, mask=os.urandom(4)))
+            _, data = await read_frame(reader)
+            latencies.append(time.perf_counter() - start)
+            statuses[json.loads(data).get("status", 200)] += 1
+        writer.write(encode_frame(0x8, b"\x03\xe8", mask=os.urandom(4)))
+    finally:
+        writer.close()
+
+
+async def run_load(host, port, connections, duration, users, mode):
+    latencies, statuses = [], Counter()
+    client = ws_client if mode == "ws" else http_client
+    deadline = time.perf_counter() + duration
+    start = time.perf_counter()
+    results = await asyncio.gather(*(client(host, port, i, users, deadline, latencies, statuses)
+                                     for i in range(connections)), return_exceptions=True)
+    elapsed = time.perf_counter() - start
+    failures = Counter(type(result).__name__ for result in results if isinstance(result, Exception))
+    return latencies, statuses, failures, elapsed
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def wait_for_port(host, port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            socket.create_connection((host, port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server did not start on {host}:{port}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, help="target a running server instead of starting one")
+    parser.add_argument("--connections", type=int, default=1000)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--mode", choices=["http", "ws"], default="http")
+    args = parser.parse_args()
+
+    raise_open_file_limit()
+    server = None
+    port = args.port
+    # A server started here keeps its profiles in a scratch database, not the user's own
+    scratch = tempfile.TemporaryDirectory()
+    if port is None:
+        port = 18080
+        server = subprocess.Popen([sys.executable, "server.py", "--host", args.host, "--port", str(port),
+                                   "--profile-db", os.path.join(scratch.name, "load_server.db")],
+                                  cwd=ROOT, stdout=subprocess.DEVNULL)
+    try:
+        wait_for_port(args.host, port)
+        latencies, statuses, failures, elapsed = asyncio.run(
+            run_load(args.host, port, args.connections, args.duration, args.users, args.mode))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+        scratch.cleanup()
+
+    latencies.sort()
+    print(f"{args.mode}: {args.connections} connections, {args.duration:.0f}s, {args.users} users")
+    if latencies:
+        print(f"requests: {len(latencies)}  rps: {len(latencies) / elapsed:,.0f}  "
+              f"p50: {percentile(latencies, 0.5) * 1000:.1f} ms  p99: {percentile(latencies, 0.99) * 1000:.1f} ms")
+    print(f"status codes: {dict(statuses)}")
+    if failures:
+        print(f"connection failures: {dict(failures)}")
+
+
+if __name__ == "__main__":
+    main()
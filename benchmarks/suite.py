@@ -0,0 +1,220 @@
+"""Reproducible benchmark suite for chat replies and meal plans, with baseline comparison.
+
+Builds an engine over synthetic data scaled to --foods, --recipes and
+--facts (the bundled entries are always included), then times:
+
+    chat/<branch>        every query of corpus.jsonl, grouped by the
+                         get_chatbot_response branch it exercises, with the
+                         response cache off
+    chat/cached_mix      the whole corpus again through a response cache
+    meal_plan/...        generate_meal_plan for every goal, preference and
+                         allergy combination in synthetic.PROFILES
+    meal_plan_optimized/ optimize=True for each goal
+
+Random recipe picks are seeded, so two runs replay the same work. Results
+are written as JSON; given --baseline (an earlier --out file), medians are
+compared and the exit status is 1 if any benchmark got slower than
+--tolerance allows, after scaling for machine speed by a fixed calibration
+workload timed alongside them. The corpus also checks that each query still routes to
+its intent and that unanswered branches still return None. Note that the
+breakfast branch's weight-loss reply is unreachable: "diet" and "weight
+loss" route to the diet branch first. Run from the repository root:
+
+    python -m benchmarks.suite --out baseline.json
+    python -m benchmarks.suite --baseline baseline.json [--out results.json]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+from collections import defaultdict
+
+import numpy as np
+
+from nutribot_engine import NutriBot, UserProfile, load_food_data, load_nutrition_facts, load_recipes
+from response_cache import ResponseCache
+from benchmarks.synthetic import PROFILES, synthetic_food_data, synthetic_nutrition_facts, synthetic_recipes
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "corpus.jsonl")
+
+# Changes below this many microseconds are treated as noise whatever the ratio
+NOISE_FLOOR_US = 5.0
+
+
+def load_corpus(path=CORPUS_PATH):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def build_engine(args, response_cache):
+    return NutriBot(
+        food_data=synthetic_food_data(args.foods, seed=args.seed, base=load_food_data()),
+        nutrition_facts=synthetic_nutrition_facts(args.facts, seed=args.seed, base=load_nutrition_facts()),
+        recipes=load_recipes() + synthetic_recipes(max(args.recipes - len(load_recipes()), 0), seed=args.seed),
+        response_cache=response_cache,
+    )
+
+
+def summarize(latencies):
+    latencies = np.array(latencies) * 1e6
+    return {
+        "calls": len(latencies),
+        "median_us": float(np.median(latencies)),
+        "p95_us": float(np.percentile(latencies, 95)),
+        "mean_us": float(latencies.mean()),
+    }
+
+
+def replay(benchmarks, rounds, seed):
+    """Latencies of every benchmark's calls, replayed rounds times.
+
+    benchmarks maps a name to (fn, calls, share): fn(*args) is timed for
+    each args in calls, in share of the rounds. Rounds are interleaved
+    across benchmarks so that a slow patch on a shared machine is spread
+    over all of them rather than landing on one.
+    """
+    random.seed(seed)
+    latencies = {name: [] for name in benchmarks}
+    for i in range(rounds):
+        for name, (fn, calls, share) in benchmarks.items():
+            if i % round(1 / share):
+                continue
+            for args in calls:
+                start = time.perf_counter()
+                fn(*args)
+                latencies[name].append(time.perf_counter() - start)
+    return latencies
+
+
+def calibration_workload():
+    """A fixed pure-Python workload, to factor out how fast the machine is running"""
+    rng = random.Random(0)
+    words = [f"{rng.choice(PROFILES)['goal']} {rng.random()}" for _ in range(2000)]
+
+    def workload():
+        counts = {}
+        for word in sorted(words):
+            counts[word[:6]] = counts.get(word[:6], 0) + len(word)
+        return counts
+
+    return workload
+
+
+def check_corpus(bot, corpus, profile):
+    for entry in corpus:
+        route = bot.router.route(entry["query"])
+        if route.intent == "fallback":
+            _, route = bot.correct_spelling(entry["query"], route)
+        assert route.intent == entry["intent"], (entry, route.intent)
+        response = bot.respond(entry["query"], profile)
+        assert (response is None) == entry["branch"].endswith("unanswered"), entry
+        assert entry["branch"].startswith("semantic/") == (response or "").startswith("I'm not sure"), entry
+
+
+def run(args):
+    corpus = load_corpus()
+    profile = UserProfile(name="bench", goal="Weight Loss", onboarded=True)
+
+    bot = build_engine(args, ResponseCache(max_bytes=0))
+    check_corpus(bot, corpus, profile)  # also builds the lazy indexes
+    cached = build_engine(args, ResponseCache())
+    cached.respond_many([entry["query"] for entry in corpus], profile)
+
+    benchmarks = {"calibration": (calibration_workload(), [()], 1)}
+    branches = defaultdict(list)
+    for entry in corpus:
+        branches[entry["branch"]].append((entry["query"], profile))
+    for branch, calls in sorted(branches.items()):
+        benchmarks[f"chat/{branch}"] = (bot.respond, calls, 1)
+    benchmarks["chat/cached_mix"] = (cached.respond, [(entry["query"], profile) for entry in corpus], 1)
+    for spec in PROFILES:
+        name = "/".join(["meal_plan", spec["goal"], "+".join(spec["preferences"]) or "any",
+                         "+".join(spec["allergies"]) or "none"])
+        benchmarks[name] = (bot.generate_meal_plan, [(spec["goal"], spec["preferences"], spec["allergies"], args.days)], 1)
+    for goal in sorted({spec["goal"] for spec in PROFILES}):
+        # The optimizer is about a hundred times slower, so it runs in a quarter of the rounds
+        benchmarks[f"meal_plan_optimized/{goal}"] = (bot.generate_meal_plan, [(goal, [], [], args.days, True)], 0.25)
+
+    return {name: summarize(latencies) for name, latencies in replay(benchmarks, args.rounds, args.seed).items()}
+
+
+def compare(results, baseline, tolerance, normalize=True):
+    """Print each benchmark against the baseline; returns the names that regressed
+
+    With normalize, baseline times are first scaled by how much slower or
+    faster the calibration workload ran, so a busier or throttled machine
+    does not read as a regression.
+    """
+    regressions = []
+    speed = 1.0
+    if normalize and "calibration" in baseline and "calibration" in results:
+        speed = results["calibration"]["median_us"] / baseline["calibration"]["median_us"]
+        print(f"calibration ran {speed:.2f}x the baseline time; baseline medians scaled to match")
+    print(f"{'benchmark':<58} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, current in results.items():
+        before = baseline.get(name)
+        if name == "calibration":
+            continue
+        if before is None:
+            print(f"{name:<58} {'-':>10} {current['median_us']:>8.1f}us {'new':>8}")
+            continue
+        expected = before["median_us"] * speed
+        change = current["median_us"] / expected - 1 if expected else 0.0
+        slower = change > tolerance and current["median_us"] - expected > NOISE_FLOOR_US
+        if slower:
+            regressions.append(name)
+        print(f"{name:<58} {expected:>8.1f}us {current['median_us']:>8.1f}us "
+              f"{change:>+8.1%}{'  REGRESSION' if slower else ''}")
+    for name in sorted(set(baseline) - set(results)):
+        print(f"{name:<58} {baseline[name]['median_us']:>8.1f}us {'-':>10} {'gone':>8}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--foods", type=int, default=10_000)
+    parser.add_argument("--recipes", type=int, default=10_000)
+    parser.add_argument("--facts", type=int, default=1_000)
+    parser.add_argument("--days", type=int, default=7, help="days per generated meal plan")
+    parser.add_argument("--rounds", type=int, default=20, help="times each call is replayed")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="JSON file from an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown of a median, as a ratio")
+    parser.add_argument("--no-normalize", action="store_true", help="compare raw times, ignoring the calibration run")
+    args = parser.parse_args()
+
+    config = {key: getattr(args, key) for key in ("foods", "recipes", "facts", "days", "rounds", "seed")}
+    results = run(args)
+    report = {
+        "config": config,
+        "environment": {"python": platform.python_version(), "platform": platform.platform(),
+                        "numpy": np.__version__, "time": time.strftime("%Y-%m-%dT%H:%M:%S")},
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if not args.baseline:
+        print(f"{'benchmark':<58} {'median':>10} {'p95':>10} {'ops/s':>10}")
+        for name, result in results.items():
+            print(f"{name:<58} {result['median_us']:>8.1f}us {result['p95_us']:>8.1f}us "
+                  f"{1e6 / result['mean_us']:>10,.0f}")
+        return
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline["config"] != config:
+        print(f"warning: baseline was run with {baseline['config']}", file=sys.stderr)
+    regressions = compare(results, baseline["results"], args.tolerance, normalize=not args.no_normalize)
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) slower than the baseline by more than {args.tolerance:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
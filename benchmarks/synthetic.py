@@ -0,0 +1,116 @@
+"""Synthetic data generators used by the benchmark scripts."""
+import random
+
+from nutribot_engine import load_meal_plans
+
+PREPARATIONS = ["raw", "baked", "boiled", "steamed", "roasted", "grilled", "fried", "smoked",
+                "dried", "canned", "frozen", "pickled", "mashed", "sauteed", "poached", "braised"]
+BASES = ["apple", "turnip", "kale", "bean", "pea", "rice", "corn", "barley", "plum", "pear",
+         "fig", "date", "lime", "beet", "leek", "cod", "tuna", "pork", "beef", "tofu", "millet",
+         "squash", "carrot", "onion", "cabbage", "mango", "papaya", "cashew", "walnut", "lamb"]
+CATEGORIES = ["fruit", "vegetable", "protein", "grain", "dairy", "nuts", "legume"]
+
+QUERIES = [
+    "can you create a meal plan for me?",
+    "what should i eat? plan for next week",
+    "give me a healthy recipe",
+    "any vegan recipe ideas?",
+    "what is protein",
+    "tell me about magnesium",
+    "benefits of fiber",
+    "i eat a lot of carbs",
+    "how many calories in an apple",
+    "is chicken breast good for me",
+    "what about sweet potato and broccoli",
+    "is a diet soda ok",
+    "i want to lose weight on a diet",
+    "is keto a good diet",
+    "how do i start healthy eating",
+    "what is a healthy diet",
+    "add a glass of water",
+    "track my water",
+    "what should i have for breakfast on a diet",
+    "ideas for a morning meal",
+    "hello there",
+    "thanks, that was helpful",
+]
+
+
+def synthetic_food_name(i, rng):
+    return f"{rng.choice(PREPARATIONS)} {rng.choice(BASES)} {i}"
+
+
+def synthetic_food_data(n, seed=0, base=None):
+    """Return a food_data-shaped dict with n entries, starting with the entries of base"""
+    rng = random.Random(seed)
+    foods = dict(base or {})
+    i = 0
+    while len(foods) < n:
+        foods[synthetic_food_name(i, rng)] = {
+            "calories": rng.randint(10, 600),
+            "protein": round(rng.uniform(0, 40), 1),
+            "carbs": round(rng.uniform(0, 80), 1),
+            "fat": round(rng.uniform(0, 50), 1),
+            "fiber": round(rng.uniform(0, 15), 1),
+            "category": rng.choice(CATEGORIES),
+        }
+        i += 1
+    return foods
+
+
+NUTRIENT_KINDS = ["vitamin", "mineral", "amino acid", "fatty acid", "polyphenol", "carotenoid", "enzyme"]
+
+
+def synthetic_nutrition_facts(n, seed=0, base=None):
+    """Return a nutrition_facts-shaped dict with n entries, starting with the entries of base"""
+    rng = random.Random(seed)
+    facts = dict(base or {})
+    i = 0
+    while len(facts) < n:
+        kind = rng.choice(NUTRIENT_KINDS)
+        facts[f"{kind} {rng.choice(BASES)} {i}"] = (
+            f"A {kind} found in {rng.choice(CATEGORIES)} foods. Supports "
+            f"{rng.choice(['energy metabolism', 'bone health', 'immune function', 'digestion', 'heart health'])}.")
+        i += 1
+    return facts
+
+DIET_TYPES = ["vegetarian", "vegan", "keto", "paleo", "gluten-free"]
+MEAL_TYPES = ["breakfast", "lunch", "dinner"]
+UNITS = ["cup", "cups", "tbsp", "tsp", "g", "oz", "slice", "clove"]
+INGREDIENTS = ["quinoa", "brown rice", "oats", "chicken breast", "salmon", "eggs", "greek yogurt",
+               "almond milk", "peanut butter", "cheddar cheese", "olive oil", "spinach", "broccoli",
+               "sweet potato", "lentils", "chickpeas", "tofu", "avocado", "banana", "berries",
+               "walnuts", "almonds", "shrimp", "wheat flour", "soy sauce", "butter", "honey",
+               "garlic", "onion", "tomato", "bell pepper", "mushrooms", "nutmeg", "coconut milk"]
+
+
+def synthetic_recipes(n, seed=0):
+    """Return n recipes in the load_recipes layout"""
+    rng = random.Random(seed)
+    recipes = []
+    for i in range(n):
+        ingredients = [f"{rng.randint(1, 4)} {rng.choice(UNITS)} {item}"
+                       for item in rng.sample(INGREDIENTS, rng.randint(3, 9))]
+        calories = rng.randint(150, 900)
+        protein, carbs, fat = rng.randint(2, 60), rng.randint(0, 110), rng.randint(1, 50)
+        recipes.append({
+            "name": f"{rng.choice(PREPARATIONS).capitalize()} {rng.choice(INGREDIENTS)} bowl {i}",
+            "ingredients": ingredients,
+            "instructions": "1. Prepare the ingredients\n2. Cook and combine\n3. Serve",
+            "nutritional_info": f"Calories: {calories}, Protein: {protein}g, Carbs: {carbs}g, "
+                                f"Fat: {fat}g, Fiber: {rng.randint(0, 15)}g",
+            "diet_types": rng.sample(DIET_TYPES, rng.randint(0, 3)),
+            "meal_type": rng.choice(MEAL_TYPES),
+        })
+    return recipes
+
+
+PROFILES = [
+    {"goal": goal, "preferences": preferences, "allergies": allergies}
+    for goal in ["weight loss", "muscle gain", "maintenance"]
+    for preferences in [[], ["vegetarian"], ["keto", "paleo"], ["vegan", "gluten-free"]]
+    for allergies in [[], ["nuts"], ["dairy", "eggs"], ["shrimp", "soy", "wheat"]]
+]
+
+# Calorie and macro targets of the bundled meal plans
+BASE_PLANS = load_meal_plans()
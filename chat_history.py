@@ -0,0 +1,65 @@
+import json
+import zlib
+from collections import deque
+
+
+class ChatHistory:
+    """Chat transcript that keeps only the newest messages live.
+
+    Messages that fall out of the live window are spilled, page_size at a
+    time, into zlib-compressed JSON pages. The UI renders the live window on
+    every rerun and decompresses older messages only when the user asks to
+    load them, so rerun cost does not grow with the conversation.
+    """
+
+    def __init__(self, live_limit=50, page_size=50):
+        self.live_limit = live_limit
+        self.page_size = page_size
+        self._live = deque()
+        self._pending = []
+        self._pages = []
+
+    def __len__(self):
+        return len(self._pages) * self.page_size + len(self._pending) + len(self._live)
+
+    def __iter__(self):
+        yield from self.earlier(self.earlier_count)
+        yield from self._live
+
+    def append(self, message):
+        self._live.append(message)
+        if len(self._live) > self.live_limit:
+            self._pending.append(self._live.popleft())
+            if len(self._pending) == self.page_size:
+                self._pages.append(zlib.compress(json.dumps(self._pending).encode("utf-8")))
+                self._pending = []
+
+    def clear(self):
+        self._live.clear()
+        self._pending = []
+        self._pages = []
+
+    @property
+    def live(self):
+        return list(self._live)
+
+    @property
+    def earlier_count(self):
+        """Number of messages outside the live window"""
+        return len(self._pages) * self.page_size + len(self._pending)
+
+    def earlier(self, count):
+        """The newest `count` messages from before the live window, oldest first"""
+        count = min(count, self.earlier_count)
+        messages = self._pending[max(0, len(self._pending) - count):]
+        page = len(self._pages)
+        while len(messages) < count:
+            page -= 1
+            older = json.loads(zlib.decompress(self._pages[page]))
+            messages = older[max(0, len(older) - (count - len(messages))):] + messages
+        return messages
+
+    @property
+    def stored_bytes(self):
+        """Bytes held by the compressed pages"""
+        return sum(len(page) for page in self._pages)
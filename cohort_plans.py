@@ -0,0 +1,141 @@
+"""Meal plans for a whole cohort of profiles, spread over worker processes.
+
+    python cohort_plans.py profiles.jsonl -o plans.jsonl [--days 7] [--optimize] [--seed 0] [--workers 4]
+
+Each input line is a profile such as {"id": "c-001", "goal": "Weight Loss",
+"dietary_preferences": ["vegetarian"], "allergies": ["nuts"]} ("preferences"
+is accepted too; a missing id becomes the line number). Each output line is
+{"id": ..., "plan": {...}} with the layout of NutriBot.generate_meal_plan.
+
+Profiles with the same goal, preferences and allergies are grouped, so
+recipes are filtered once per group instead of once per profile, and groups
+are cut into chunks that worker processes plan and serialize independently.
+The engine is built before the pool starts, so forked workers share its
+recipe data copy-on-write instead of loading their own. Every plan is
+seeded from --seed and the profile id, so the output does not depend on the
+number of workers. Plans come out grouped, in the order each group's first
+profile appears in the input.
+"""
+import argparse
+import gc
+import json
+import multiprocessing
+import os
+import sys
+import time
+import zlib
+
+from nutribot_engine import NutriBot, UserProfile
+
+# Profiles per task sent to a worker
+CHUNK_SIZE = 256
+
+# The engine forked workers plan with, set just before the pool starts
+_engine = None
+
+
+def read_profiles(lines):
+    """(id, UserProfile) for each non-blank JSON line; a line that is not a JSON object raises ValueError"""
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError as error:
+            raise ValueError(f"line {number}: {error}") from None
+        if not isinstance(data, dict):
+            raise ValueError(f"line {number}: expected a JSON object, got {type(data).__name__}")
+        if "preferences" in data and "dietary_preferences" not in data:
+            data["dietary_preferences"] = data["preferences"]
+        yield data.get("id", number), UserProfile.from_dict(data)
+
+
+def profile_seed(seed, profile_id):
+    """Seed of one profile's plan, independent of where it lands in the cohort"""
+    return zlib.crc32(f"{seed}:{profile_id}".encode("utf-8"))
+
+
+def group_key(profile):
+    return (profile.goal or "maintenance", tuple(sorted(set(profile.dietary_preferences))),
+            tuple(sorted(set(profile.allergies))))
+
+
+def chunks(profiles, size=CHUNK_SIZE):
+    """Lists of (id, profile) sharing a group key, at most size long"""
+    groups = {}
+    for profile_id, profile in profiles:
+        groups.setdefault(group_key(profile), []).append((profile_id, profile))
+    for members in groups.values():
+        for start in range(0, len(members), size):
+            yield members[start:start + size]
+
+
+def plan_chunk(engine, chunk, days, optimize, seed):
+    """JSON lines for one chunk; its profiles share a single recipe filter"""
+    plans = engine.generate_meal_plans([profile for _, profile in chunk], days, optimize,
+                                       seeds=[profile_seed(seed, profile_id) for profile_id, _ in chunk])
+    return [json.dumps({"id": profile_id, "plan": plan}) for (profile_id, _), plan in zip(chunk, plans)]
+
+
+def _plan_chunk(task):
+    return plan_chunk(_engine, *task)
+
+
+def plan_cohort(profiles, engine=None, days=7, optimize=False, seed=0, workers=None, chunk_size=CHUNK_SIZE):
+    """Yield a JSON line per (id, UserProfile), planned by workers processes (default: one per CPU)"""
+    global _engine
+    engine = engine or NutriBot()
+    workers = workers or os.cpu_count() or 1
+    tasks = [(chunk, days, optimize, seed) for chunk in chunks(profiles, chunk_size)]
+    if workers == 1 or len(tasks) == 1 or "fork" not in multiprocessing.get_all_start_methods():
+        for task in tasks:
+            yield from plan_chunk(engine, *task)
+        return
+
+    # Build the shared indexes once, then keep the garbage collector from
+    # touching (and so copying) their pages in every worker
+    engine.recipe_index
+    if optimize:
+        engine.meal_optimizer
+    _engine = engine
+    gc.freeze()
+    try:
+        with multiprocessing.get_context("fork").Pool(workers) as pool:
+            for lines in pool.imap(_plan_chunk, tasks):
+                yield from lines
+    finally:
+        gc.unfreeze()
+        _engine = None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate NutriBot meal plans for a cohort of profiles")
+    parser.add_argument("profiles", help="JSON lines file of profiles, or - for stdin")
+    parser.add_argument("-o", "--output", help="JSON lines file to write (default: stdout)")
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--optimize", action="store_true", help="match each day to the goal's calories and macros")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    source = sys.stdin if args.profiles == "-" else open(args.profiles, encoding="utf-8")
+    with source:
+        try:
+            profiles = list(read_profiles(source))
+        except ValueError as error:
+            parser.error(f"{args.profiles}: {error}")
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    start = time.perf_counter()
+    with out:
+        for line in plan_cohort(profiles, days=args.days, optimize=args.optimize, seed=args.seed,
+                                workers=args.workers, chunk_size=args.chunk_size):
+            out.write(line + "\n")
+    elapsed = time.perf_counter() - start
+    groups = len({group_key(profile) for _, profile in profiles})
+    print(f"Planned {len(profiles)} profiles in {groups} groups in {elapsed:.2f} s "
+          f"({len(profiles) / elapsed:,.0f} profiles/s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
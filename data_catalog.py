@@ -0,0 +1,207 @@
+"""Hot-reloadable engine data: watched data files, immutable snapshots and atomic swaps.
+
+    catalog = DataCatalog.from_directory("data", response_cache=ResponseCache())
+    catalog.start()                       # watch the files in a background thread
+    engine = catalog.engine               # the current snapshot's NutriBot
+    engine.respond("what is protein", profile)
+
+    python data_catalog.py export data/   # write the bundled datasets as JSON to start from
+
+Each dataset (foods, nutrition facts, recipes, meal plans) comes from its
+own file, or from the bundled data in nutribot_engine while that file does
+not exist. Every interval seconds the watcher compares each file's
+modification time, size and inode with the current snapshot's. The
+datasets that changed are read and a new engine is built from the current
+one with NutriBot.replace_data, which keeps every index and cached reply
+that does not depend on them. The indexes the current engine had already
+built are rebuilt before the swap, all on the watcher thread, so no
+request waits for them. The new snapshot then replaces the old one in a
+single assignment. Callers take catalog.engine once per request and keep
+using it, so a request that started on the old snapshot finishes on it.
+
+A file that fails to load (half written, invalid JSON) leaves the current
+snapshot serving; it is retried at the next change. Reloads are counted
+in nutribot_data_reload_total by result and timed in
+nutribot_data_reload_seconds; nutribot_data_snapshot_version counts the
+snapshots served, so it equals catalog.version. Write files to a temporary
+name and rename them into place so a reload never sees half a file.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from collections import namedtuple
+
+from metrics import METRICS
+from nutribot_engine import NutriBot, load_food_data, load_meal_plans, load_nutrition_facts, load_recipes
+
+# File each dataset is read from inside a data directory, and what is served while it is missing
+DATASETS = {
+    "food_data": ("foods.json", load_food_data),
+    "nutrition_facts": ("nutrition_facts.json", load_nutrition_facts),
+    "recipes": ("recipes.json", load_recipes),
+    "meal_plans": ("meal_plans.json", load_meal_plans),
+}
+
+# Seconds between checks of the data files
+RELOAD_INTERVAL = 2.0
+
+Snapshot = namedtuple("Snapshot", ["version", "engine", "signatures", "loaded_at"])
+
+
+def file_signature(path):
+    """What a change to a file changes: modification time, size and inode; None while it does not exist"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+def read_dataset(name, path):
+    """A dataset from its file: JSON, or for foods also a database built with `python food_db.py build`"""
+    if path is None or not os.path.exists(path):
+        return DATASETS[name][1]()
+    if name == "food_data" and not path.endswith(".json"):
+        from food_db import FoodDatabase
+        return FoodDatabase.open(path)
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+class DataCatalog:
+    def __init__(self, paths, metrics=None, interval=RELOAD_INTERVAL, **engine_options):
+        self.paths = {name: paths.get(name) for name in DATASETS}
+        self.metrics = metrics if metrics is not None else METRICS
+        self.interval = interval
+        self.reloads = 0
+        self.errors = 0
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._watcher = None
+        signatures = self._signatures()
+        datasets = {name: read_dataset(name, path) for name, path in self.paths.items()}
+        engine = NutriBot(metrics=self.metrics, **datasets, **engine_options)
+        self.snapshot = Snapshot(1, engine, signatures, time.time())
+        self.metrics.inc("nutribot_data_snapshot_version")
+
+    @classmethod
+    def from_directory(cls, directory, food_db_path=None, **kwargs):
+        """Catalog over the DATASETS files in a directory; food_db_path serves foods from a food database instead"""
+        paths = {name: os.path.join(directory, filename) for name, (filename, _) in DATASETS.items()}
+        if food_db_path:
+            paths["food_data"] = food_db_path
+        return cls(paths, **kwargs)
+
+    @property
+    def engine(self):
+        return self.snapshot.engine
+
+    @property
+    def version(self):
+        return self.snapshot.version
+
+    def _signatures(self):
+        return {name: file_signature(path) if path else None for name, path in self.paths.items()}
+
+    def reload(self):
+        """Load the datasets whose files changed and swap in a new snapshot; returns their names
+
+        Raises whatever reading a file or building an index raised, after
+        counting it; the current snapshot stays in place.
+        """
+        with self._lock:
+            current = self.snapshot
+            signatures = self._signatures()
+            changed = [name for name in DATASETS if signatures[name] != current.signatures[name]]
+            if not changed:
+                return []
+            label = ",".join(changed)
+            try:
+                with self.metrics.timer("nutribot_data_reload_seconds", datasets=label):
+                    datasets = {name: read_dataset(name, self.paths[name]) for name in changed}
+                    engine = current.engine.replace_data(**datasets)
+                    # Rebuild here what requests on the current snapshot already use, not on their first call
+                    for name in current.engine.built_indexes():
+                        getattr(engine, name)
+            except Exception as exc:
+                self.errors += 1
+                self.last_error = f"{label}: {exc!r}"
+                self.metrics.inc("nutribot_data_reload_total", result="error")
+                raise
+            self.snapshot = Snapshot(current.version + 1, engine, signatures, time.time())
+            self.reloads += 1
+            self.metrics.inc("nutribot_data_reload_total", result="ok")
+            self.metrics.inc("nutribot_data_snapshot_version")
+            return changed
+
+    def start(self):
+        """Check the data files every interval seconds on a background thread"""
+        if self._watcher is None:
+            self._watcher = threading.Thread(target=self._watch, name="data-catalog-watch", daemon=True)
+            self._watcher.start()
+        return self
+
+    def close(self):
+        self._closed.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+    def _watch(self):
+        failed = None
+        while not self._closed.wait(self.interval):
+            signatures = self._signatures()
+            if signatures == failed:
+                continue
+            try:
+                self.reload()
+                failed = None
+            except Exception:
+                # Keep serving the current snapshot; try again once a file changes
+                failed = signatures
+                print(f"Data reload failed, still serving version {self.version}: {self.last_error}",
+                      file=sys.stderr)
+
+    def stats(self):
+        snapshot = self.snapshot
+        return {
+            "version": snapshot.version,
+            "loaded_at": snapshot.loaded_at,
+            "reloads": self.reloads,
+            "errors": self.errors,
+            "last_error": self.last_error,
+            "files": {name: path for name, path in self.paths.items() if snapshot.signatures[name] is not None},
+        }
+
+
+def export(directory):
+    """Write the bundled datasets to a directory as the files a catalog watches, without replacing any"""
+    os.makedirs(directory, exist_ok=True)
+    written = []
+    for name, (filename, load) in DATASETS.items():
+        path = os.path.join(directory, filename)
+        if not os.path.exists(path):
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(load(), f, indent=2, ensure_ascii=False)
+            written.append(path)
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage NutriBot data catalog files")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export_command = commands.add_parser("export", help="write the bundled datasets as JSON, keeping existing files")
+    export_command.add_argument("directory")
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        written = export(args.directory)
+        print(f"Wrote {len(written)} of {len(DATASETS)} data files to {args.directory}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""Compact, memory-mapped on-disk food database.
+
+Build a database from CSV or JSON input:
+
+    python food_db.py build foods.csv foods.nfdb
+
+CSV input needs a header with name, calories, protein, carbs, fat, fiber and
+category columns. JSON input is either the {name: {...}} layout returned by
+load_food_data or a list of records with a "name" field.
+
+Opening a database only maps the file and reads the fixed-size header, so
+startup cost does not depend on the number of rows, and every process that
+opens the same file shares its pages through the OS page cache. Records are
+decoded on access.
+
+Writes go to a temporary file that then replaces the target, so processes
+that have the old file mapped keep reading it (its inode lives on until
+they let go), and a watcher sees one complete new file.
+"""
+import argparse
+import csv
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import zlib
+from collections.abc import Mapping, Sequence
+from functools import cached_property
+
+import numpy as np
+
+from food_store import NUTRIENT_COLUMNS, FoodStore
+
+MAGIC = b"NFDB"
+VERSION = 1
+# magic, version, column count, rows, hash slots,
+# offsets of: name offsets, name blob, columns, category codes, categories, hash slots
+HEADER = struct.Struct("<4sHHIIQQQQQQ")
+
+
+def _align(offset):
+    return (offset + 7) & ~7
+
+
+def _slot(key, slots):
+    return zlib.crc32(key) & (slots - 1)
+
+
+class _NameTable(Sequence):
+    """Food names decoded from the UTF-8 blob one at a time"""
+
+    def __init__(self, offsets, blob):
+        self._offsets = offsets
+        self._blob = blob
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [self[i] for i in range(*row.indices(len(self)))]
+        if row < 0:
+            row += len(self)
+        return self.raw(row).decode("utf-8")
+
+    def raw(self, row):
+        return bytes(self._blob[self._offsets[row]:self._offsets[row + 1]])
+
+    @cached_property
+    def longest(self):
+        """Length in bytes of the longest name, at least its length in characters"""
+        return int(np.diff(self._offsets).max()) if len(self) else 0
+
+
+class _HashIndex:
+    """Name -> row lookups through the on-disk open-addressing table"""
+
+    def __init__(self, slots, names):
+        self._slots = slots
+        self._names = names
+
+    def get(self, name, default=None):
+        key = name.encode("utf-8")
+        mask = len(self._slots) - 1
+        slot = _slot(key, len(self._slots))
+        while True:
+            entry = int(self._slots[slot])
+            if entry == 0:
+                return default
+            if self._names.raw(entry - 1) == key:
+                return entry - 1
+            slot = (slot + 1) & mask
+
+    def __contains__(self, name):
+        return self.get(name) is not None
+
+    @property
+    def longest(self):
+        return self._names.longest
+
+
+class FoodDatabase(Mapping):
+    """Read-only {name: info} mapping over a memory-mapped database file"""
+
+    def __init__(self, buffer, mapped=None):
+        self._mapped = mapped
+        magic, version, column_count, rows, slots, names_at, blob_at, columns_at, codes_at, categories_at, hash_at = \
+            HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise ValueError("not a NutriBot food database")
+        if version != VERSION:
+            raise ValueError(f"unsupported food database version {version}")
+        if column_count != len(NUTRIENT_COLUMNS):
+            raise ValueError(f"expected {len(NUTRIENT_COLUMNS)} nutrient columns, found {column_count}")
+
+        offsets = np.frombuffer(buffer, dtype="<u8", count=rows + 1, offset=names_at)
+        names = _NameTable(offsets, memoryview(buffer)[blob_at:columns_at])
+        columns = {column: np.frombuffer(buffer, dtype="<f8", count=rows, offset=columns_at + 8 * rows * i)
+                   for i, column in enumerate(NUTRIENT_COLUMNS)}
+        codes = np.frombuffer(buffer, dtype="<i2", count=rows, offset=codes_at)
+        categories = json.loads(bytes(memoryview(buffer)[categories_at:hash_at]).rstrip(b"\0").decode("utf-8"))
+        index = _HashIndex(np.frombuffer(buffer, dtype="<u4", count=slots, offset=hash_at), names)
+        self.store = FoodStore(names, columns, codes, categories, index=index)
+
+    @classmethod
+    def open(cls, path):
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(mapped, mapped)
+
+    def __getitem__(self, name):
+        info = self.store.get(name)
+        if info is None:
+            raise KeyError(name)
+        return info
+
+    def __contains__(self, name):
+        return name in self.store
+
+    def __iter__(self):
+        return iter(self.store.names)
+
+    def __len__(self):
+        return len(self.store)
+
+
+def write_database(foods, path):
+    """Write a {name: info} mapping in the on-disk format, replacing path in one step"""
+    names = list(foods)
+    encoded = [name.encode("utf-8") for name in names]
+    offsets = np.zeros(len(names) + 1, dtype="<u8")
+    offsets[1:] = np.cumsum([len(key) for key in encoded])
+    blob = b"".join(encoded)
+
+    categories = list(dict.fromkeys(foods[name]["category"] for name in names))
+    lookup = {category: code for code, category in enumerate(categories)}
+    codes = np.fromiter((lookup[foods[name]["category"]] for name in names), dtype="<i2", count=len(names))
+    columns = np.empty((len(NUTRIENT_COLUMNS), len(names)), dtype="<f8")
+    for i, column in enumerate(NUTRIENT_COLUMNS):
+        columns[i] = np.fromiter((foods[name][column] for name in names), dtype=np.float64, count=len(names))
+
+    slots = 8
+    while slots < 2 * len(names):
+        slots *= 2
+    table = np.zeros(slots, dtype="<u4")
+    for row, key in enumerate(encoded):
+        slot = _slot(key, slots)
+        while table[slot]:
+            slot = (slot + 1) & (slots - 1)
+        table[slot] = row + 1
+
+    category_blob = json.dumps(categories).encode("utf-8")
+    names_at = _align(HEADER.size)
+    blob_at = names_at + offsets.nbytes
+    columns_at = _align(blob_at + len(blob))
+    codes_at = columns_at + columns.nbytes
+    categories_at = codes_at + codes.nbytes
+    hash_at = _align(categories_at + len(category_blob))
+
+    # Never rewrite the target in place: a process that has it mapped would fault on the truncated pages
+    fd, temporary = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix=".food_db-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, len(NUTRIENT_COLUMNS), len(names), slots,
+                                names_at, blob_at, columns_at, codes_at, categories_at, hash_at))
+            for offset, chunk in ((names_at, offsets.tobytes()), (blob_at, blob), (columns_at, columns.tobytes()),
+                                  (codes_at, codes.tobytes()), (categories_at, category_blob),
+                                  (hash_at, table.tobytes())):
+                f.write(b"\0" * (offset - f.tell()))
+                f.write(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(temporary, 0o644)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+def read_source(path):
+    """Read foods from a CSV or JSON file into the load_food_data layout"""
+    if path.endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        # Names are looked up lowercased, so they are stored that way whatever the file says
+        if isinstance(data, dict):
+            return {name.strip().lower(): info for name, info in data.items()}
+        return {record["name"].strip().lower(): {key: value for key, value in record.items() if key != "name"}
+                for record in data}
+
+    foods = {}
+    with open(path, newline="", encoding="utf-8") as f:
+        for record in csv.DictReader(f):
+            info = {column: float(record[column] or 0) for column in NUTRIENT_COLUMNS}
+            info["category"] = record.get("category", "")
+            foods[record["name"].strip().lower()] = info
+    return foods
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage NutriBot food database files")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="convert CSV or JSON food data to a database file")
+    build.add_argument("source")
+    build.add_argument("output")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        foods = read_source(args.source)
+        write_database(foods, args.output)
+        print(f"Wrote {len(foods)} foods to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
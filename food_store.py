@@ -0,0 +1,101 @@
+import numpy as np
+
+NUTRIENT_COLUMNS = ["calories", "protein", "carbs", "fat", "fiber"]
+
+
+def _to_python(value):
+    # Give back what the dict loader had: 95 rather than 95.0
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+
+class FoodStore:
+    """Column-oriented food table: one NumPy array per nutrient plus a name -> row index
+
+    names and index may be lazy objects (see food_db.FoodDatabase); index only
+    needs get() and membership tests.
+    """
+
+    def __init__(self, names, columns, category_codes, categories, index=None):
+        if index is None:
+            names = list(names)
+            index = {name: row for row, name in enumerate(names)}
+        self.names = names
+        self.index = index
+        self.columns = {column: np.asarray(values, dtype=np.float64) for column, values in columns.items()}
+        self.category_codes = np.asarray(category_codes, dtype=np.int16)
+        self.categories = list(categories)
+        self._category_lookup = {category: code for code, category in enumerate(self.categories)}
+
+    @classmethod
+    def from_dict(cls, foods):
+        """Build a store from the {name: {"calories": ..., "category": ...}} layout of load_food_data"""
+        names = list(foods)
+        columns = {column: np.fromiter((foods[name][column] for name in names), dtype=np.float64, count=len(names))
+                   for column in NUTRIENT_COLUMNS}
+        categories = list(dict.fromkeys(foods[name]["category"] for name in names))
+        lookup = {category: code for code, category in enumerate(categories)}
+        codes = np.fromiter((lookup[foods[name]["category"]] for name in names), dtype=np.int16, count=len(names))
+        return cls(names, columns, codes, categories)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.index
+
+    @property
+    def nbytes(self):
+        return sum(values.nbytes for values in self.columns.values()) + self.category_codes.nbytes
+
+    def get(self, name):
+        """Row for one food as a plain dict, or None if the food is unknown"""
+        row = self.index.get(name)
+        if row is None:
+            return None
+        info = {column: _to_python(values[row]) for column, values in self.columns.items()}
+        info["category"] = self.categories[self.category_codes[row]]
+        return info
+
+    def mask(self, category=None, minimum=None, maximum=None):
+        """Boolean row mask, e.g. mask(minimum={"fiber": 5}) for all foods with fiber >= 5g"""
+        selected = np.ones(len(self.names), dtype=bool)
+        if category is not None:
+            code = self._category_lookup.get(category)
+            if code is None:
+                return np.zeros(len(self.names), dtype=bool)
+            selected &= self.category_codes == code
+        for column, bound in (minimum or {}).items():
+            selected &= self.columns[column] >= bound
+        for column, bound in (maximum or {}).items():
+            selected &= self.columns[column] <= bound
+        return selected
+
+    def select(self, category=None, minimum=None, maximum=None):
+        """Names of all foods matching the filters, in load order"""
+        rows = np.flatnonzero(self.mask(category, minimum, maximum))
+        return [self.names[row] for row in rows]
+
+    def top(self, column, n=10, per=None, category=None, minimum=None, maximum=None):
+        """Top-n foods by column, optionally as a ratio, e.g. top("protein", per="calories", category="protein").
+
+        Returns (name, score) pairs, best first. Rows where the ratio's
+        denominator is zero are skipped.
+        """
+        selected = self.mask(category, minimum, maximum)
+        scores = self.columns[column]
+        if per is not None:
+            denominator = self.columns[per]
+            selected &= denominator != 0
+            scores = np.divide(scores, denominator, out=np.zeros_like(scores), where=denominator != 0)
+        rows = np.flatnonzero(selected)
+        if len(rows) == 0:
+            return []
+        candidates = scores[rows]
+        if n < len(rows):
+            part = np.sort(np.argpartition(-candidates, n - 1)[:n])
+        else:
+            part = np.arange(len(rows))
+        # Stable sort on the selected slice so ties keep load order
+        order = part[np.argsort(-candidates[part], kind="stable")]
+        return [(self.names[rows[i]], float(candidates[i])) for i in order]
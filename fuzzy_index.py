@@ -0,0 +1,260 @@
+"""Typo-tolerant lookup of food and nutrient names through a trigram index.
+
+Names are compared by the Dice coefficient of their trigram sets (each
+name is padded as "  name " so word starts weigh a little more). The index
+keeps a sorted posting array per trigram and the trigram ids of every key.
+A query only reads the postings of its rarest trigrams and keeps the keys
+that turn up in several of them, then counts the trigrams those candidates
+share with the query from their own trigram lists. The long postings of
+common trigrams are never read.
+
+A key is found when it lacks at most MAX_MISSING of the query's trigrams
+(fewer if the threshold demands it); one typo changes at most four.
+
+Scanning a message, single words get two extra checks. Words of up to
+SHORT_WORD letters share too few trigrams to tell a typo from another
+word, so everyday ones ("fate", "oath") are left alone and the rest must
+be one edit from the key. A swapped pair of letters can cost a short name
+half its trigrams ("protien"), so a word with no match has each of its
+adjacent swaps looked up as an exact name.
+"""
+import math
+import re
+from collections import namedtuple
+
+import numpy as np
+
+Candidate = namedtuple("Candidate", ["key", "score"])
+Span = namedtuple("Span", ["key", "score", "start", "end"])
+
+DEFAULT_THRESHOLD = 0.6
+
+# Query trigrams a key may lack and still be considered
+MAX_MISSING = 4
+
+# Rare postings a candidate must appear in before its trigrams are counted
+CANDIDATE_HITS = 3
+
+# Longest run of words tried as one name when scanning a message
+MAX_SPAN_WORDS = 4
+
+# Question words that never start or end a food or nutrient name
+STOP_WORDS = {
+    "a", "about", "an", "and", "any", "are", "benefits", "calorie", "calories", "can", "do", "does",
+    "eat", "for", "give", "good", "how", "i", "in", "info", "information", "is", "many", "me", "much",
+    "my", "of", "on", "or", "please", "show", "some", "tell", "the", "there", "to", "what", "with", "you",
+}
+
+# Words this long or shorter are only corrected within one edit, and never when they are everyday words
+SHORT_WORD = 4
+
+# Everyday short words that are not misspelled names, however many trigrams they share with one ("fate", "oath")
+COMMON_WORDS = {
+    "able", "ache", "act", "acts", "add", "age", "aged", "ago", "aid", "aim", "air", "all", "also", "and",
+    "any", "area", "arm", "arms", "army", "art", "ask", "ate", "away", "baby", "back", "bad", "bag", "ball",
+    "band", "bank", "bar", "bare", "base", "bat", "bath", "bay", "bear", "beat", "bed", "been", "bell",
+    "belt", "bend", "best", "bet", "big", "bike", "bill", "bin", "bird", "bit", "bite", "blow", "blue",
+    "boat", "body", "bold", "bone", "book", "boot", "born", "boss", "both", "bowl", "box", "boy", "bus",
+    "busy", "but", "buy", "bye", "cab", "call", "calm", "came", "camp", "can", "cap", "car", "card", "care",
+    "case", "cash", "cast", "cat", "cell", "chat", "city", "club", "coat", "code", "cold", "come", "cool",
+    "copy", "cost", "cow", "crew", "cry", "cup", "cure", "cut", "cute", "dad", "dark", "data", "day",
+    "dead", "deal", "dear", "debt", "deep", "desk", "did", "die", "diet", "dig", "dish", "does", "dog",
+    "done", "door", "dot", "down", "draw", "drew", "drop", "drug", "dry", "due", "dust", "duty", "each",
+    "ear", "earn", "ease", "east", "easy", "edge", "else", "end", "era", "eve", "even", "ever", "exam",
+    "eye", "face", "fact", "fail", "fair", "fake", "fall", "fame", "fan", "far", "farm", "fast", "fate",
+    "feat", "feel", "feet", "fell", "felt", "few", "file", "fill", "film", "find", "fine", "fire", "firm",
+    "fist", "fit", "five", "fix", "flag", "flat", "flew", "flow", "fly", "folk", "fond", "food", "fool",
+    "foot", "for", "form", "fort", "four", "fox", "free", "from", "fuel", "full", "fun", "fund", "fur",
+    "gain", "game", "gap", "gas", "gate", "gave", "gear", "get", "gift", "girl", "give", "glad", "goal",
+    "god", "goes", "gold", "golf", "gone", "good", "got", "grab", "gray", "grew", "grow", "gun", "guy",
+    "hair", "half", "hall", "hand", "hang", "hard", "harm", "hat", "hate", "have", "head", "heal", "hear",
+    "heat", "held", "hell", "help", "her", "here", "hero", "hid", "hide", "high", "hill", "him", "hint",
+    "hip", "hire", "his", "hit", "hold", "hole", "holy", "home", "hope", "host", "hot", "hour", "how",
+    "hug", "huge", "hung", "hunt", "hurt", "idea", "ill", "inch", "into", "item", "its", "jar", "job",
+    "join", "joke", "joy", "jump", "just", "keen", "keep", "kept", "key", "kick", "kid", "kind", "king",
+    "kiss", "kit", "knee", "knew", "know", "lab", "lack", "lady", "laid", "lake", "land", "lane", "lap",
+    "last", "late", "law", "lay", "lazy", "lead", "lean", "led", "left", "leg", "lend", "less", "let",
+    "lid", "lie", "life", "lift", "like", "line", "link", "lip", "list", "lit", "live", "load", "loan",
+    "lock", "long", "look", "lord", "lose", "loss", "lost", "lot", "loud", "love", "low", "luck", "mad",
+    "made", "mail", "main", "make", "male", "mall", "man", "many", "map", "mark", "mass", "mat", "mate",
+    "may", "meal", "mean", "meet", "men", "menu", "mere", "met", "mild", "mile", "mind", "mine", "miss",
+    "mix", "mode", "mom", "mood", "moon", "more", "most", "move", "much", "mud", "must", "name", "near",
+    "neat", "neck", "need", "net", "new", "news", "next", "nice", "nine", "nod", "none", "nor", "nose",
+    "not", "note", "now", "oath", "odd", "off", "okay", "old", "once", "one", "only", "open", "our", "out",
+    "oven", "over", "owe", "own", "pace", "pack", "pad", "page", "paid", "pain", "pair", "pale", "palm",
+    "pan", "park", "part", "pass", "past", "path", "peak", "pen", "per", "pet", "pick", "pile", "pin",
+    "pink", "pit", "plan", "play", "plot", "plus", "poem", "poet", "pole", "poll", "pool", "poor", "pop",
+    "port", "pose", "post", "pot", "pour", "pray", "pull", "pure", "push", "put", "race", "rain", "ran",
+    "rank", "rare", "rat", "rate", "raw", "read", "real", "red", "rely", "rent", "rest", "rich", "rid",
+    "ride", "ring", "rise", "risk", "road", "rock", "role", "roll", "roof", "room", "root", "rope", "rose",
+    "row", "rub", "rule", "run", "rush", "sad", "safe", "said", "sake", "sale", "same", "sand", "sat",
+    "save", "saw", "say", "sea", "seat", "see", "seek", "seem", "seen", "self", "sell", "send", "sent",
+    "set", "she", "ship", "shop", "shot", "show", "shut", "shy", "sick", "side", "sign", "sin", "sing",
+    "sit", "site", "six", "size", "ski", "skin", "sky", "slip", "slow", "snow", "soft", "soil", "sold",
+    "sole", "some", "son", "song", "soon", "sort", "soul", "spot", "spy", "star", "stay", "step", "stop",
+    "such", "suit", "sum", "sun", "sure", "tab", "tag", "take", "tale", "talk", "tall", "tank", "tap",
+    "tape", "task", "tax", "team", "tell", "ten", "tend", "term", "test", "text", "than", "that", "the",
+    "them", "then", "they", "thin", "this", "thus", "tidy", "tie", "till", "time", "tin", "tiny", "tip",
+    "toe", "told", "toll", "ton", "tone", "too", "took", "tool", "top", "tour", "town", "toy", "tree",
+    "trip", "true", "try", "tune", "turn", "twin", "two", "type", "unit", "upon", "use", "used", "user",
+    "van", "vast", "very", "vet", "via", "view", "vote", "wage", "wait", "wake", "walk", "wall", "want",
+    "war", "warm", "warn", "was", "wash", "wave", "way", "ways", "weak", "wear", "web", "week", "well",
+    "went", "were", "west", "wet", "what", "when", "who", "whom", "why", "wide", "wife", "wild", "will",
+    "win", "wind", "wing", "wire", "wise", "wish", "wit", "with", "won", "wood", "word", "wore", "work",
+    "yard", "yeah", "year", "yes", "yet", "you", "your", "zero", "zone", "zoo",
+}
+
+WORD = re.compile(r"[\w'-]+")
+
+
+def edit_distance(a, b):
+    """Insertions, deletions, substitutions and swaps of adjacent letters that turn a into b"""
+    before, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], before[j - 2] + 1)
+        before, previous = previous, current
+    return previous[-1]
+
+
+def trigrams(text):
+    padded = f"  {text.lower()} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class FuzzyIndex:
+    """Ranked approximate matches for a fixed list of keys"""
+
+    def __init__(self, keys, threshold=DEFAULT_THRESHOLD):
+        self.keys = list(keys)
+        self.threshold = threshold
+        vocabulary = {}
+        gram_ids = []
+        sizes = np.empty(len(self.keys), dtype=np.int32)
+        for key_id, key in enumerate(self.keys):
+            grams = trigrams(key)
+            sizes[key_id] = len(grams)
+            gram_ids.extend([vocabulary.setdefault(gram, len(vocabulary)) for gram in grams])
+
+        # Trigram ids of every key back to back, and each key's first position
+        self._key_grams = np.array(gram_ids, dtype=np.int32)
+        self._key_starts = np.zeros(len(self.keys), dtype=np.int64)
+        np.cumsum(sizes[:-1], out=self._key_starts[1:])
+        # A stable sort by trigram keeps each posting list in key order
+        order = np.argsort(self._key_grams, kind="stable")
+        self._postings = np.repeat(np.arange(len(self.keys), dtype=np.int32), sizes)[order]
+        self._offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self._key_grams, minlength=len(vocabulary)), out=self._offsets[1:])
+        self._vocabulary = vocabulary
+        self._sizes = sizes
+        self.max_words = max((len(key.split()) for key in self.keys), default=0)
+
+    def __len__(self):
+        return len(self.keys)
+
+    @property
+    def nbytes(self):
+        return (self._key_grams.nbytes + self._key_starts.nbytes + self._postings.nbytes
+                + self._offsets.nbytes + self._sizes.nbytes)
+
+    def lookup(self, text, limit=5, threshold=None):
+        """Up to limit keys whose similarity to text is at least threshold, best first"""
+        threshold = self.threshold if threshold is None else threshold
+        grams = trigrams(text)
+        size = len(grams)
+        known = [self._vocabulary[gram] for gram in grams if gram in self._vocabulary]
+        if not known:
+            return []
+
+        # Keys at or above the threshold have between smallest and largest
+        # trigrams and share at least overlap of them with the query
+        smallest = math.ceil(size * threshold / (2 - threshold) - 1e-9)
+        largest = math.floor(size * (2 - threshold) / threshold + 1e-9)
+        overlap = max(1, math.ceil(threshold * (size + smallest) / 2 - 1e-9))
+        # A key lacking at most `missing` query trigrams appears in at least
+        # k of any missing + k of their postings
+        missing = min(size - overlap, MAX_MISSING) - (size - len(known))
+        if missing < 0:
+            return []
+        known.sort(key=lambda gram_id: self._offsets[gram_id + 1] - self._offsets[gram_id])
+        needed = max(1, min(CANDIDATE_HITS, len(known) - missing))
+        rare = np.concatenate([self._postings[self._offsets[gram_id]:self._offsets[gram_id + 1]]
+                               for gram_id in known[:missing + needed]])
+        # Sorted, a key that turns up in `needed` postings starts a run of at least that many equal ids;
+        # cheaper than np.unique with counts, which the slowest queries spent most of their time in
+        rare.sort()
+        candidates = rare[needed - 1:][rare[needed - 1:] == rare[:len(rare) - needed + 1]]
+        if len(candidates) > 1:
+            candidates = candidates[np.concatenate(([True], candidates[1:] != candidates[:-1]))]
+        sizes = self._sizes[candidates]
+        fits = (sizes >= smallest) & (sizes <= largest)
+        candidates, sizes = candidates[fits], sizes[fits]
+        if not len(candidates):
+            return []
+
+        # Count shared trigrams from the candidates' own trigram lists
+        ends = np.cumsum(sizes)
+        positions = np.arange(ends[-1]) + np.repeat(self._key_starts[candidates] - (ends - sizes), sizes)
+        key_grams = self._key_grams[positions]
+        query = np.zeros(len(self._vocabulary), dtype=bool)
+        query[known] = True
+        shared = query[key_grams]
+        counts = np.add.reduceat(shared, ends - sizes, dtype=np.int32)
+
+        scores = 2.0 * counts / (size + sizes)
+        keep = scores >= threshold - 1e-9
+        candidates, scores = candidates[keep], scores[keep]
+        # Highest score first, earlier keys first among equal scores
+        order = np.lexsort((candidates, -scores))[:limit]
+        return [Candidate(self.keys[candidates[i]], float(scores[i])) for i in order]
+
+    def best(self, text, threshold=None):
+        matches = self.lookup(text, limit=1, threshold=threshold)
+        return matches[0] if matches else None
+
+    def best_word(self, word, threshold=None):
+        """Best key for a single word, with the short-word and transposition checks of find_in"""
+        word = word.lower()
+        short = len(word) <= SHORT_WORD
+        if short and word in COMMON_WORDS:
+            return None
+        match = self.best(word, threshold)
+        if match is not None and (not short or edit_distance(word, match.key.lower()) <= 1):
+            return match
+        # An exact lookup only reads the postings of a few rare trigrams, far cheaper than a looser threshold
+        for i in range(len(word) - 1):
+            if word[i] == word[i + 1]:
+                continue
+            swapped = word[:i] + word[i + 1] + word[i] + word[i + 2:]
+            match = self.best(swapped, threshold=1.0)
+            if match is not None and match.key.lower() == swapped:
+                grams, key_grams = trigrams(word), trigrams(match.key)
+                return Candidate(match.key, 2 * len(grams & key_grams) / (len(grams) + len(key_grams)))
+        return None
+
+    def find_in(self, text, threshold=None):
+        """Best-matching run of words in a message, as a Span with its character offsets"""
+        words = [m for m in WORD.finditer(text)]
+        best = None
+        for first in range(len(words)):
+            if words[first].group().lower() in STOP_WORDS:
+                continue
+            for last in range(first, min(first + min(self.max_words, MAX_SPAN_WORDS), len(words))):
+                if words[last].group().lower() in STOP_WORDS:
+                    continue
+                start, end = words[first].start(), words[last].end()
+                if end - start < 3:
+                    continue
+                if first == last:
+                    match = self.best_word(text[start:end], threshold)
+                else:
+                    match = self.best(text[start:end], threshold)
+                if match is None:
+                    continue
+                # Prefer the higher score, then the longer span
+                if best is None or (match.score, end - start) > (best.score, best.end - best.start):
+                    best = Span(match.key, match.score, start, end)
+        return best
@@ -0,0 +1,201 @@
+import re
+from collections import deque, namedtuple
+
+# Keywords the chat cascade looks for, besides food and nutrient names
+INTENT_KEYWORDS = [
+    "meal plan", "plan for",
+    "browse", "list recipes", "search recipes", "find recipes",
+    "recipe",
+    "what is", "tell me about", "benefits",
+    "diet", "weight loss", "protein",
+    "how much protein", "lose weight", "keto",
+    "healthy eating", "healthy diet",
+    "water", "track", "log", "add",
+    "breakfast", "morning meal",
+]
+
+# Diet types the recipe branch recognises, in priority order
+RECIPE_DIET_TYPES = ["vegetarian", "vegan", "keto", "paleo", "gluten-free"]
+
+Match = namedtuple("Match", ["keyword", "start", "end"])
+
+WORD_START = re.compile(r"\b\w")
+
+
+def whole_word(text, match):
+    """Whether a match is a word of its own in text, or one with a plural "s" ("fats", not "fate")"""
+    if match.start and text[match.start - 1].isalnum():
+        return False
+    after = text[match.end:match.end + 2]
+    if after[:1] == "s":
+        after = after[1:]
+    return not after[:1].isalnum()
+
+
+class AhoCorasick:
+    """Multi-pattern substring matcher built once from a fixed keyword list"""
+
+    def __init__(self, patterns):
+        goto = [{}]
+        output = {}
+        for pattern in patterns:
+            if not pattern:
+                continue
+            state = 0
+            for ch in pattern:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                state = nxt
+            output[state] = (pattern,)
+
+        # Breadth-first pass to wire failure links and merge outputs of suffixes
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, child in goto[state].items():
+                queue.append(child)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[child] = goto[f].get(ch, 0)
+                if fail[child] in output:
+                    output[child] = output.get(child, ()) + output[fail[child]]
+
+        self._goto = goto
+        self._fail = fail
+        self._output = output
+
+    def __len__(self):
+        return len(self._goto)
+
+    def find_all(self, text):
+        """Return every (possibly overlapping) keyword occurrence in text"""
+        goto, fail, output = self._goto, self._fail, self._output
+        matches = []
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if state in output:
+                for keyword in output[state]:
+                    matches.append(Match(keyword, i - len(keyword) + 1, i + 1))
+        return matches
+
+
+class IndexedNames:
+    """Finds the names of an on-disk name -> row index in a text without loading them
+
+    Every span that starts a word and ends on a letter or digit, up to the
+    longest name, is looked up. A name is found at the start of a word
+    ("apple" in "apples") but, unlike the automaton, not inside one ("apple"
+    in "pineapple").
+    """
+
+    def __init__(self, index):
+        self.index = index
+
+    def find_all(self, text):
+        get, longest = self.index.get, self.index.longest
+        matches = []
+        for word in WORD_START.finditer(text):
+            start = word.start()
+            for end in range(start + 1, min(len(text), start + longest) + 1):
+                if text[end - 1].isalnum() and get(text[start:end]) is not None:
+                    matches.append(Match(text[start:end], start, end))
+        return matches
+
+
+class Route:
+    """Result of routing one message: the winning intent plus every matched entity"""
+
+    def __init__(self, intent, matches, found, router):
+        self.intent = intent
+        self.matches = matches
+        self.found = found
+        self._router = router
+
+    def has(self, *keywords):
+        return any(keyword in self.found for keyword in keywords)
+
+    def first(self, group):
+        """First matched key of a group ('food', 'nutrient', 'diet') in its load order"""
+        ranks = self._router.ranks[group]
+        best = None
+        for keyword in self.found:
+            rank = ranks.get(keyword)
+            if rank is not None and (best is None or rank < best[0]):
+                best = (rank, keyword)
+        return best[1] if best else None
+
+    def entities(self, group):
+        """All matches of a group with their positions, in text order"""
+        ranks = self._router.ranks[group]
+        return [m for m in self.matches if m.keyword in ranks]
+
+
+class IntentRouter:
+    """Classifies chat messages in one pass over the text.
+
+    The branch priority mirrors the original if/elif cascade in
+    get_chatbot_response: meal plan, recipe, nutrition fact, food, diet,
+    healthy eating, water, breakfast, fallback. Recipe browsing ("browse",
+    "list recipes", ...) is checked just before recipe. Unlike the original
+    substring tests, a nutrient name only counts as a whole word.
+
+    food_index, a name -> row lookup such as a food database's hash index,
+    stands in for food_keys: food names then stay on disk and are looked up
+    span by span (see IndexedNames) instead of being compiled into the
+    automaton, so building the router does not depend on how many foods
+    there are.
+    """
+
+    def __init__(self, food_keys, nutrient_keys, food_index=None):
+        self.ranks = {
+            "food": food_index if food_index is not None else {key: i for i, key in enumerate(food_keys)},
+            "nutrient": {key: i for i, key in enumerate(nutrient_keys)},
+            "diet": {key: i for i, key in enumerate(RECIPE_DIET_TYPES)},
+        }
+        keywords = dict.fromkeys(INTENT_KEYWORDS)
+        for group, ranks in self.ranks.items():
+            if group != "food" or food_index is None:
+                keywords.update(dict.fromkeys(ranks))
+        self._matcher = AhoCorasick(keywords)
+        self._foods = IndexedNames(food_index) if food_index is not None else None
+
+    def route(self, user_input):
+        matches = self._matcher.find_all(user_input)
+        if self._foods is not None:
+            matches += self._foods.find_all(user_input)
+            matches.sort(key=lambda m: m.end)
+        # Nutrient names are short enough to turn up inside other words ("fat" in "fate", "iron" in
+        # "environment"), where the original substring test took them for the nutrient
+        nutrients = self.ranks["nutrient"]
+        matches = [m for m in matches if m.keyword not in nutrients or whole_word(user_input, m)]
+        found = {m.keyword for m in matches}
+        return Route(self._classify(found), matches, found, self)
+
+    def _classify(self, found):
+        if "meal plan" in found or "plan for" in found:
+            return "meal_plan"
+        if "browse" in found or "list recipes" in found or "search recipes" in found or "find recipes" in found:
+            return "browse"
+        if "recipe" in found:
+            return "recipe"
+        if any(keyword in self.ranks["nutrient"] for keyword in found):
+            return "nutrition"
+        if any(keyword in self.ranks["food"] for keyword in found):
+            return "food"
+        if "diet" in found or "weight loss" in found or "protein" in found:
+            return "diet"
+        if "healthy eating" in found or "healthy diet" in found:
+            return "healthy_eating"
+        if "water" in found and ("track" in found or "log" in found or "add" in found):
+            return "water"
+        if "breakfast" in found or "morning meal" in found:
+            return "breakfast"
+        return "fallback"
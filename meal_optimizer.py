@@ -0,0 +1,133 @@
+import time
+
+import numpy as np
+
+from food_store import NUTRIENT_COLUMNS
+
+NUTRIENTS = ["calories", "protein", "carbs", "fat"]
+CALORIES_PER_GRAM = {"protein": 4, "carbs": 4, "fat": 9}
+MEAL_SLOTS = ["breakfast", "lunch", "dinner"]
+
+# Random restarts tried per day once local search has converged
+MAX_RESTARTS = 50
+
+
+def daily_targets(base_plan):
+    """Calories and macro grams per day for a meal_plans entry"""
+    calories = base_plan["daily_calories"]
+    targets = [calories]
+    for macro in NUTRIENTS[1:]:
+        share = float(base_plan["macros"][macro].rstrip("%")) / 100
+        targets.append(calories * share / CALORIES_PER_GRAM[macro])
+    return np.array(targets, dtype=np.float64)
+
+
+class MealPlanOptimizer:
+    """Picks breakfast, lunch and dinner per day to land close to a plan's calorie and macro targets.
+
+    The error of a day is the sum of squared relative deviations of its
+    calories, protein, carbs and fat from the targets. Each day starts from
+    a greedy pick and is improved by coordinate descent (re-choosing one
+    meal against what the other two leave over), then by random restarts
+    until the day's share of the time budget runs out. Recipes already used
+    earlier in the plan are skipped while a slot has unused options left.
+    """
+
+    def __init__(self, recipe_index, recipe_nutrients):
+        self.index = recipe_index
+        # Per-serving figures of each recipe, from a RecipeNutrients over the same recipe list
+        self.nutrients = recipe_nutrients.matrix[:, [NUTRIENT_COLUMNS.index(nutrient) for nutrient in NUTRIENTS]]
+
+    def plan(self, targets, suitable, days=3, time_budget=0.15, seed=None):
+        """Return one (breakfast, lunch, dinner) tuple of recipe ids per day, or None if nothing is suitable.
+
+        suitable is a bitset from RecipeIndex.filter. Slots without recipes of
+        their meal type fall back to every suitable recipe, as generate_meal_plan does.
+        With time_budget=None every day gets MAX_RESTARTS restarts, so a seeded
+        plan comes out the same on any machine.
+        """
+        return list(self.plan_days(targets, suitable, days, time_budget, seed)) or None
+
+    def plan_days(self, targets, suitable, days=3, time_budget=0.15, seed=None):
+        """plan() one day at a time: yields each day's tuple as soon as it is solved, nothing if nothing is suitable"""
+        all_ids = self.index.ids(suitable)
+        if not all_ids:
+            return
+        pools = []
+        for meal_type in MEAL_SLOTS:
+            ids = self.index.ids(suitable, meal_type) or all_ids
+            pools.append(np.array(ids, dtype=np.int64))
+
+        scale = 1.0 / np.maximum(targets, 1.0)
+        goal = targets * scale
+        values = [self.nutrients[pool] * scale for pool in pools]
+        used = np.zeros(len(self.index), dtype=bool)
+        rng = np.random.default_rng(seed)
+        start = time.perf_counter()
+
+        for day in range(days):
+            deadline = None if time_budget is None else start + time_budget * (day + 1) / days
+            picks = self._solve_day(pools, values, goal, used, rng, deadline)
+            recipe_ids = tuple(int(pools[slot][pick]) for slot, pick in enumerate(picks))
+            used[list(recipe_ids)] = True
+            yield recipe_ids
+
+    def totals(self, recipe_ids):
+        """Summed calories, protein, carbs and fat for a day's recipe ids"""
+        return dict(zip(NUTRIENTS, self.nutrients[list(recipe_ids)].sum(axis=0).tolist()))
+
+    def _solve_day(self, pools, values, goal, used, rng, deadline):
+        blocked = []
+        for pool in pools:
+            mask = used[pool]
+            # Allow repeats once a slot has used up all of its options
+            blocked.append(mask if not mask.all() else np.zeros(len(pool), dtype=bool))
+
+        picks = []
+        for slot in range(len(pools)):
+            share = goal * (slot + 1) / len(pools)
+            taken = sum(values[i][pick] for i, pick in enumerate(picks))
+            picks.append(self._closest(slot, share - taken, picks, values, blocked, pools))
+        picks, error = self._descend(picks, values, goal, blocked, pools)
+
+        restarts = 0
+        while (deadline is None or time.perf_counter() < deadline) and restarts < MAX_RESTARTS:
+            restarts += 1
+            trial = list(picks)
+            slot = int(rng.integers(len(pools)))
+            trial[slot] = int(rng.integers(len(pools[slot])))
+            others = {int(pools[i][pick]) for i, pick in enumerate(trial) if i != slot}
+            if blocked[slot][trial[slot]] or int(pools[slot][trial[slot]]) in others:
+                continue
+            trial, trial_error = self._descend(trial, values, goal, blocked, pools)
+            if trial_error < error:
+                picks, error = trial, trial_error
+        return picks
+
+    def _descend(self, picks, values, goal, blocked, pools):
+        error = self._error(picks, values, goal)
+        improved = True
+        while improved:
+            improved = False
+            for slot in range(len(picks)):
+                rest = sum(values[i][pick] for i, pick in enumerate(picks) if i != slot)
+                trial = list(picks)
+                trial[slot] = self._closest(slot, goal - rest, picks, values, blocked, pools)
+                trial_error = self._error(trial, values, goal)
+                if trial_error < error - 1e-12:
+                    picks, error, improved = trial, trial_error, True
+        return picks, error
+
+    def _closest(self, slot, residual, picks, values, blocked, pools):
+        """Position in the slot's pool whose nutrients are nearest to residual"""
+        errors = ((values[slot] - residual) ** 2).sum(axis=1)
+        errors[blocked[slot]] = np.inf
+        # Never serve the same recipe twice in one day
+        for other, pick in enumerate(picks):
+            if other != slot:
+                errors[pools[slot] == pools[other][pick]] = np.inf
+        return int(np.argmin(errors))
+
+    def _error(self, picks, values, goal):
+        total = sum(values[slot][pick] for slot, pick in enumerate(picks))
+        return float(((total - goal) ** 2).sum())
@@ -0,0 +1,254 @@
+"""Counters, latency histograms and a slow-request profiler for the chat hot path.
+
+    from metrics import METRICS
+
+    METRICS.enabled = True
+    with METRICS.timer("nutribot_stage_seconds", stage="route"):
+        ...
+    METRICS.inc("nutribot_response_cache_total", result="hit")
+    METRICS.to_prometheus()        # text exposition format
+    METRICS.to_json()              # same data as a dict
+
+A disabled registry hands out one shared no-op timer and returns from
+inc() and observe() straight away, so instrumented code costs a method call
+per stage. Histograms use fixed Prometheus-style buckets (in seconds).
+
+SlowRequestProfiler samples the stacks of in-flight requests from a
+background thread; requests slower than its threshold are appended to a
+file as folded stacks ("frame;frame;frame count" per line), the input
+format of flamegraph.pl and speedscope.
+"""
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def label(self, **labels):
+        pass
+
+
+NULL_TIMER = _NullTimer()
+
+
+class Timer:
+    """Observes the time spent inside a with block; labels can still be added inside it"""
+
+    __slots__ = ("metrics", "name", "labels", "profile", "start")
+
+    def __init__(self, metrics, name, labels, profile):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+        self.profile = profile
+
+    def __enter__(self):
+        if self.profile:
+            self.metrics.profiler.begin()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        if self.metrics.enabled:
+            self.metrics._observe(_key(self.name, self.labels), elapsed)
+        if self.profile:
+            self.metrics.profiler.end(elapsed, self.name, self.labels)
+        return False
+
+    def label(self, **labels):
+        self.labels.update(labels)
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total, result = 0, []
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+class Metrics:
+    def __init__(self, enabled=False, buckets=DEFAULT_BUCKETS, profiler=None):
+        self.enabled = enabled
+        self.buckets = tuple(buckets)
+        self.profiler = profiler
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def timer(self, name, **labels):
+        if not self.enabled:
+            return NULL_TIMER
+        return Timer(self, name, labels, False)
+
+    def request(self, name, **labels):
+        """Like timer(), and hands the request to the slow-request profiler when one is set"""
+        if not self.enabled:
+            return NULL_TIMER
+        return Timer(self, name, labels, self.profiler is not None)
+
+    def inc(self, name, amount=1, **labels):
+        if not self.enabled:
+            return
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        if self.enabled:
+            self._observe(_key(name, labels), value)
+
+    def _observe(self, key, value):
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def value(self, name, **labels):
+        """Current value of a counter (0 if it was never incremented)"""
+        return self._counters.get(_key(name, labels), 0)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def to_json(self):
+        with self._lock:
+            return {
+                "counters": [{"name": name, "labels": dict(labels), "value": value}
+                             for (name, labels), value in sorted(self._counters.items())],
+                "histograms": [{"name": name, "labels": dict(labels), "count": histogram.count,
+                                "sum": histogram.sum,
+                                "buckets": {_format_bound(bound): count for bound, count in histogram.cumulative()}}
+                               for (name, labels), histogram in sorted(self._histograms.items())],
+            }
+
+    def to_prometheus(self):
+        lines = []
+        with self._lock:
+            typed = set()
+            for (name, labels), value in sorted(self._counters.items()):
+                if name not in typed:
+                    typed.add(name)
+                    lines.append(f"# TYPE {name} counter")
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                if name not in typed:
+                    typed.add(name)
+                    lines.append(f"# TYPE {name} histogram")
+                for bound, count in histogram.cumulative():
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', _format_bound(bound)),))} {count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum!r}")
+                lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _key(name, labels):
+    # Labels in name order, so keyword order does not split a series
+    return (name, tuple(sorted(labels.items())) if len(labels) > 1 else tuple(labels.items()))
+
+
+def _format_bound(bound):
+    return "+Inf" if bound == float("inf") else repr(bound)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in labels)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + "}"
+
+
+def _fold(frame):
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(stack))
+
+
+class SlowRequestProfiler:
+    """Samples in-flight requests and appends folded stacks of the slow ones to path"""
+
+    def __init__(self, path, threshold=0.25, interval=0.002):
+        self.path = path
+        self.threshold = threshold
+        self.interval = interval
+        self.slow_requests = 0
+        self._active = {}
+        self._lock = threading.Lock()
+        self._sampler = threading.Thread(target=self._sample, name="slow-request-profiler", daemon=True)
+        self._sampler.start()
+
+    def begin(self):
+        with self._lock:
+            self._active[threading.get_ident()] = Counter()
+
+    def end(self, elapsed, name, labels):
+        with self._lock:
+            samples = self._active.pop(threading.get_ident(), None)
+        if elapsed < self.threshold or not samples:
+            return
+        root = name + "".join(f" {key}={value}" for key, value in sorted(labels.items()))
+        with self._lock:
+            self.slow_requests += 1
+            with open(self.path, "a", encoding="utf-8") as f:
+                for stack, count in samples.items():
+                    f.write(f"{root};{stack} {count}\n")
+
+    def _sample(self):
+        me = threading.get_ident()
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._active:
+                    continue
+                frames = sys._current_frames()
+                for thread_id, samples in self._active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None and thread_id != me:
+                        samples[_fold(frame)] += 1
+
+
+# Registry used by the engine unless it is given its own
+METRICS = Metrics()
+
+
+def configure(metrics=METRICS, environ=os.environ):
+    """Apply NUTRIBOT_METRICS, NUTRIBOT_PROFILE_SLOW_MS and NUTRIBOT_PROFILE_PATH to a registry"""
+    metrics.enabled = environ.get("NUTRIBOT_METRICS", "").lower() not in ("", "0", "false")
+    slow_ms = environ.get("NUTRIBOT_PROFILE_SLOW_MS")
+    if slow_ms:
+        metrics.enabled = True
+        metrics.profiler = SlowRequestProfiler(environ.get("NUTRIBOT_PROFILE_PATH", "slow_requests.folded"),
+                                               threshold=float(slow_ms) / 1000)
+    return metrics
@@ -0,0 +1,29 @@
+"""Singular and plural word forms, shared by allergen matching, semantic search and ingredient resolution.
+
+    singular("berries")    # "berry"
+    singular("tomatoes")   # "tomato"
+    plural("berry")        # "berries"
+
+Light English rules, no dictionary: -ies for -y, -es after a sibilant or
+an o, and a plain -s. Words that only look plural ("hummus", "grass",
+"tahini") and words of three letters or fewer are left alone.
+"""
+
+
+def singular(word):
+    if len(word) > 3 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith(("ches", "shes", "sses", "xes", "oes")):
+        return word[:-2]
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+def plural(word):
+    """The form singular() folds back to word"""
+    if len(word) > 2 and word.endswith("y") and word[-2] not in "aeiou":
+        return word[:-1] + "ies"
+    if word.endswith(("ch", "sh", "ss", "x", "o")):
+        return word + "es"
+    return word + "s"
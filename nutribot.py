@@ -1,9 +1,16 @@
 import streamlit as st
-import pandas as pd
-import random
-import json
-from datetime import datetime
 import os
+import uuid
+
+from allergens import parse_allergies
+from chat_history import ChatHistory
+from data_catalog import RELOAD_INTERVAL, DataCatalog
+from intent_router import RECIPE_DIET_TYPES
+from metrics import METRICS, configure
+from nutribot_engine import UserProfile
+from profile_store import DEFAULT_PATH, ProfileStore
+from recipe_browser import SORT_KEYS, Query
+from response_cache import ResponseCache
 
 # Set page configuration
 st.set_page_config(
@@ -12,400 +19,189 @@ st.set_page_config(
     layout="wide"
 )
 
-# Load data (would normally come from external sources)
-@st.cache_data
-def load_food_data():
-    # This is a simplified dataset - in a real app, you'd use a more comprehensive database
-    foods = {
-        "apple": {"calories": 95, "protein": 0.5, "carbs": 25, "fat": 0.3, "fiber": 4, "category": "fruit"},
-        "banana": {"calories": 105, "protein": 1.3, "carbs": 27, "fat": 0.4, "fiber": 3.1, "category": "fruit"},
-        "spinach": {"calories": 23, "protein": 2.9, "carbs": 3.6, "fat": 0.4, "fiber": 2.2, "category": "vegetable"},
-        "salmon": {"calories": 208, "protein": 20, "carbs": 0, "fat": 13, "fiber": 0, "category": "protein"},
-        "chicken breast": {"calories": 165, "protein": 31, "carbs": 0, "fat": 3.6, "fiber": 0, "category": "protein"},
-        "brown rice": {"calories": 216, "protein": 5, "carbs": 45, "fat": 1.8, "fiber": 3.5, "category": "grain"},
-        "quinoa": {"calories": 222, "protein": 8, "carbs": 39, "fat": 3.6, "fiber": 5, "category": "grain"},
-        "avocado": {"calories": 240, "protein": 3, "carbs": 12, "fat": 22, "fiber": 10, "category": "fruit"},
-        "greek yogurt": {"calories": 130, "protein": 17, "carbs": 6, "fat": 4, "fiber": 0, "category": "dairy"},
-        "almonds": {"calories": 164, "protein": 6, "carbs": 6, "fat": 14, "fiber": 3.5, "category": "nuts"},
-        "oats": {"calories": 389, "protein": 16.9, "carbs": 66.3, "fat": 6.9, "fiber": 10.6, "category": "grain"},
-        "sweet potato": {"calories": 86, "protein": 1.6, "carbs": 20.1, "fat": 0.1, "fiber": 3, "category": "vegetable"},
-        "lentils": {"calories": 116, "protein": 9, "carbs": 20, "fat": 0.4, "fiber": 8, "category": "legume"},
-        "broccoli": {"calories": 55, "protein": 3.7, "carbs": 11.2, "fat": 0.6, "fiber": 5.1, "category": "vegetable"},
-        "eggs": {"calories": 78, "protein": 6.3, "carbs": 0.6, "fat": 5.3, "fiber": 0, "category": "protein"},
-    }
-    return foods
+# NUTRIBOT_METRICS=1 records stage timings and cache counters; NUTRIBOT_PROFILE_SLOW_MS also
+# appends folded stacks of slower requests to NUTRIBOT_PROFILE_PATH
+@st.cache_resource
+def load_metrics():
+    return configure(METRICS)
+
+metrics = load_metrics()
+
+# Set NUTRIBOT_FOOD_DB to a file built with `python food_db.py build` to serve a full database
+FOOD_DB_PATH = os.environ.get("NUTRIBOT_FOOD_DB")
+
+# Set NUTRIBOT_DATA_DIR to a directory of data files (`python data_catalog.py export DIR` writes the
+# bundled ones); changes to them, or to the food database, are picked up without a restart
+DATA_DIR = os.environ.get("NUTRIBOT_DATA_DIR")
+DATA_RELOAD_INTERVAL = float(os.environ.get("NUTRIBOT_DATA_RELOAD_SECONDS", RELOAD_INTERVAL))
+
+# Replies to deterministic questions are shared across sessions; the key includes the profile fields
+RESPONSE_CACHE_MAX_BYTES = int(os.environ.get("NUTRIBOT_RESPONSE_CACHE_BYTES", 4 * 1024 * 1024))
+RESPONSE_CACHE_TTL = int(os.environ.get("NUTRIBOT_RESPONSE_CACHE_TTL", 3600))
+
+# Minimum trigram similarity for correcting a misspelled food or nutrient name
+FUZZY_THRESHOLD = float(os.environ.get("NUTRIBOT_FUZZY_THRESHOLD", 0.6))
+
+# Where per-recipe nutrient totals are kept between runs; only changed recipes are recomputed
+RECIPE_NUTRIENTS_PATH = os.environ.get("NUTRIBOT_RECIPE_NUTRIENTS")
 
-@st.cache_data
-def load_nutrition_facts():
-    nutrition_facts = {
-        "protein": "Essential for muscle building, immune function, and enzyme production. Recommended intake varies based on weight and activity level.",
-        "carbs": "Primary energy source for the body. Complex carbs like whole grains provide sustained energy.",
-        "fat": "Essential for hormone production, vitamin absorption, and brain function. Focus on healthy fats like omega-3s.",
-        "fiber": "Supports digestive health, helps maintain steady blood sugar, and contributes to feelings of fullness.",
-        "magnesium": "Essential for muscle and nerve function, blood glucose control, and bone health.",
-        "vitamin C": "Supports immune function, collagen production, and acts as an antioxidant.",
-        "iron": "Critical for oxygen transport in the blood and energy metabolism.",
-        "calcium": "Essential for bone health, muscle function, and nerve signaling.",
-        "quinoa": "Quinoa is gluten-free and a complete protein, containing all nine essential amino acids.",
-        "probiotics": "Live beneficial bacteria that support gut health and may boost immune function.",
-        "keto diet": "A high-fat, very low-carbohydrate diet that forces the body to burn fats rather than carbs.",
-        "intermittent fasting": "An eating pattern that cycles between periods of eating and fasting, often used for weight management.",
-        "carbs": "Carbohydrates are not inherently 'bad'. They're the body's primary energy source. Focus on complex carbs like whole grains.",
-    }
-    return nutrition_facts
+# Messages no keyword matches are answered from the closest nutrition fact or recipe above this
+# TF-IDF similarity; NUTRIBOT_SEMANTIC_INDEX names an index built with `python semantic_index.py build`
+SEMANTIC_THRESHOLD = float(os.environ.get("NUTRIBOT_SEMANTIC_THRESHOLD", 0.12))
+SEMANTIC_INDEX_PATH = os.environ.get("NUTRIBOT_SEMANTIC_INDEX")
 
-@st.cache_data
-def load_recipes():
-    recipes = [
-        {
-            "name": "Quinoa Salad",
-            "ingredients": ["1 cup quinoa", "2 cups water", "1 cucumber, diced", "1 bell pepper, diced", "1/4 cup olive oil", "2 tbsp lemon juice", "Salt and pepper to taste"],
-            "instructions": "1. Cook quinoa in water according to package instructions\n2. Mix with diced vegetables\n3. Dress with olive oil and lemon juice\n4. Season with salt and pepper",
-            "nutritional_info": "Calories: 350, Protein: 10g, Carbs: 42g, Fat: 16g, Fiber: 7g",
-            "diet_types": ["vegetarian", "vegan", "gluten-free"],
-            "meal_type": "lunch",
-        },
-        {
-            "name": "Grilled Chicken with Roasted Vegetables",
-            "ingredients": ["2 chicken breasts", "2 cups mixed vegetables (bell peppers, zucchini, onions)", "2 tbsp olive oil", "2 cloves garlic, minced", "1 tsp Italian herbs", "Salt and pepper to taste"],
-            "instructions": "1. Marinate chicken with olive oil, garlic, and herbs\n2. Grill chicken until cooked through\n3. Toss vegetables in olive oil, salt, and pepper\n4. Roast vegetables at 425°F for 20 minutes",
-            "nutritional_info": "Calories: 320, Protein: 35g, Carbs: 12g, Fat: 15g, Fiber: 4g",
-            "diet_types": ["keto", "paleo", "gluten-free"],
-            "meal_type": "dinner",
-        },
-        {
-            "name": "Berry Protein Smoothie",
-            "ingredients": ["1 cup mixed berries", "1 scoop protein powder", "1 cup almond milk", "1/2 banana", "1 tbsp chia seeds", "Ice cubes"],
-            "instructions": "Blend all ingredients until smooth.",
-            "nutritional_info": "Calories: 250, Protein: 20g, Carbs: 30g, Fat: 5g, Fiber: 8g",
-            "diet_types": ["vegetarian", "gluten-free"],
-            "meal_type": "breakfast",
-        },
-        {
-            "name": "Lentil Soup",
-            "ingredients": ["1 cup dry lentils", "1 onion, chopped", "2 carrots, diced", "2 celery stalks, diced", "4 cups vegetable broth", "2 cloves garlic, minced", "1 tsp cumin", "Salt and pepper to taste"],
-            "instructions": "1. Sauté onion, carrots, celery, and garlic\n2. Add lentils, broth, and spices\n3. Simmer for 30 minutes or until lentils are tender",
-            "nutritional_info": "Calories: 200, Protein: 12g, Carbs: 35g, Fat: 1g, Fiber: 15g",
-            "diet_types": ["vegetarian", "vegan", "gluten-free"],
-            "meal_type": "lunch",
-        },
-        {
-            "name": "Avocado Toast with Egg",
-            "ingredients": ["1 slice whole grain bread", "1/2 avocado", "1 egg", "Red pepper flakes", "Salt and pepper to taste"],
-            "instructions": "1. Toast bread\n2. Mash avocado and spread on toast\n3. Top with fried or poached egg\n4. Season with salt, pepper, and red pepper flakes",
-            "nutritional_info": "Calories: 300, Protein: 12g, Carbs: 20g, Fat: 18g, Fiber: 7g",
-            "diet_types": ["vegetarian"],
-            "meal_type": "breakfast",
-        }
-    ]
-    return recipes
+@st.cache_resource
+def load_catalog(data_dir, food_db_path):
+    # One catalog per process; the food database is memory-mapped, so workers share its pages
+    metrics.inc("nutribot_loader_builds_total", loader="engine")
+    options = dict(
+        metrics=metrics,
+        interval=DATA_RELOAD_INTERVAL,
+        response_cache=ResponseCache(max_bytes=RESPONSE_CACHE_MAX_BYTES, ttl=RESPONSE_CACHE_TTL),
+        fuzzy_threshold=FUZZY_THRESHOLD,
+        recipe_nutrients_path=RECIPE_NUTRIENTS_PATH,
+        semantic_threshold=SEMANTIC_THRESHOLD,
+        semantic_index_path=SEMANTIC_INDEX_PATH
+    )
+    if data_dir:
+        catalog = DataCatalog.from_directory(data_dir, food_db_path, **options)
+    else:
+        catalog = DataCatalog({"food_data": food_db_path}, **options)
+    # Work out recipe nutrient totals and the search indexes up front rather than on the first request that
+    # needs them; reloads rebuild whatever the serving snapshot has built before swapping
+    bot = catalog.engine
+    bot.recipe_nutrients
+    bot.semantic_index
+    bot.recipe_browser
+    bot.fuzzy_index
+    if data_dir or food_db_path:
+        catalog.start()
+    return catalog
+
+# Loader cache hits are calls minus builds
+metrics.inc("nutribot_loader_calls_total", loader="engine")
+catalog = load_catalog(DATA_DIR, FOOD_DB_PATH)
+# The whole rerun uses the snapshot current when it started, even if a reload swaps in another meanwhile
+engine = catalog.engine
+
+# Profiles and water history survive reloads and restarts; users are told apart by the ?user= URL parameter.
+# The database (and its -wal/-shm files) lives in ~/.nutribot unless NUTRIBOT_PROFILE_DB says otherwise
+PROFILE_DB_PATH = DEFAULT_PATH
+
+@st.cache_resource
+def load_profile_store(path):
+    metrics.inc("nutribot_loader_builds_total", loader="profile_store")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    return ProfileStore(path)
 
-@st.cache_data
-def load_meal_plans():
-    meal_plans = {
-        "weight_loss": {
-            "name": "Weight Loss Plan",
-            "description": "A balanced plan with calorie deficit to promote healthy weight loss",
-            "daily_calories": 1500,
-            "macros": {"protein": "30%", "carbs": "40%", "fat": "30%"},
-            "sample_day": {
-                "breakfast": "Greek yogurt with berries and honey",
-                "lunch": "Grilled chicken salad with olive oil dressing",
-                "dinner": "Baked salmon with steamed vegetables",
-                "snacks": ["Apple with almond butter", "Carrot sticks with hummus"]
-            }
-        },
-        "muscle_gain": {
-            "name": "Muscle Building Plan",
-            "description": "Higher protein and calories to support muscle growth",
-            "daily_calories": 2800,
-            "macros": {"protein": "35%", "carbs": "45%", "fat": "20%"},
-            "sample_day": {
-                "breakfast": "Oatmeal with protein powder, banana, and peanut butter",
-                "lunch": "Chicken breast with brown rice and vegetables",
-                "dinner": "Steak with sweet potato and broccoli",
-                "snacks": ["Protein shake with fruit", "Greek yogurt with nuts"]
-            }
-        },
-        "maintenance": {
-            "name": "Balanced Maintenance Plan",
-            "description": "Well-rounded nutrition to maintain current weight and support overall health",
-            "daily_calories": 2000,
-            "macros": {"protein": "25%", "carbs": "50%", "fat": "25%"},
-            "sample_day": {
-                "breakfast": "Scrambled eggs with toast and avocado",
-                "lunch": "Quinoa salad with vegetables and chickpeas",
-                "dinner": "Baked fish with roasted vegetables and brown rice",
-                "snacks": ["Fruit smoothie", "Mixed nuts"]
-            }
-        },
-        "vegetarian": {
-            "name": "Vegetarian Plan",
-            "description": "Plant-based proteins and balanced nutrition without meat",
-            "daily_calories": 1800,
-            "macros": {"protein": "20%", "carbs": "55%", "fat": "25%"},
-            "sample_day": {
-                "breakfast": "Smoothie with plant-based protein, berries, and spinach",
-                "lunch": "Lentil soup with whole grain bread",
-                "dinner": "Tofu stir-fry with vegetables and brown rice",
-                "snacks": ["Hummus with vegetable sticks", "Trail mix"]
-            }
-        },
-        "keto": {
-            "name": "Ketogenic Plan",
-            "description": "Very low carb, high fat to promote ketosis",
-            "daily_calories": 1800,
-            "macros": {"protein": "20%", "carbs": "5%", "fat": "75%"},
-            "sample_day": {
-                "breakfast": "Avocado and eggs with cheese",
-                "lunch": "Spinach salad with grilled chicken, olive oil, and nuts",
-                "dinner": "Baked salmon with asparagus and butter",
-                "snacks": ["Cheese cubes", "Olives"]
-            }
-        }
-    }
-    return meal_plans
+metrics.inc("nutribot_loader_calls_total", loader="profile_store")
+profile_store = load_profile_store(PROFILE_DB_PATH)
 
-# Load data
-food_data = load_food_data()
-nutrition_facts = load_nutrition_facts()
-recipes = load_recipes()
-meal_plans = load_meal_plans()
+if "user" not in st.query_params:
+    st.query_params["user"] = uuid.uuid4().hex
+user_id = st.query_params["user"]
+
+# Messages rendered on every rerun; older ones are compressed and shown on request
+CHAT_LIVE_MESSAGES = 50
 
 # Initialize session state
 if 'chat_history' not in st.session_state:
-    st.session_state.chat_history = []
+    st.session_state.chat_history = ChatHistory(live_limit=CHAT_LIVE_MESSAGES)
+
+if 'earlier_shown' not in st.session_state:
+    st.session_state.earlier_shown = 0
 
 if 'user_info' not in st.session_state:
-    st.session_state.user_info = {
-        "name": "",
-        "dietary_preferences": [],
-        "allergies": [],
-        "goal": "",
-        "height": "",
-        "weight": "",
-        "activity_level": "",
-        "onboarded": False
-    }
+    st.session_state.user_info = profile_store.get_profile(user_id) or UserProfile()
 
 if 'water_tracker' not in st.session_state:
-    st.session_state.water_tracker = {
-        "today": datetime.now().strftime("%Y-%m-%d"),
-        "glasses": 0
-    }
-
-# Utility functions
-def generate_meal_plan(goal, preferences=None, allergies=None):
-    """Generate a personalized meal plan based on user preferences"""
-    if not preferences:
-        preferences = []
-    if not allergies:
-        allergies = []
-    
-    # Select appropriate base plan
-    if goal.lower() == "weight loss":
-        base_plan = meal_plans["weight_loss"]
-    elif goal.lower() == "muscle gain":
-        base_plan = meal_plans["muscle_gain"]
-    elif "vegetarian" in preferences:
-        base_plan = meal_plans["vegetarian"]
-    elif "keto" in preferences:
-        base_plan = meal_plans["keto"]
-    else:
-        base_plan = meal_plans["maintenance"]
-    
-    # Filter recipes based on preferences and allergies
-    suitable_recipes = []
-    for recipe in recipes:
-        compatible = True
-        # Check for dietary preferences
-        if preferences:
-            has_matching_diet = False
-            for diet in recipe["diet_types"]:
-                if diet in preferences:
-                    has_matching_diet = True
-                    break
-            if preferences and not has_matching_diet:
-                compatible = False
-        
-        # Check for allergies (very simplified)
-        if compatible and allergies:
-            for ingredient in recipe["ingredients"]:
-                for allergy in allergies:
-                    if allergy.lower() in ingredient.lower():
-                        compatible = False
-                        break
-        
-        if compatible:
-            suitable_recipes.append(recipe)
-    
-    # Create a meal plan (simplified)
-    breakfast_options = [r for r in suitable_recipes if r["meal_type"] == "breakfast"]
-    lunch_options = [r for r in suitable_recipes if r["meal_type"] == "lunch"]
-    dinner_options = [r for r in suitable_recipes if r["meal_type"] == "dinner"]
-    
-    # If no specific meal type recipes available, use any suitable recipe
-    if not breakfast_options:
-        breakfast_options = suitable_recipes
-    if not lunch_options:
-        lunch_options = suitable_recipes
-    if not dinner_options:
-        dinner_options = suitable_recipes
-        
-    # Create 3-day meal plan
-    meal_plan = {
-        "goal": goal,
-        "daily_calories": base_plan["daily_calories"],
-        "macros": base_plan["macros"],
-        "days": []
-    }
-    
-    for day in range(1, 4):
-        day_plan = {
-            "day": day,
-            "breakfast": random.choice(breakfast_options)["name"] if breakfast_options else "Custom breakfast based on preferences",
-            "lunch": random.choice(lunch_options)["name"] if lunch_options else "Custom lunch based on preferences",
-            "dinner": random.choice(dinner_options)["name"] if dinner_options else "Custom dinner based on preferences",
-            "snacks": ["Fruit and nuts", "Yogurt"] if goal != "weight loss" else ["Celery with hummus"]
-        }
-        meal_plan["days"].append(day_plan)
-    
-    return meal_plan
+    st.session_state.water_tracker = profile_store.tracker(user_id)
 
 def get_chatbot_response(user_input):
     """Generate responses for user questions"""
-    user_input = user_input.lower()
-    
-    # Meal plan request
-    if "meal plan" in user_input or "plan for" in user_input:
-        goal = st.session_state.user_info["goal"] if st.session_state.user_info["goal"] else "maintenance"
-        preferences = st.session_state.user_info["dietary_preferences"]
-        allergies = st.session_state.user_info["allergies"]
-        meal_plan = generate_meal_plan(goal, preferences, allergies)
-        
-        response = f"Here's a meal plan tailored for your {goal} goal:\n\n"
-        response += f"Daily target: ~{meal_plan['daily_calories']} calories\n"
-        response += f"Macros: {meal_plan['macros']['protein']} protein, {meal_plan['macros']['carbs']} carbs, {meal_plan['macros']['fat']} fat\n\n"
-        
-        for day in meal_plan["days"]:
-            response += f"Day {day['day']}:\n"
-            response += f"- Breakfast: {day['breakfast']}\n"
-            response += f"- Lunch: {day['lunch']}\n"
-            response += f"- Dinner: {day['dinner']}\n"
-            response += f"- Snacks: {', '.join(day['snacks'])}\n\n"
-        
-        return response
-    
-    # Recipe request
-    elif "recipe" in user_input:
-        diet_type = None
-        for diet in ["vegetarian", "vegan", "keto", "paleo", "gluten-free"]:
-            if diet in user_input:
-                diet_type = diet
-                break
-        
-        filtered_recipes = recipes
-        if diet_type:
-            filtered_recipes = [r for r in recipes if diet_type in r["diet_types"]]
-        
-        if not filtered_recipes:
-            return "I don't have any recipes matching those criteria. Try asking for a different type of recipe."
-        
-        chosen_recipe = random.choice(filtered_recipes)
-        
-        response = f"Here's a {diet_type + ' ' if diet_type else ''}recipe you might enjoy:\n\n"
-        response += f"**{chosen_recipe['name']}**\n\n"
-        response += "**Ingredients:**\n"
-        for ingredient in chosen_recipe['ingredients']:
-            response += f"- {ingredient}\n"
-        
-        response += "\n**Instructions:**\n"
-        response += chosen_recipe['instructions']
-        
-        response += f"\n\n**Nutritional Information:**\n{chosen_recipe['nutritional_info']}"
-        return response
-    
-    # Nutrition information
-    elif any(nutrient in user_input for nutrient in nutrition_facts.keys()):
-        for nutrient, info in nutrition_facts.items():
-            if nutrient in user_input:
-                if "what is" in user_input or "tell me about" in user_input or "benefits" in user_input:
-                    return f"**{nutrient.capitalize()}**: {info}"
-        
-        # If we get here, we found a keyword but not a direct question
-        return "I can provide information about various nutrients and foods. Could you ask more specifically what you'd like to know?"
-    
-    # Food information
-    elif any(food in user_input for food in food_data.keys()):
-        for food, info in food_data.items():
-            if food in user_input:
-                response = f"**Nutritional information for {food}**:\n"
-                response += f"- Calories: {info['calories']}\n"
-                response += f"- Protein: {info['protein']}g\n"
-                response += f"- Carbs: {info['carbs']}g\n"
-                response += f"- Fat: {info['fat']}g\n"
-                response += f"- Fiber: {info['fiber']}g\n"
-                return response
-    
-    # Dietary questions
-    elif "diet" in user_input or "weight loss" in user_input or "protein" in user_input:
-        if "how much protein" in user_input:
-            return "A general guideline is to consume 0.8-1g of protein per pound of body weight if you're active, or 0.36g per pound for sedentary individuals. Athletes may need up to 1.2-2g per pound depending on training intensity."
-        
-        elif "lose weight" in user_input:
-            return "Weight loss requires creating a calorie deficit through diet and exercise. Focus on whole foods, plenty of protein and fiber, and reduce processed foods and added sugars. A sustainable approach is aiming for 0.5-1 pound of weight loss per week."
-        
-        elif "keto" in user_input:
-            return "The ketogenic diet is very low in carbohydrates (typically <50g per day), moderate in protein, and high in fat. It forces your body to burn fats rather than carbohydrates for energy. While effective for some, it's restrictive and not suitable for everyone."
+    return engine.respond(
+        user_input,
+        st.session_state.user_info,
+        st.session_state.water_tracker,
+        optimize=st.session_state.get("optimize_meal_plans", False)
+    )
+
+def stream_chatbot_response(user_input):
+    """Chunks of the response to a user question, each as soon as it is built"""
+    return engine.respond_stream(
+        user_input,
+        st.session_state.user_info,
+        st.session_state.water_tracker,
+        optimize=st.session_state.get("optimize_meal_plans", False)
+    )
+
+# UI Components
+def render_recipe_browser():
+    """Filter, sort and page through the recipe catalog; the profile's allergies are always excluded"""
+    diets = st.multiselect("Diet types", RECIPE_DIET_TYPES, key="browse_diets")
+    meal_type = st.selectbox("Meal", ["any", "breakfast", "lunch", "dinner"], key="browse_meal")
+    exclude = st.text_input("Without ingredients (comma-separated)", key="browse_exclude")
+    max_calories = st.slider("Max calories", 100, 1500, 1500, step=50, key="browse_max_calories")
+    min_protein = st.slider("Min protein (g)", 0, 60, 0, step=5, key="browse_min_protein")
+    sort = st.selectbox("Sort by", SORT_KEYS, key="browse_sort")
+    descending = st.checkbox("Highest first", key="browse_descending")
     
-    # General healthy eating
-    elif "healthy eating" in user_input or "healthy diet" in user_input:
-        return "A healthy diet includes a variety of fruits, vegetables, whole grains, lean proteins, and healthy fats. Minimize processed foods, added sugars, and excessive sodium. Stay hydrated and practice portion control. Consistency is more important than perfection."
+    excluded = [item.strip() for item in exclude.split(",") if item.strip()] + st.session_state.user_info.allergies
+    ranges = []
+    if max_calories < 1500:
+        ranges.append(("calories", None, max_calories))
+    if min_protein:
+        ranges.append(("protein", min_protein, None))
+    query = Query(tuple(diets), None if meal_type == "any" else meal_type, tuple(dict.fromkeys(excluded)),
+                  tuple(ranges), sort, descending)
     
-    # Water tracking
-    elif "water" in user_input and ("track" in user_input or "log" in user_input or "add" in user_input):
-        st.session_state.water_tracker["glasses"] += 1
-        return f"Great job staying hydrated! I've logged another glass of water. You've had {st.session_state.water_tracker['glasses']} glasses today."
+    # One cursor per page seen so far, so Previous can go back; a new query starts over
+    if st.session_state.get("browse_query") != query:
+        st.session_state.browse_query = query
+        st.session_state.browse_cursors = [None]
+    cursors = st.session_state.browse_cursors
+    page = engine.recipe_browser.search(query, cursors[-1])
     
-    # Add this condition in the get_chatbot_response function
-    elif "breakfast" in user_input or "morning meal" in user_input:
-        if "weight loss" in user_input or "diet" in user_input:
-            response = "Here are some healthy breakfast options for weight loss:\n\n"
-            response += "1. Greek yogurt with berries and a sprinkle of nuts (300 calories)\n"
-            response += "2. Veggie omelet with 2 eggs and spinach (250 calories)\n"
-            response += "3. Overnight oats with almond milk and chia seeds (350 calories)\n"
-            response += "4. Protein smoothie with spinach, banana, and protein powder (300 calories)\n"
-            response += "5. Avocado toast on whole grain bread with a boiled egg (340 calories)\n\n"
-            response += "These options are high in protein and fiber to keep you full longer while maintaining a calorie deficit."
-            return response
+    st.caption(f"{page.total} recipes · page {len(cursors)}")
+    for recipe_id in page.ids:
+        recipe = engine.recipes[recipe_id]
+        st.markdown(f"**{recipe['name']}** ({recipe['meal_type']})  \n{recipe['nutritional_info']}")
     
-    # Fallback response
-    else:
-        return "I'm your nutrition advisor. I can help with meal planning, provide nutrition information, suggest recipes, or answer questions about healthy eating. What would you like to know?"
+    col1, col2 = st.columns(2)
+    if col1.button("Previous", key="browse_previous", disabled=len(cursors) == 1):
+        cursors.pop()
+        st.rerun()
+    if col2.button("Next", key="browse_next", disabled=page.next_cursor is None):
+        cursors.append(page.next_cursor)
+        st.rerun()
 
-# UI Components
 def render_sidebar():
     with st.sidebar:
         st.title("🥗 NutriBot")
         st.markdown("Your AI Nutrition Advisor")
         
         st.subheader("About Me")
-        if st.session_state.user_info["onboarded"]:
-            st.write(f"**Name:** {st.session_state.user_info['name']}")
-            st.write(f"**Goal:** {st.session_state.user_info['goal']}")
-            if st.session_state.user_info["dietary_preferences"]:
-                st.write(f"**Preferences:** {', '.join(st.session_state.user_info['dietary_preferences'])}")
-            if st.session_state.user_info["allergies"]:
-                st.write(f"**Allergies:** {', '.join(st.session_state.user_info['allergies'])}")
+        user_info = st.session_state.user_info
+        if user_info.onboarded:
+            st.write(f"**Name:** {user_info.name}")
+            st.write(f"**Goal:** {user_info.goal}")
+            if user_info.dietary_preferences:
+                st.write(f"**Preferences:** {', '.join(user_info.dietary_preferences)}")
+            if user_info.allergies:
+                st.write(f"**Allergies:** {', '.join(user_info.allergies)}")
             
             # Water tracker
             st.subheader("💧 Water Tracker")
-            st.write(f"Today's count: {st.session_state.water_tracker['glasses']} glasses")
+            st.write(f"Today's count: {st.session_state.water_tracker.glasses} glasses")
             if st.button("Add a glass"):
-                st.session_state.water_tracker["glasses"] += 1
+                st.session_state.water_tracker.add_glass()
                 st.rerun()
+            history = profile_store.history(user_id)
+            if len(history) > 1:
+                st.caption("Last 7 days: " + ", ".join(f"{day[5:]}: {glasses}" for day, glasses in history))
         
         st.subheader("Quick Actions")
+        st.checkbox("Match my calorie & macro targets", key="optimize_meal_plans")
         if st.button("Generate Meal Plan"):
             user_message = "Can you create a meal plan for me?"
             st.session_state.chat_history.append({"role": "user", "content": user_message})
@@ -420,20 +216,20 @@ def render_sidebar():
             st.session_state.chat_history.append({"role": "assistant", "content": bot_response})
             st.rerun()
         
+        with st.expander("🔎 Browse Recipes"):
+            render_recipe_browser()
+        
         st.markdown("---")
         if st.button("Reset Profile"):
-            st.session_state.user_info = {
-                "name": "",
-                "dietary_preferences": [],
-                "allergies": [],
-                "goal": "",
-                "height": "",
-                "weight": "",
-                "activity_level": "",
-                "onboarded": False
-            }
-            st.session_state.chat_history = []
+            st.session_state.user_info = UserProfile()
+            profile_store.save_profile(user_id, st.session_state.user_info)
+            st.session_state.chat_history = ChatHistory(live_limit=CHAT_LIVE_MESSAGES)
+            st.session_state.earlier_shown = 0
             st.rerun()
+        
+        if metrics.enabled:
+            with st.expander("Metrics"):
+                st.code(metrics.to_prometheus(), language="text")
 
 def show_onboarding():
     st.title("🥗 Welcome to NutriBot")
@@ -466,16 +262,17 @@ def show_onboarding():
         )
     
     if st.button("Save Profile"):
-        st.session_state.user_info = {
-            "name": name,
-            "dietary_preferences": dietary_preferences,
-            "allergies": allergies.split(", ") if allergies else [],
-            "goal": goal,
-            "height": height,
-            "weight": weight,
-            "activity_level": activity_level,
-            "onboarded": True
-        }
+        st.session_state.user_info = UserProfile(
+            name=name,
+            dietary_preferences=dietary_preferences,
+            allergies=parse_allergies(allergies),
+            goal=goal,
+            height=height,
+            weight=weight,
+            activity_level=activity_level,
+            onboarded=True
+        )
+        profile_store.save_profile(user_id, st.session_state.user_info)
         
         # Add welcome message to chat
         welcome_message = f"Hi {name}! I'm your personal nutrition advisor. I can help you with meal plans, recipes, and nutrition information to support your {goal.lower()} goal. What would you like help with today?"
@@ -485,8 +282,17 @@ def show_onboarding():
 def render_chat_interface():
     st.title("🥗 NutriBot Chat")
     
+    history = st.session_state.chat_history
+    
+    # Only the live window is rendered unless earlier messages were requested
+    earlier_shown = min(st.session_state.earlier_shown, history.earlier_count)
+    if history.earlier_count > earlier_shown:
+        if st.button(f"Load earlier messages ({history.earlier_count - earlier_shown} more)"):
+            st.session_state.earlier_shown = earlier_shown + history.page_size
+            st.rerun()
+    
     # Display chat messages
-    for message in st.session_state.chat_history:
+    for message in history.earlier(earlier_shown) + history.live:
         with st.chat_message(message["role"]):
             st.markdown(message["content"])
     
@@ -498,18 +304,19 @@ def render_chat_interface():
         
         # Generate response
         with st.chat_message("assistant"):
-            with st.spinner("Thinking..."):
-                response = get_chatbot_response(user_input)
-                st.markdown(response)
-                st.session_state.chat_history.append({"role": "assistant", "content": response})
+            # Show each chunk as it arrives; write_stream returns "" where the engine has no reply
+            response = st.write_stream(stream_chatbot_response(user_input)) or None
+            st.session_state.chat_history.append({"role": "assistant", "content": response})
 
 def main():
-    render_sidebar()
+    with metrics.timer("nutribot_render_seconds", part="sidebar"):
+        render_sidebar()
     
-    if not st.session_state.user_info["onboarded"]:
+    if not st.session_state.user_info.onboarded:
         show_onboarding()
     else:
-        render_chat_interface()
+        with metrics.timer("nutribot_render_seconds", part="chat"):
+            render_chat_interface()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
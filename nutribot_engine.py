@@ -0,0 +1,715 @@
+"""Streamlit-free NutriBot engine: bundled data, intent routing, reply builders and meal planning.
+
+    from nutribot_engine import NutriBot, UserProfile
+
+    bot = NutriBot()
+    bot.respond("what is protein", UserProfile(goal="Weight Loss"))
+    bot.respond_many(["meal plan", "tell me about iron"], [profile_a, profile_b])
+
+Importing this module only pulls in the lightweight pure-Python indexes;
+NumPy-backed pieces (food store, meal optimizer, on-disk database) are
+imported and built the first time they are used.
+"""
+import copy
+import os
+import random
+import time
+from collections import namedtuple
+from dataclasses import asdict, dataclass, field, fields
+from datetime import datetime
+from functools import cached_property
+
+from intent_router import IntentRouter
+from metrics import METRICS, NULL_TIMER
+from recipe_index import RecipeIndex
+from response_cache import CACHEABLE_INTENTS, ResponseCache, response_cache_key
+
+# Load data (would normally come from external sources)
+def load_food_data():
+    # This is a simplified dataset - in a real app, you'd use a more comprehensive database
+    foods = {
+        "apple": {"calories": 95, "protein": 0.5, "carbs": 25, "fat": 0.3, "fiber": 4, "category": "fruit"},
+        "banana": {"calories": 105, "protein": 1.3, "carbs": 27, "fat": 0.4, "fiber": 3.1, "category": "fruit"},
+        "spinach": {"calories": 23, "protein": 2.9, "carbs": 3.6, "fat": 0.4, "fiber": 2.2, "category": "vegetable"},
+        "salmon": {"calories": 208, "protein": 20, "carbs": 0, "fat": 13, "fiber": 0, "category": "protein"},
+        "chicken breast": {"calories": 165, "protein": 31, "carbs": 0, "fat": 3.6, "fiber": 0, "category": "protein"},
+        "brown rice": {"calories": 216, "protein": 5, "carbs": 45, "fat": 1.8, "fiber": 3.5, "category": "grain"},
+        "quinoa": {"calories": 222, "protein": 8, "carbs": 39, "fat": 3.6, "fiber": 5, "category": "grain"},
+        "avocado": {"calories": 240, "protein": 3, "carbs": 12, "fat": 22, "fiber": 10, "category": "fruit"},
+        "greek yogurt": {"calories": 130, "protein": 17, "carbs": 6, "fat": 4, "fiber": 0, "category": "dairy"},
+        "almonds": {"calories": 164, "protein": 6, "carbs": 6, "fat": 14, "fiber": 3.5, "category": "nuts"},
+        "oats": {"calories": 389, "protein": 16.9, "carbs": 66.3, "fat": 6.9, "fiber": 10.6, "category": "grain"},
+        "sweet potato": {"calories": 86, "protein": 1.6, "carbs": 20.1, "fat": 0.1, "fiber": 3, "category": "vegetable"},
+        "lentils": {"calories": 116, "protein": 9, "carbs": 20, "fat": 0.4, "fiber": 8, "category": "legume"},
+        "broccoli": {"calories": 55, "protein": 3.7, "carbs": 11.2, "fat": 0.6, "fiber": 5.1, "category": "vegetable"},
+        "eggs": {"calories": 78, "protein": 6.3, "carbs": 0.6, "fat": 5.3, "fiber": 0, "category": "protein"},
+    }
+    return foods
+
+def load_nutrition_facts():
+    nutrition_facts = {
+        "protein": "Essential for muscle building, immune function, and enzyme production. Recommended intake varies based on weight and activity level.",
+        "carbs": "Primary energy source for the body. Complex carbs like whole grains provide sustained energy.",
+        "fat": "Essential for hormone production, vitamin absorption, and brain function. Focus on healthy fats like omega-3s.",
+        "fiber": "Supports digestive health, helps maintain steady blood sugar, and contributes to feelings of fullness.",
+        "magnesium": "Essential for muscle and nerve function, blood glucose control, and bone health.",
+        "vitamin C": "Supports immune function, collagen production, and acts as an antioxidant.",
+        "iron": "Critical for oxygen transport in the blood and energy metabolism.",
+        "calcium": "Essential for bone health, muscle function, and nerve signaling.",
+        "quinoa": "Quinoa is gluten-free and a complete protein, containing all nine essential amino acids.",
+        "probiotics": "Live beneficial bacteria that support gut health and may boost immune function.",
+        "keto diet": "A high-fat, very low-carbohydrate diet that forces the body to burn fats rather than carbs.",
+        "intermittent fasting": "An eating pattern that cycles between periods of eating and fasting, often used for weight management.",
+        "carbs": "Carbohydrates are not inherently 'bad'. They're the body's primary energy source. Focus on complex carbs like whole grains.",
+    }
+    return nutrition_facts
+
+def load_recipes():
+    recipes = [
+        {
+            "name": "Quinoa Salad",
+            "ingredients": ["1 cup quinoa", "2 cups water", "1 cucumber, diced", "1 bell pepper, diced", "1/4 cup olive oil", "2 tbsp lemon juice", "Salt and pepper to taste"],
+            "instructions": "1. Cook quinoa in water according to package instructions\n2. Mix with diced vegetables\n3. Dress with olive oil and lemon juice\n4. Season with salt and pepper",
+            "nutritional_info": "Calories: 350, Protein: 10g, Carbs: 42g, Fat: 16g, Fiber: 7g",
+            "diet_types": ["vegetarian", "vegan", "gluten-free"],
+            "meal_type": "lunch",
+        },
+        {
+            "name": "Grilled Chicken with Roasted Vegetables",
+            "ingredients": ["2 chicken breasts", "2 cups mixed vegetables (bell peppers, zucchini, onions)", "2 tbsp olive oil", "2 cloves garlic, minced", "1 tsp Italian herbs", "Salt and pepper to taste"],
+            "instructions": "1. Marinate chicken with olive oil, garlic, and herbs\n2. Grill chicken until cooked through\n3. Toss vegetables in olive oil, salt, and pepper\n4. Roast vegetables at 425°F for 20 minutes",
+            "nutritional_info": "Calories: 320, Protein: 35g, Carbs: 12g, Fat: 15g, Fiber: 4g",
+            "diet_types": ["keto", "paleo", "gluten-free"],
+            "meal_type": "dinner",
+        },
+        {
+            "name": "Berry Protein Smoothie",
+            "ingredients": ["1 cup mixed berries", "1 scoop protein powder", "1 cup almond milk", "1/2 banana", "1 tbsp chia seeds", "Ice cubes"],
+            "instructions": "Blend all ingredients until smooth.",
+            "nutritional_info": "Calories: 250, Protein: 20g, Carbs: 30g, Fat: 5g, Fiber: 8g",
+            "diet_types": ["vegetarian", "gluten-free"],
+            "meal_type": "breakfast",
+        },
+        {
+            "name": "Lentil Soup",
+            "ingredients": ["1 cup dry lentils", "1 onion, chopped", "2 carrots, diced", "2 celery stalks, diced", "4 cups vegetable broth", "2 cloves garlic, minced", "1 tsp cumin", "Salt and pepper to taste"],
+            "instructions": "1. Sauté onion, carrots, celery, and garlic\n2. Add lentils, broth, and spices\n3. Simmer for 30 minutes or until lentils are tender",
+            "nutritional_info": "Calories: 200, Protein: 12g, Carbs: 35g, Fat: 1g, Fiber: 15g",
+            "diet_types": ["vegetarian", "vegan", "gluten-free"],
+            "meal_type": "lunch",
+        },
+        {
+            "name": "Avocado Toast with Egg",
+            "ingredients": ["1 slice whole grain bread", "1/2 avocado", "1 egg", "Red pepper flakes", "Salt and pepper to taste"],
+            "instructions": "1. Toast bread\n2. Mash avocado and spread on toast\n3. Top with fried or poached egg\n4. Season with salt, pepper, and red pepper flakes",
+            "nutritional_info": "Calories: 300, Protein: 12g, Carbs: 20g, Fat: 18g, Fiber: 7g",
+            "diet_types": ["vegetarian"],
+            "meal_type": "breakfast",
+        }
+    ]
+    return recipes
+
+def load_meal_plans():
+    meal_plans = {
+        "weight_loss": {
+            "name": "Weight Loss Plan",
+            "description": "A balanced plan with calorie deficit to promote healthy weight loss",
+            "daily_calories": 1500,
+            "macros": {"protein": "30%", "carbs": "40%", "fat": "30%"},
+            "sample_day": {
+                "breakfast": "Greek yogurt with berries and honey",
+                "lunch": "Grilled chicken salad with olive oil dressing",
+                "dinner": "Baked salmon with steamed vegetables",
+                "snacks": ["Apple with almond butter", "Carrot sticks with hummus"]
+            }
+        },
+        "muscle_gain": {
+            "name": "Muscle Building Plan",
+            "description": "Higher protein and calories to support muscle growth",
+            "daily_calories": 2800,
+            "macros": {"protein": "35%", "carbs": "45%", "fat": "20%"},
+            "sample_day": {
+                "breakfast": "Oatmeal with protein powder, banana, and peanut butter",
+                "lunch": "Chicken breast with brown rice and vegetables",
+                "dinner": "Steak with sweet potato and broccoli",
+                "snacks": ["Protein shake with fruit", "Greek yogurt with nuts"]
+            }
+        },
+        "maintenance": {
+            "name": "Balanced Maintenance Plan",
+            "description": "Well-rounded nutrition to maintain current weight and support overall health",
+            "daily_calories": 2000,
+            "macros": {"protein": "25%", "carbs": "50%", "fat": "25%"},
+            "sample_day": {
+                "breakfast": "Scrambled eggs with toast and avocado",
+                "lunch": "Quinoa salad with vegetables and chickpeas",
+                "dinner": "Baked fish with roasted vegetables and brown rice",
+                "snacks": ["Fruit smoothie", "Mixed nuts"]
+            }
+        },
+        "vegetarian": {
+            "name": "Vegetarian Plan",
+            "description": "Plant-based proteins and balanced nutrition without meat",
+            "daily_calories": 1800,
+            "macros": {"protein": "20%", "carbs": "55%", "fat": "25%"},
+            "sample_day": {
+                "breakfast": "Smoothie with plant-based protein, berries, and spinach",
+                "lunch": "Lentil soup with whole grain bread",
+                "dinner": "Tofu stir-fry with vegetables and brown rice",
+                "snacks": ["Hummus with vegetable sticks", "Trail mix"]
+            }
+        },
+        "keto": {
+            "name": "Ketogenic Plan",
+            "description": "Very low carb, high fat to promote ketosis",
+            "daily_calories": 1800,
+            "macros": {"protein": "20%", "carbs": "5%", "fat": "75%"},
+            "sample_day": {
+                "breakfast": "Avocado and eggs with cheese",
+                "lunch": "Spinach salad with grilled chicken, olive oil, and nuts",
+                "dinner": "Baked salmon with asparagus and butter",
+                "snacks": ["Cheese cubes", "Olives"]
+            }
+        }
+    }
+    return meal_plans
+
+
+@dataclass
+class UserProfile:
+    name: str = ""
+    dietary_preferences: list = field(default_factory=list)
+    allergies: list = field(default_factory=list)
+    goal: str = ""
+    height: str = ""
+    weight: str = ""
+    activity_level: str = ""
+    onboarded: bool = False
+
+    @classmethod
+    def from_dict(cls, data):
+        names = {f.name for f in fields(cls)}
+        return cls(**{key: value for key, value in data.items() if key in names})
+
+    def to_dict(self):
+        return asdict(self)
+
+
+@dataclass
+class WaterTracker:
+    today: str = field(default_factory=lambda: datetime.now().strftime("%Y-%m-%d"))
+    glasses: int = 0
+
+    def add_glass(self):
+        # Start a fresh count on the first glass of a new day
+        today = datetime.now().strftime("%Y-%m-%d")
+        if today != self.today:
+            self.today, self.glasses = today, 0
+        self.glasses += 1
+        return self.glasses
+
+
+# What generate_meal_plan picks from; the same for every plan with a given goal, preferences and allergies
+MealPlanOptions = namedtuple("MealPlanOptions", ["base_plan", "suitable", "breakfast", "lunch", "dinner"])
+
+# Engine attributes built from each dataset, dropped by replace_data when it changes; cached replies
+# depend on every dataset but the meal plans, which only uncached meal plan replies read
+DERIVED = {
+    "food_data": ["router", "food_store", "fuzzy_index", "recipe_nutrients", "recipe_browser", "meal_optimizer",
+                  "response_cache"],
+    "nutrition_facts": ["router", "fuzzy_index", "semantic_index", "response_cache"],
+    "recipes": ["recipe_index", "recipe_browser", "meal_optimizer", "recipe_nutrients", "semantic_index",
+                "response_cache"],
+    "meal_plans": [],
+}
+
+
+def build_router(food_data, nutrition_facts):
+    """IntentRouter for the datasets; a food database's names stay on disk, looked up through its hash index"""
+    store = getattr(food_data, "store", None)
+    if store is not None:
+        return IntentRouter((), nutrition_facts.keys(), food_index=store.index)
+    return IntentRouter(food_data.keys(), nutrition_facts.keys())
+
+
+def recipe_details(recipe):
+    """Name, ingredients, instructions and nutrition of a recipe, formatted for chat"""
+    return "".join(recipe_detail_chunks(recipe))
+
+
+def recipe_detail_chunks(recipe):
+    """recipe_details() a line or section at a time"""
+    yield f"**{recipe['name']}**\n\n"
+    yield "**Ingredients:**\n"
+    for ingredient in recipe['ingredients']:
+        yield f"- {ingredient}\n"
+
+    yield "\n**Instructions:**\n"
+    yield recipe['instructions']
+
+    yield f"\n\n**Nutritional Information:**\n{recipe['nutritional_info']}"
+
+
+class NutriBot:
+    """Answers chat messages for explicit profiles and water trackers; holds no UI or session state"""
+
+    def __init__(self, food_data=None, nutrition_facts=None, recipes=None, meal_plans=None, response_cache=None,
+                 fuzzy_threshold=0.6, recipe_nutrients_path=None, semantic_threshold=0.12, semantic_index_path=None,
+                 metrics=None):
+        self.metrics = metrics if metrics is not None else METRICS
+        self.food_data = food_data if food_data is not None else load_food_data()
+        self.nutrition_facts = nutrition_facts if nutrition_facts is not None else load_nutrition_facts()
+        self.recipes = recipes if recipes is not None else load_recipes()
+        self.meal_plans = meal_plans if meal_plans is not None else load_meal_plans()
+        self.response_cache = response_cache if response_cache is not None else ResponseCache()
+        self.router = build_router(self.food_data, self.nutrition_facts)
+        self.recipe_index = RecipeIndex(self.recipes)
+        self.fuzzy_threshold = fuzzy_threshold
+        self.recipe_nutrients_path = recipe_nutrients_path
+        self.semantic_threshold = semantic_threshold
+        self.semantic_index_path = semantic_index_path
+
+    @classmethod
+    def from_database(cls, path, **kwargs):
+        """Engine whose foods come from a memory-mapped file built with `python food_db.py build`"""
+        from food_db import FoodDatabase
+        return cls(food_data=FoodDatabase.open(path), **kwargs)
+
+    def replace_data(self, **datasets):
+        """Copy of this engine with some datasets replaced (food_data=..., recipes=..., ...)
+
+        The copy shares every index and cache built only from the other
+        datasets and rebuilds the rest as they are used; this engine is left
+        as it was, so requests already running on it finish undisturbed.
+        """
+        engine = copy.copy(self)
+        stale = set()
+        for name, data in datasets.items():
+            setattr(engine, name, data)
+            stale.update(DERIVED[name])
+        for name in stale:
+            engine.__dict__.pop(name, None)
+        if "response_cache" in stale:
+            engine.response_cache = self.response_cache.fresh()
+        if "router" in stale:
+            engine.router = build_router(engine.food_data, engine.nutrition_facts)
+        if "recipe_index" in stale:
+            with self.metrics.timer("nutribot_index_build_seconds", index="recipe_index"):
+                engine.recipe_index = RecipeIndex(engine.recipes)
+        return engine
+
+    def built_indexes(self):
+        """Names of the lazily built indexes this engine has built so far"""
+        return [name for name, value in vars(type(self)).items()
+                if isinstance(value, cached_property) and name in self.__dict__]
+
+    @cached_property
+    def food_store(self):
+        from food_store import FoodStore
+        store = getattr(self.food_data, "store", None)
+        if store is not None:
+            return store
+        with self.metrics.timer("nutribot_index_build_seconds", index="food_store"):
+            return FoodStore.from_dict(self.food_data)
+
+    @cached_property
+    def fuzzy_index(self):
+        from fuzzy_index import FuzzyIndex
+        keys = dict.fromkeys(self.food_data.keys())
+        keys.update(dict.fromkeys(self.nutrition_facts.keys()))
+        with self.metrics.timer("nutribot_index_build_seconds", index="fuzzy_index"):
+            return FuzzyIndex(keys, threshold=self.fuzzy_threshold)
+
+    @cached_property
+    def recipe_nutrients(self):
+        """Per-serving nutrients of each recipe, stated or estimated from its ingredients; reuses the saved file"""
+        from recipe_nutrients import RecipeNutrients
+        path = self.recipe_nutrients_path
+        with self.metrics.timer("nutribot_index_build_seconds", index="recipe_nutrients"):
+            if path and os.path.exists(path):
+                nutrients = RecipeNutrients.load(path, self.recipes, self.food_data)
+                if not nutrients.recomputed:
+                    return nutrients
+            else:
+                nutrients = RecipeNutrients(self.recipes, self.food_data)
+            if path:
+                nutrients.save(path)
+            return nutrients
+
+    @cached_property
+    def semantic_index(self):
+        """TF-IDF index over nutrition facts and recipes, reusing the saved file when it is current"""
+        from semantic_index import SemanticIndex, documents, fingerprint
+        docs = documents(self.nutrition_facts, self.recipes)
+        path = self.semantic_index_path
+        with self.metrics.timer("nutribot_index_build_seconds", index="semantic_index"):
+            if path and os.path.exists(path):
+                index = SemanticIndex.load(path)
+                if index.fingerprint == fingerprint(docs):
+                    return index
+            index = SemanticIndex(docs)
+            if path:
+                index.save(path)
+            return index
+
+    @cached_property
+    def recipe_browser(self):
+        from recipe_browser import RecipeBrowser
+        nutrients = self.recipe_nutrients
+        with self.metrics.timer("nutribot_index_build_seconds", index="recipe_browser"):
+            return RecipeBrowser(self.recipe_index, nutrients)
+
+    @cached_property
+    def meal_optimizer(self):
+        from meal_optimizer import MealPlanOptimizer
+        nutrients = self.recipe_nutrients
+        with self.metrics.timer("nutribot_index_build_seconds", index="meal_optimizer"):
+            return MealPlanOptimizer(self.recipe_index, nutrients)
+
+    def respond(self, user_input, profile, tracker=None, optimize=False):
+        """Reply to one message, reusing cached replies where the answer is deterministic"""
+        metrics = self.metrics
+        with metrics.request("nutribot_request_seconds") as request:
+            user_input, route = self.route_message(user_input)
+            request.label(intent=route.intent)
+            if route.intent not in CACHEABLE_INTENTS:
+                with metrics.timer("nutribot_stage_seconds", stage="build", intent=route.intent):
+                    return self.build_response(user_input, route, profile, tracker, optimize)
+
+            key = response_cache_key(user_input, profile)
+            response = self.response_cache.get(key)
+            if response is None:
+                metrics.inc("nutribot_response_cache_total", result="miss")
+                with metrics.timer("nutribot_stage_seconds", stage="build", intent=route.intent):
+                    response = self.build_response(user_input, route, profile, tracker, optimize)
+                if response is not None:
+                    self.response_cache.put(key, response)
+            else:
+                metrics.inc("nutribot_response_cache_total", result="hit")
+            return response
+
+    def respond_stream(self, user_input, profile, tracker=None, optimize=False):
+        """respond() as a generator of markdown chunks that join to its reply; yields nothing where it returns None
+
+        A cached reply comes out as a single chunk. The stream is timed like
+        respond(), from the first chunk asked for until the last is taken or
+        the stream is closed; the time to the first chunk is recorded as
+        nutribot_first_chunk_seconds.
+        """
+        metrics = self.metrics
+        start = time.perf_counter()
+        with metrics.request("nutribot_request_seconds") as request:
+            user_input, route = self.route_message(user_input)
+            request.label(intent=route.intent)
+            key = None
+            if route.intent in CACHEABLE_INTENTS:
+                key = response_cache_key(user_input, profile)
+                response = self.response_cache.get(key)
+                if response is not None:
+                    metrics.inc("nutribot_response_cache_total", result="hit")
+                    metrics.observe("nutribot_first_chunk_seconds", time.perf_counter() - start, intent=route.intent)
+                    yield response
+                    return
+                metrics.inc("nutribot_response_cache_total", result="miss")
+
+            chunks = []
+            with metrics.timer("nutribot_stage_seconds", stage="build", intent=route.intent):
+                for chunk in self.response_chunks(user_input, route, profile, tracker, optimize):
+                    if not chunks:
+                        metrics.observe("nutribot_first_chunk_seconds", time.perf_counter() - start,
+                                        intent=route.intent)
+                    chunks.append(chunk)
+                    yield chunk
+            if key is not None and chunks:
+                self.response_cache.put(key, "".join(chunks))
+
+    def route_message(self, user_input):
+        """Lowercase a message, correct its spelling if no intent matched, and route it"""
+        user_input = user_input.lower()
+        with self.metrics.timer("nutribot_stage_seconds", stage="route"):
+            route = self.router.route(user_input)
+        if route.intent == "fallback":
+            with self.metrics.timer("nutribot_stage_seconds", stage="spell_correct"):
+                user_input, route = self.correct_spelling(user_input, route)
+        return user_input, route
+
+    def correct_spelling(self, user_input, route):
+        """Swap a misspelled food or nutrient name for its closest key and route the message again"""
+        if self.fuzzy_threshold is None:
+            return user_input, route
+        span = self.fuzzy_index.find_in(user_input)
+        if span is None:
+            return user_input, route
+        corrected = user_input[:span.start] + span.key + user_input[span.end:]
+        return corrected, self.router.route(corrected)
+
+    def semantic_match(self, user_input):
+        """Closest nutrition fact or recipe to a message no keyword matched, or None"""
+        if self.semantic_threshold is None:
+            return None
+        with self.metrics.timer("nutribot_stage_seconds", stage="semantic"):
+            hits = self.semantic_index.search(user_input, k=1)
+        return hits[0] if hits and hits[0].score >= self.semantic_threshold else None
+
+    def respond_many(self, queries, profiles, trackers=None, optimize=False):
+        """Reply to a batch of messages.
+
+        profiles is either one profile for every query or a sequence aligned
+        with queries; trackers likewise (water messages without a tracker get
+        a fresh one). Sequences of another length than queries raise ValueError.
+        """
+        if isinstance(profiles, UserProfile):
+            profiles = [profiles] * len(queries)
+        # Any single tracker, including a profile store's, is shared; only sequences are aligned
+        if trackers is None or hasattr(trackers, "add_glass"):
+            trackers = [trackers] * len(queries)
+        for name, values in (("profiles", profiles), ("trackers", trackers)):
+            if len(values) != len(queries):
+                raise ValueError(f"{len(queries)} queries but {len(values)} {name}")
+        return [self.respond(query, profile, tracker, optimize)
+                for query, profile, tracker in zip(queries, profiles, trackers)]
+
+    def generate_meal_plan(self, goal, preferences=None, allergies=None, days=3, optimize=False, seed=None):
+        """Generate a personalized meal plan based on user preferences
+
+        With optimize=True, meals are chosen to match the base plan's daily
+        calories and macros instead of at random. A seed (a non-negative int)
+        makes the plan reproducible.
+        """
+        return self.build_meal_plan(goal, self.meal_plan_options(goal, preferences, allergies), days, optimize, seed)
+
+    def generate_meal_plans(self, profiles, days=3, optimize=False, seeds=None):
+        """Meal plans for many profiles, filtering recipes once per distinct goal, preferences and allergies
+
+        seeds, if given, holds one seed per profile.
+        """
+        options = {}
+        plans = []
+        for i, profile in enumerate(profiles):
+            goal = profile.goal or "maintenance"
+            key = (goal, frozenset(profile.dietary_preferences), frozenset(profile.allergies))
+            if key not in options:
+                options[key] = self.meal_plan_options(goal, profile.dietary_preferences, profile.allergies)
+            plans.append(self.build_meal_plan(goal, options[key], days, optimize, None if seeds is None else seeds[i]))
+        return plans
+
+    def base_meal_plan(self, goal, preferences=None):
+        """Bundled plan whose calories and macros a goal and preferences aim for"""
+        preferences = preferences or []
+        if goal.lower() == "weight loss":
+            return self.meal_plans["weight_loss"]
+        elif goal.lower() == "muscle gain":
+            return self.meal_plans["muscle_gain"]
+        elif "vegetarian" in preferences:
+            return self.meal_plans["vegetarian"]
+        elif "keto" in preferences:
+            return self.meal_plans["keto"]
+        return self.meal_plans["maintenance"]
+
+    def meal_plan_options(self, goal, preferences=None, allergies=None):
+        """Base plan, suitable recipes and the recipes to pick from per meal, shared by every plan for these fields"""
+        if not preferences:
+            preferences = []
+        if not allergies:
+            allergies = []
+        base_plan = self.base_meal_plan(goal, preferences)
+    
+        # Filter recipes based on preferences and allergies (very simplified)
+        with self.metrics.timer("nutribot_stage_seconds", stage="filter"):
+            suitable = self.recipe_index.filter(preferences, allergies)
+            suitable_recipes = self.recipe_index.select(suitable)
+    
+            # Create a meal plan (simplified)
+            breakfast_options = self.recipe_index.select(suitable, "breakfast")
+            lunch_options = self.recipe_index.select(suitable, "lunch")
+            dinner_options = self.recipe_index.select(suitable, "dinner")
+    
+        # If no specific meal type recipes available, use any suitable recipe
+        if not breakfast_options:
+            breakfast_options = suitable_recipes
+        if not lunch_options:
+            lunch_options = suitable_recipes
+        if not dinner_options:
+            dinner_options = suitable_recipes
+        return MealPlanOptions(base_plan, suitable, breakfast_options, lunch_options, dinner_options)
+
+    def build_meal_plan(self, goal, options, days=3, optimize=False, seed=None):
+        """Meal plan for a goal from meal_plan_options(); see generate_meal_plan"""
+        return {
+            "goal": goal,
+            "daily_calories": options.base_plan["daily_calories"],
+            "macros": options.base_plan["macros"],
+            "days": list(self.meal_plan_days(goal, options, days, optimize, seed))
+        }
+
+    def meal_plan_days(self, goal, options, days=3, optimize=False, seed=None):
+        """Yield the days of build_meal_plan() one at a time, each as soon as it is picked"""
+        base_plan, suitable, breakfast_options, lunch_options, dinner_options = options
+        rng = random if seed is None else random.Random(seed)
+    
+        optimized_days = iter(())
+        if optimize:
+            from meal_optimizer import daily_targets
+            optimizer = self.meal_optimizer
+            if seed is None:
+                optimized_days = optimizer.plan_days(daily_targets(base_plan), suitable, days)
+            else:
+                # Without a time budget the search, and so the plan, does not depend on machine speed
+                optimized_days = optimizer.plan_days(daily_targets(base_plan), suitable, days, time_budget=None, seed=seed)
+    
+        for day in range(1, days + 1):
+            with self.metrics.timer("nutribot_stage_seconds", stage="optimize") if optimize else NULL_TIMER:
+                recipe_ids = next(optimized_days, None)
+            if recipe_ids is not None:
+                breakfast, lunch, dinner = (self.recipe_index.recipes[i]["name"] for i in recipe_ids)
+                yield {
+                    "day": day,
+                    "breakfast": breakfast,
+                    "lunch": lunch,
+                    "dinner": dinner,
+                    "snacks": ["Fruit and nuts", "Yogurt"] if goal != "weight loss" else ["Celery with hummus"],
+                    "nutrients": self.meal_optimizer.totals(recipe_ids)
+                }
+            else:
+                yield {
+                    "day": day,
+                    "breakfast": rng.choice(breakfast_options)["name"] if breakfast_options else "Custom breakfast based on preferences",
+                    "lunch": rng.choice(lunch_options)["name"] if lunch_options else "Custom lunch based on preferences",
+                    "dinner": rng.choice(dinner_options)["name"] if dinner_options else "Custom dinner based on preferences",
+                    "snacks": ["Fruit and nuts", "Yogurt"] if goal != "weight loss" else ["Celery with hummus"]
+                }
+
+    def build_response(self, user_input, route, profile, tracker=None, optimize=False):
+        """Build the reply for a lowercased message and its route, or None if no branch answers it"""
+        chunks = list(self.response_chunks(user_input, route, profile, tracker, optimize))
+        return "".join(chunks) if chunks else None
+
+    def response_chunks(self, user_input, route, profile, tracker=None, optimize=False):
+        """build_response() as a generator of markdown chunks, each yielded as soon as it is known"""
+        # Meal plan request
+        if route.intent == "meal_plan":
+            goal = profile.goal if profile.goal else "maintenance"
+            preferences = profile.dietary_preferences
+            allergies = profile.allergies
+            base_plan = self.base_meal_plan(goal, preferences)
+        
+            # The header needs only the base plan, so it goes out before any recipe is filtered
+            yield f"Here's a meal plan tailored for your {goal} goal:\n\n"
+            yield f"Daily target: ~{base_plan['daily_calories']} calories\n"
+            yield f"Macros: {base_plan['macros']['protein']} protein, {base_plan['macros']['carbs']} carbs, {base_plan['macros']['fat']} fat\n\n"
+        
+            options = self.meal_plan_options(goal, preferences, allergies)
+            for day in self.meal_plan_days(goal, options, optimize=optimize):
+                response = f"Day {day['day']}:\n"
+                response += f"- Breakfast: {day['breakfast']}\n"
+                response += f"- Lunch: {day['lunch']}\n"
+                response += f"- Dinner: {day['dinner']}\n"
+                response += f"- Snacks: {', '.join(day['snacks'])}\n"
+                if "nutrients" in day:
+                    nutrients = day["nutrients"]
+                    response += f"- Meals total: ~{nutrients['calories']:.0f} calories, {nutrients['protein']:.0f}g protein, {nutrients['carbs']:.0f}g carbs, {nutrients['fat']:.0f}g fat\n"
+                response += "\n"
+                yield response
+    
+        # Recipe browsing: filters, order and page come from the message, and the profile's allergies are excluded
+        elif route.intent == "browse":
+            from recipe_browser import CURSOR, describe, parse_query
+            query, cursor = parse_query(user_input)
+            query = query._replace(exclude=tuple(dict.fromkeys(query.exclude + tuple(profile.allergies))))
+            try:
+                page = self.recipe_browser.search(query, cursor)
+            except ValueError:
+                yield "That page link belongs to a different sort order. Ask again without the \"after ...\" part to start over."
+                return
+            if not page.ids:
+                yield "I couldn't find any recipes matching those filters. Try loosening them."
+                return
+        
+            yield f"Found {page.total} recipes ({describe(query)}):\n\n"
+            for recipe_id in page.ids:
+                recipe = self.recipes[recipe_id]
+                yield f"- **{recipe['name']}** ({recipe['meal_type']}): {recipe['nutritional_info']}\n"
+            if page.next_cursor:
+                yield f'\nFor more, ask: "{CURSOR.sub("", user_input).strip()} after {page.next_cursor}"'
+    
+        # Recipe request
+        elif route.intent == "recipe":
+            diet_type = route.first("diet")
+        
+            # Same recipes in the same order as scanning self.recipes, so the pick is unchanged
+            filtered_ids = range(len(self.recipes))
+            if diet_type:
+                filtered_ids = self.recipe_index.ids(self.recipe_index.filter([diet_type]))
+        
+            if not filtered_ids:
+                yield "I don't have any recipes matching those criteria. Try asking for a different type of recipe."
+                return
+        
+            chosen_recipe = self.recipes[random.choice(filtered_ids)]
+        
+            yield f"Here's a {diet_type + ' ' if diet_type else ''}recipe you might enjoy:\n\n"
+            yield from recipe_detail_chunks(chosen_recipe)
+    
+        # Nutrition information
+        elif route.intent == "nutrition":
+            if route.has("what is", "tell me about", "benefits"):
+                nutrient = route.first("nutrient")
+                yield f"**{nutrient.capitalize()}**: {self.nutrition_facts[nutrient]}"
+            else:
+                # We found a keyword but not a direct question
+                yield "I can provide information about various nutrients and foods. Could you ask more specifically what you'd like to know?"
+    
+        # Food information
+        elif route.intent == "food":
+            food = route.first("food")
+            info = self.food_store.get(food)
+            yield f"**Nutritional information for {food}**:\n"
+            yield f"- Calories: {info['calories']}\n"
+            yield f"- Protein: {info['protein']}g\n"
+            yield f"- Carbs: {info['carbs']}g\n"
+            yield f"- Fat: {info['fat']}g\n"
+            yield f"- Fiber: {info['fiber']}g\n"
+    
+        # Dietary questions
+        elif route.intent == "diet":
+            if route.has("how much protein"):
+                yield "A general guideline is to consume 0.8-1g of protein per pound of body weight if you're active, or 0.36g per pound for sedentary individuals. Athletes may need up to 1.2-2g per pound depending on training intensity."
+        
+            elif route.has("lose weight"):
+                yield "Weight loss requires creating a calorie deficit through diet and exercise. Focus on whole foods, plenty of protein and fiber, and reduce processed foods and added sugars. A sustainable approach is aiming for 0.5-1 pound of weight loss per week."
+        
+            elif route.has("keto"):
+                yield "The ketogenic diet is very low in carbohydrates (typically <50g per day), moderate in protein, and high in fat. It forces your body to burn fats rather than carbohydrates for energy. While effective for some, it's restrictive and not suitable for everyone."
+    
+        # General healthy eating
+        elif route.intent == "healthy_eating":
+            yield "A healthy diet includes a variety of fruits, vegetables, whole grains, lean proteins, and healthy fats. Minimize processed foods, added sugars, and excessive sodium. Stay hydrated and practice portion control. Consistency is more important than perfection."
+    
+        # Water tracking
+        elif route.intent == "water":
+            if tracker is None:
+                tracker = WaterTracker()
+            tracker.add_glass()
+            yield f"Great job staying hydrated! I've logged another glass of water. You've had {tracker.glasses} glasses today."
+    
+        # Add this condition in the respond method
+        elif route.intent == "breakfast":
+            if route.has("weight loss", "diet"):
+                yield "Here are some healthy breakfast options for weight loss:\n\n"
+                yield "1. Greek yogurt with berries and a sprinkle of nuts (300 calories)\n"
+                yield "2. Veggie omelet with 2 eggs and spinach (250 calories)\n"
+                yield "3. Overnight oats with almond milk and chia seeds (350 calories)\n"
+                yield "4. Protein smoothie with spinach, banana, and protein powder (300 calories)\n"
+                yield "5. Avocado toast on whole grain bread with a boiled egg (340 calories)\n\n"
+                yield "These options are high in protein and fiber to keep you full longer while maintaining a calorie deficit."
+    
+        # Fallback response, unless the message is close to a nutrition fact or recipe
+        else:
+            hit = self.semantic_match(user_input)
+            if hit is not None and hit.kind == "fact":
+                yield f"I'm not sure I understood, but this might help:\n\n**{hit.key.capitalize()}**: {self.nutrition_facts[hit.key]}"
+            elif hit is not None:
+                yield "I'm not sure I understood, but this recipe might fit:\n\n"
+                yield from recipe_detail_chunks(self.recipes[hit.key])
+            else:
+                yield "I'm your nutrition advisor. I can help with meal planning, provide nutrition information, suggest recipes, or answer questions about healthy eating. What would you like to know?"
@@ -0,0 +1,260 @@
+"""Durable profiles and water-tracker history in SQLite (WAL mode).
+
+    store = ProfileStore("nutribot_users.db")
+    store.save_profile("u1", UserProfile(name="Sam", goal="Weight Loss"))
+    tracker = store.tracker("u1")      # WaterTracker interface for NutriBot.respond
+    tracker.add_glass()
+    store.history("u1", days=7)        # [("2024-05-01", 3), ...], newest first
+
+Writes are queued and coalesced in memory: several saves of one profile
+become one row write, several glasses for one user and day become one
+increment. A background thread flushes the queue every flush_interval
+seconds in a single transaction, or sooner once max_pending users are
+waiting. Reads are answered from an in-process LRU cache that already
+includes queued writes, so a rerun never waits on the database.
+
+Water counts are kept per user and calendar day, so a new day starts at
+zero and earlier days stay available as history.
+"""
+import atexit
+import json
+import os
+import sqlite3
+import sys
+import threading
+from collections import OrderedDict
+from datetime import date, timedelta
+
+from nutribot_engine import UserProfile
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS profiles (
+    user_id TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS water (
+    user_id TEXT NOT NULL,
+    day TEXT NOT NULL,
+    glasses INTEGER NOT NULL,
+    PRIMARY KEY (user_id, day)
+) WITHOUT ROWID;
+"""
+
+# Where the app and the server keep profiles unless told otherwise: outside the working tree, so running
+# from a checkout leaves it clean
+DEFAULT_PATH = os.environ.get("NUTRIBOT_PROFILE_DB",
+                              os.path.join(os.path.expanduser("~"), ".nutribot", "nutribot_users.db"))
+
+# Marks a cached profile lookup that found nothing
+_MISSING = object()
+
+
+class StoredWaterTracker:
+    """WaterTracker interface over the store, so glasses logged through NutriBot.respond persist"""
+
+    def __init__(self, store, user_id):
+        self.store = store
+        self.user_id = user_id
+
+    @property
+    def today(self):
+        return self.store.today()
+
+    @property
+    def glasses(self):
+        return self.store.glasses(self.user_id)
+
+    def add_glass(self):
+        return self.store.add_glass(self.user_id)
+
+
+class ProfileStore:
+    def __init__(self, path, flush_interval=1.0, max_pending=10_000, cache_size=100_000, today=None):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.cache_size = cache_size
+        self._today = today or (lambda: date.today().isoformat())
+        # Cache misses read through one connection while flushes write through the other
+        self._reader = self._connect()
+        self._writer = self._connect()
+        self._writer.executescript(SCHEMA)
+        self._lock = threading.RLock()
+        self._write_lock = threading.Lock()
+        self._profiles = OrderedDict()
+        self._water = OrderedDict()
+        self._history = OrderedDict()
+        self._pending_profiles = {}
+        self._pending_glasses = {}
+        # Changes taken by a flush that has not committed yet
+        self._flushing_profiles = {}
+        self._flushing_glasses = {}
+        self.flushes = 0
+        self.rows_written = 0
+        self.failed_flushes = 0
+        self.last_error = None
+
+        self._closed = threading.Event()
+        self._flusher = None
+        if flush_interval:
+            self._flusher = threading.Thread(target=self._flush_periodically, name="profile-store-flush", daemon=True)
+            self._flusher.start()
+        atexit.register(self.close)
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    def today(self):
+        return self._today()
+
+    def get_profile(self, user_id):
+        """The saved profile, or None for an unknown user"""
+        with self._lock:
+            profile = self._profiles.get(user_id)
+            if profile is not None:
+                self._profiles.move_to_end(user_id)
+                return None if profile is _MISSING else profile
+            data = self._pending_profiles.get(user_id) or self._flushing_profiles.get(user_id)
+            if data is None:
+                row = self._reader.execute("SELECT data FROM profiles WHERE user_id = ?", (user_id,)).fetchone()
+                data = row[0] if row else None
+            profile = UserProfile.from_dict(json.loads(data)) if data else _MISSING
+            self._remember(self._profiles, user_id, profile)
+            return None if profile is _MISSING else profile
+
+    def save_profile(self, user_id, profile):
+        with self._lock:
+            self._remember(self._profiles, user_id, profile)
+            self._pending_profiles[user_id] = json.dumps(profile.to_dict())
+            full = self._pending_count() >= self.max_pending
+        if full:
+            self.flush()
+
+    def tracker(self, user_id):
+        return StoredWaterTracker(self, user_id)
+
+    def glasses(self, user_id):
+        """Glasses logged today"""
+        with self._lock:
+            return self._today_entry(user_id)[1]
+
+    def add_glass(self, user_id):
+        with self._lock:
+            entry = self._today_entry(user_id)
+            entry[1] += 1
+            key = (user_id, entry[0])
+            self._pending_glasses[key] = self._pending_glasses.get(key, 0) + 1
+            glasses = entry[1]
+            full = self._pending_count() >= self.max_pending
+        if full:
+            self.flush()
+        return glasses
+
+    def history(self, user_id, days=7):
+        """(day, glasses) for the last `days` days with any glasses, newest first"""
+        today = self.today()
+        with self._lock:
+            # Earlier days no longer change, so they are read once per user and day
+            cached = self._history.get(user_id)
+            if cached is None or cached[0] != (today, days):
+                since = (date.fromisoformat(today) - timedelta(days=days - 1)).isoformat()
+                past = dict(self._reader.execute(
+                    "SELECT day, glasses FROM water WHERE user_id = ? AND day >= ? AND day < ?",
+                    (user_id, since, today)))
+                for queued in (self._pending_glasses, self._flushing_glasses):
+                    for (queued_user, day), glasses in queued.items():
+                        if queued_user == user_id and since <= day < today:
+                            past[day] = past.get(day, 0) + glasses
+                cached = ((today, days), past)
+                self._remember(self._history, user_id, cached)
+            counts = dict(cached[1])
+            glasses = self._today_entry(user_id)[1]
+        if glasses:
+            counts[today] = glasses
+        return sorted(counts.items(), reverse=True)
+
+    def flush(self):
+        """Write every queued change in one transaction; returns the number of rows written"""
+        with self._write_lock:
+            with self._lock:
+                if not self._pending_count():
+                    return 0
+                profiles, self._pending_profiles = self._pending_profiles, {}
+                glasses, self._pending_glasses = self._pending_glasses, {}
+                self._flushing_profiles, self._flushing_glasses = profiles, glasses
+            try:
+                self._writer.execute("BEGIN")
+                self._writer.executemany(
+                    "INSERT INTO profiles (user_id, data) VALUES (?, ?) "
+                    "ON CONFLICT (user_id) DO UPDATE SET data = excluded.data",
+                    profiles.items())
+                self._writer.executemany(
+                    "INSERT INTO water (user_id, day, glasses) VALUES (?, ?, ?) "
+                    "ON CONFLICT (user_id, day) DO UPDATE SET glasses = glasses + excluded.glasses",
+                    ((user_id, day, count) for (user_id, day), count in glasses.items()))
+                # Readers count in-flight changes until the commit makes them visible
+                with self._lock:
+                    self._writer.execute("COMMIT")
+                    self._flushing_profiles, self._flushing_glasses = {}, {}
+            except BaseException:
+                if self._writer.in_transaction:
+                    self._writer.execute("ROLLBACK")
+                with self._lock:
+                    # Put the changes back so the next flush retries them
+                    for user_id, data in profiles.items():
+                        self._pending_profiles.setdefault(user_id, data)
+                    for key, count in glasses.items():
+                        self._pending_glasses[key] = self._pending_glasses.get(key, 0) + count
+                    self._flushing_profiles, self._flushing_glasses = {}, {}
+                raise
+            self.flushes += 1
+            self.rows_written += len(profiles) + len(glasses)
+            return len(profiles) + len(glasses)
+
+    def close(self):
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        self.flush()
+        self._reader.close()
+        self._writer.close()
+
+    def _pending_count(self):
+        return len(self._pending_profiles) + len(self._pending_glasses)
+
+    def _today_entry(self, user_id):
+        # [day, glasses] for the current day; a cached count from an earlier day is replaced
+        today = self.today()
+        entry = self._water.get(user_id)
+        if entry is None or entry[0] != today:
+            row = self._reader.execute("SELECT glasses FROM water WHERE user_id = ? AND day = ?",
+                                       (user_id, today)).fetchone()
+            key = (user_id, today)
+            glasses = (row[0] if row else 0) + self._pending_glasses.get(key, 0) + self._flushing_glasses.get(key, 0)
+            entry = [today, glasses]
+            self._remember(self._water, user_id, entry)
+        else:
+            self._water.move_to_end(user_id)
+        return entry
+
+    def _remember(self, cache, key, value):
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > self.cache_size:
+            cache.popitem(last=False)
+
+    def _flush_periodically(self):
+        while not self._closed.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as exc:
+                # The changes went back on the queue; the next tick retries them
+                self.failed_flushes += 1
+                self.last_error = f"{type(exc).__name__}: {exc}"
+                print(f"Profile store flush failed, {self._pending_count()} changes still queued: {self.last_error}",
+                      file=sys.stderr)
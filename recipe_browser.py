@@ -0,0 +1,203 @@
+"""Filtered, sorted and paginated recipe listings over a large catalog.
+
+    browser = RecipeBrowser(RecipeIndex(recipes), RecipeNutrients(recipes, load_food_data()))
+    query = Query(diets=("vegan",), meal_type="dinner", exclude=("nuts",),
+                  ranges=(("calories", None, 600),), sort="protein", descending=True)
+    page = browser.search(query, limit=10)         # Page(ids=[...], next_cursor="protein.d.8812", total=1234)
+    browser.search(query, page.next_cursor)        # the next ten
+
+Each sort key has a permutation of the catalog, computed once, and every
+page walks it from the cursor, checking candidates against the query's
+match mask; a page costs about its size divided by the share of recipes
+that match, whatever page it is. A range on the sort key itself narrows
+the walk by binary search over the sorted values. Match masks are built
+from the RecipeIndex bitsets and nutrient columns once per distinct filter
+and remembered, so paging through a query does not rebuild it.
+
+Nutrients come from RecipeNutrients: the recipes' own nutritional_info,
+the figures the chat shows, or an estimate from the ingredients for a
+recipe that states none. parse_query turns a chat message such as "browse vegan dinner
+recipes without nuts under 600 calories by most protein" into a Query.
+"""
+import re
+from collections import namedtuple
+
+import numpy as np
+
+from intent_router import RECIPE_DIET_TYPES
+from meal_optimizer import MEAL_SLOTS
+
+NUTRIENTS = ["calories", "protein", "carbs", "fat", "fiber"]
+SORT_KEYS = ["name"] + NUTRIENTS
+
+# Sort keys whose natural order in a listing is highest first
+DEFAULT_DESCENDING = {"protein", "fiber"}
+
+# Recipes per page unless a caller asks otherwise
+PAGE_SIZE = 10
+
+# Match masks remembered per browser before the memo is reset
+MASK_CACHE_SIZE = 64
+
+Query = namedtuple("Query", ["diets", "meal_type", "exclude", "ranges", "sort", "descending"],
+                   defaults=[(), None, (), (), "name", False])
+Page = namedtuple("Page", ["ids", "next_cursor", "total"])
+
+
+class RecipeBrowser:
+    def __init__(self, recipe_index, recipe_nutrients):
+        self.index = recipe_index
+        recipes = recipe_index.recipes
+        # Copies, so the sort orders below stay valid if the nutrients are updated in place
+        self.values = {nutrient: recipe_nutrients.column(nutrient).copy() for nutrient in NUTRIENTS}
+        names = np.array([recipe["name"].lower() for recipe in recipes], dtype=str)
+        # Stable sorts, so recipes that tie stay in catalog order
+        self.orders = {"name": np.argsort(names, kind="stable")}
+        self.sorted_values = {}
+        for nutrient, values in self.values.items():
+            order = self.orders[nutrient] = np.argsort(values, kind="stable")
+            self.sorted_values[nutrient] = values[order]
+        self._masks = {}
+
+    def __len__(self):
+        return len(self.index)
+
+    def search(self, query, cursor=None, limit=PAGE_SIZE):
+        """One page of recipe ids matching query, in its sort order, from cursor (None for the first page)"""
+        if query.sort not in self.orders:
+            raise ValueError(f"unknown sort key {query.sort!r}")
+        mask, total = self._match(query)
+        order = self.orders[query.sort]
+        low, high = self._bounds(query)
+        start = decode_cursor(cursor, query) if cursor else (high - 1 if query.descending else low)
+
+        ids, following = [], None
+        position, step = start, max(limit * 2, 64)
+        while low <= position < high:
+            if query.descending:
+                block = order[max(position - step + 1, low):position + 1][::-1]
+            else:
+                block = order[position:min(position + step, high)]
+            hits = np.flatnonzero(mask[block])
+            wanted = limit - len(ids)
+            ids.extend(block[hits[:wanted]].tolist())
+            if len(hits) > wanted:
+                # The next page starts at the first match past this one
+                following = position + (-1 if query.descending else 1) * int(hits[wanted])
+                break
+            position += -len(block) if query.descending else len(block)
+            step *= 2
+        return Page(ids, None if following is None else encode_cursor(query, following), total)
+
+    def _bounds(self, query):
+        """Range of positions in the sort order that a range on the sort key allows"""
+        low, high = 0, len(self.index)
+        for nutrient, minimum, maximum in query.ranges:
+            if nutrient == query.sort:
+                values = self.sorted_values[nutrient]
+                if minimum is not None:
+                    low = max(low, int(np.searchsorted(values, minimum, side="left")))
+                if maximum is not None:
+                    high = min(high, int(np.searchsorted(values, maximum, side="right")))
+        return low, high
+
+    def _match(self, query):
+        key = (tuple(query.diets), query.meal_type, tuple(query.exclude), tuple(query.ranges))
+        entry = self._masks.get(key)
+        if entry is None:
+            bits = self.index.filter(query.diets, query.exclude)
+            if query.meal_type:
+                bits &= self.index.meal_types.get(query.meal_type, 0)
+            size = len(self.index)
+            mask = np.unpackbits(np.frombuffer(bits.to_bytes((size + 7) // 8, "little"), dtype=np.uint8),
+                                 bitorder="little")[:size].astype(bool)
+            for nutrient, minimum, maximum in query.ranges:
+                if minimum is not None:
+                    mask &= self.values[nutrient] >= minimum
+                if maximum is not None:
+                    mask &= self.values[nutrient] <= maximum
+            if len(self._masks) >= MASK_CACHE_SIZE:
+                self._masks.clear()
+            entry = self._masks[key] = (mask, int(mask.sum()))
+        return entry
+
+
+def encode_cursor(query, position):
+    return f"{query.sort}.{'d' if query.descending else 'a'}.{position}"
+
+
+def decode_cursor(cursor, query):
+    """Position in the sort order a cursor resumes from; cursors only fit queries with the same sort"""
+    sort, direction, position = cursor.split(".")
+    if sort != query.sort or direction != ("d" if query.descending else "a"):
+        raise ValueError(f"cursor {cursor!r} is for another sort order")
+    return int(position)
+
+
+NUTRIENT_WORDS = {"calories": "calories", "calorie": "calories", "kcal": "calories", "protein": "protein",
+                  "carbs": "carbs", "carb": "carbs", "carbohydrates": "carbs", "fat": "fat", "fiber": "fiber",
+                  "fibre": "fiber"}
+_NUTRIENT = "|".join(sorted(NUTRIENT_WORDS, key=len, reverse=True))
+LIMIT = re.compile(rf"\b(no more than|under|below|less than|at most|max|over|above|more than|at least|min)\s+"
+                   rf"(\d+(?:\.\d+)?)\s*(?:g\b|grams?\b)?\s*(?:of\s+)?({_NUTRIENT})\b")
+BETWEEN = re.compile(rf"\b(\d+(?:\.\d+)?)\s*(?:-|to)\s*(\d+(?:\.\d+)?)\s*(?:g\b|grams?\b)?\s*(?:of\s+)?({_NUTRIENT})\b")
+SORT = re.compile(rf"\bby\s+(?:(most|highest|high|least|lowest|low|fewest)\s+)?(name|{_NUTRIENT})\b")
+EXCLUDE = re.compile(r"\b(?:without|no)\s+([a-z][a-z ]*?)(?=\s+(?:under|below|over|above|less|more|at|between|"
+                     r"sorted|by|after|with|for|recipes?)\b|[,.?!]|$)")
+CURSOR = re.compile(r"\bafter\s+([a-z]+\.[ad]\.\d+)\b")
+
+
+def parse_query(text):
+    """Query and cursor (or None) for a lowercased chat message"""
+    diets = tuple(diet for diet in RECIPE_DIET_TYPES if diet in text)
+    meal_type = next((meal for meal in MEAL_SLOTS if meal in text), None)
+    exclude = []
+    for match in EXCLUDE.finditer(text):
+        exclude.extend(item.strip() for item in re.split(r"\s+(?:and|or)\s+|\s*,\s*", match.group(1)) if item.strip())
+
+    ranges = {}
+    for match in BETWEEN.finditer(text):
+        ranges[NUTRIENT_WORDS[match.group(3)]] = (float(match.group(1)), float(match.group(2)))
+    for match in LIMIT.finditer(text):
+        nutrient = NUTRIENT_WORDS[match.group(3)]
+        minimum, maximum = ranges.get(nutrient, (None, None))
+        if match.group(1) in ("no more than", "under", "below", "less than", "at most", "max"):
+            maximum = float(match.group(2))
+        else:
+            minimum = float(match.group(2))
+        ranges[nutrient] = (minimum, maximum)
+
+    sort, descending = "name", False
+    match = SORT.search(text)
+    if match:
+        sort = "name" if match.group(2) == "name" else NUTRIENT_WORDS[match.group(2)]
+        if match.group(1):
+            descending = match.group(1) in ("most", "highest", "high")
+        else:
+            descending = sort in DEFAULT_DESCENDING
+    cursor = CURSOR.search(text)
+    query = Query(diets, meal_type, tuple(exclude),
+                  tuple((nutrient, low, high) for nutrient, (low, high) in sorted(ranges.items())), sort, descending)
+    return query, cursor.group(1) if cursor else None
+
+
+def describe(query):
+    """Short description of a query's filters and order, for listings"""
+    parts = list(query.diets)
+    if query.meal_type:
+        parts.append(query.meal_type)
+    for nutrient, minimum, maximum in query.ranges:
+        unit = "" if nutrient == "calories" else "g"
+        if minimum is not None and maximum is not None:
+            parts.append(f"{minimum:g}-{maximum:g}{unit} {nutrient}")
+        elif maximum is not None:
+            parts.append(f"at most {maximum:g}{unit} {nutrient}")
+        else:
+            parts.append(f"at least {minimum:g}{unit} {nutrient}")
+    if query.exclude:
+        parts.append("without " + ", ".join(query.exclude))
+    if query.sort == "name":
+        order = "by name" + (", Z to A" if query.descending else "")
+    else:
+        order = f"by {'most' if query.descending else 'least'} {query.sort}"
+    return (", ".join(parts) or "all recipes") + f"; {order}"
@@ -0,0 +1,127 @@
+from collections import defaultdict
+from itertools import compress
+
+from allergens import ALLERGENS, allergy_bits, ingredient_allergens, words
+
+# Allergy lookups remembered per index before the memo is reset
+ALLERGY_CACHE_SIZE = 4096
+
+_BIT_FLAGS = bytes.maketrans(b"01", b"\x00\x01")
+
+
+def _bits_from_ids(ids, size):
+    bits = bytearray((size + 7) // 8)
+    for i in ids:
+        bits[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(bits, "little")
+
+
+def _ids_from_bits(bits):
+    # One byte per recipe (0 or 1) lets compress() pick the set positions in C
+    flags = bin(bits)[:1:-1].encode("ascii").translate(_BIT_FLAGS)
+    return list(compress(range(len(flags)), flags))
+
+
+class RecipeIndex:
+    """Posting structures over a recipe list, built once at load time.
+
+    Diet and meal types map to bitsets (Python ints, bit i = recipes[i]).
+    Each ingredient line is normalized once (see allergens.py): its allergen
+    mask goes into the recipe's entry in allergen_masks and into one bitset
+    per allergen, and its words into postings. Excluding an allergen group
+    such as "dairy" or "nuts" is then a bitwise AND; any other allergy is
+    looked up as whole words, checked only against recipes whose
+    ingredients have all of them.
+    """
+
+    def __init__(self, recipes):
+        self.recipes = list(recipes)
+        size = len(self.recipes)
+        self.all = (1 << size) - 1
+        self.diet_types = defaultdict(int)
+        self.meal_types = defaultdict(int)
+        self.allergen_masks = []
+        self._lines = []
+        word_postings = defaultdict(list)
+        allergen_ids = [[] for _ in ALLERGENS]
+        # Catalogs repeat ingredient lines, so each distinct one is normalized once
+        normalized = {}
+        for i, recipe in enumerate(self.recipes):
+            for diet in recipe["diet_types"]:
+                self.diet_types[diet] |= 1 << i
+            self.meal_types[recipe["meal_type"]] |= 1 << i
+            lines, mask, recipe_words = [], 0, set()
+            for ingredient in recipe["ingredients"]:
+                line = normalized.get(ingredient)
+                if line is None:
+                    line = normalized[ingredient] = (tuple(words(ingredient)), ingredient_allergens(ingredient))
+                lines.append(line[0])
+                mask |= line[1]
+                recipe_words.update(line[0])
+            self._lines.append(lines)
+            self.allergen_masks.append(mask)
+            for word in recipe_words:
+                word_postings[word].append(i)
+            for bit in range(len(ALLERGENS)):
+                if mask >> bit & 1:
+                    allergen_ids[bit].append(i)
+        self.allergens = {name: _bits_from_ids(ids, size) for name, ids in zip(ALLERGENS, allergen_ids)}
+        self._word_postings = dict(word_postings)
+        self._with_allergy = {}
+
+    def __len__(self):
+        return len(self.recipes)
+
+    def with_allergens(self, mask):
+        """Bitset of recipes containing any allergen in mask (bits as in allergens.ALLERGENS)"""
+        bits = 0
+        for bit, name in enumerate(ALLERGENS):
+            if mask >> bit & 1:
+                bits |= self.allergens[name]
+        return bits
+
+    def mentioning(self, text):
+        """Bitset of recipes with an ingredient line holding text's words, in order, as whole words"""
+        key = tuple(words(text))
+        if not key:
+            return 0
+        postings = sorted((self._word_postings.get(word, ()) for word in set(key)), key=len)
+        candidates = set(postings[0]).intersection(*postings[1:])
+        if len(key) > 1:
+            candidates = [i for i in candidates
+                          if any(line[j:j + len(key)] == key
+                                 for line in self._lines[i] for j in range(len(line) - len(key) + 1))]
+        return _bits_from_ids(candidates, len(self.recipes))
+
+    def with_allergy(self, allergy):
+        """Bitset of recipes an allergy rules out: its allergen group, or else its words"""
+        allergy = allergy.lower().strip()
+        bits = self._with_allergy.get(allergy)
+        if bits is None:
+            group = allergy_bits(allergy)
+            bits = self.with_allergens(group) if group else self.mentioning(allergy)
+            if len(self._with_allergy) >= ALLERGY_CACHE_SIZE:
+                self._with_allergy.clear()
+            self._with_allergy[allergy] = bits
+        return bits
+
+    def filter(self, preferences=None, allergies=None):
+        """Bitset of recipes with a matching diet type and nothing any allergy rules out"""
+        bits = self.all
+        if preferences:
+            bits = 0
+            for preference in preferences:
+                bits |= self.diet_types.get(preference, 0)
+        for allergy in allergies or []:
+            bits &= ~self.with_allergy(allergy)
+        return bits
+
+    def ids(self, bits, meal_type=None):
+        """Recipe ids in a bitset, optionally narrowed to one meal type, in catalog order"""
+        if meal_type is not None:
+            bits &= self.meal_types.get(meal_type, 0)
+        return _ids_from_bits(bits)
+
+    def select(self, bits, meal_type=None):
+        """Recipes in a bitset, optionally narrowed to one meal type, in catalog order"""
+        return [self.recipes[i] for i in self.ids(bits, meal_type)]
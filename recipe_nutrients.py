@@ -0,0 +1,351 @@
+"""Per-serving nutrient vectors of the recipes, from their stated figures or their ingredient lines.
+
+    nutrients = RecipeNutrients(load_recipes(), load_food_data())
+    nutrients.vector(0)            # {"calories": ..., "protein": ..., ...}
+    nutrients.column("protein")    # one value per recipe, for sorting and filtering
+
+A recipe's vector is its own nutritional_info ("Calories: 350, Protein:
+10g, ...") when it has one; those are per-serving figures, and the ones the
+chat shows. A recipe that states none gets an estimate from its
+ingredients, divided by its "servings" (1 if it gives none). The estimates
+of every recipe stay in `estimates`, and `estimated` says which vectors
+are estimates.
+
+Ingredient lines such as "1 cup quinoa" or "2 tbsp olive oil" are split into
+quantity, unit and food name, and the name is resolved against the food
+table: the longest ending of the name that is a key in singular or plural
+form, so "dry lentils" is lentils but "almond milk" is not almonds. Food
+rows carry no serving size, so weights and volumes are taken against a
+100 g serving and counted items ("1/2 avocado", "2 cloves garlic") as one
+serving each. Lines that do not resolve add nothing, so an estimate is
+only as complete as the food table.
+
+Parsed lines are memoised, since bulk imports repeat them constantly. The
+vectors can be saved next to the data; loading them back only recomputes
+recipes that changed or that use a food whose row changed.
+"""
+import re
+import zlib
+from collections import defaultdict, namedtuple
+from fractions import Fraction
+
+import numpy as np
+
+from food_store import NUTRIENT_COLUMNS
+from normalize import plural, singular
+
+Ingredient = namedtuple("Ingredient", ["quantity", "unit", "name"])
+
+# Grams per unit; volumes assume the density of water
+UNIT_GRAMS = {
+    "g": 1, "gram": 1, "kg": 1000, "kilogram": 1000, "mg": 0.001,
+    "oz": 28.35, "ounce": 28.35, "lb": 453.6, "lbs": 453.6, "pound": 453.6,
+    "ml": 1, "l": 1000, "liter": 1000, "litre": 1000,
+    "cup": 240, "tbsp": 15, "tablespoon": 15, "tsp": 5, "teaspoon": 5,
+}
+
+# Units that count items rather than measure them
+COUNT_UNITS = {"slice", "clove", "scoop", "piece", "stalk", "can", "handful", "pinch", "dash", "bunch", "head"}
+
+# Grams in the serving a food row describes
+SERVING_GRAMS = 100
+
+UNICODE_FRACTIONS = {"½": "1/2", "¼": "1/4", "¾": "3/4", "⅓": "1/3", "⅔": "2/3", "⅛": "1/8"}
+
+QUANTITY = re.compile(r"^\s*(\d+\s+\d+/\d+|\d+/\d+|\d+(?:\.\d+)?)(?:\s*-\s*[\d/.]+)?\s*")
+UNIT = re.compile(r"^([a-z]+)\.?\s+(?:of\s+)?")
+
+
+def parse_nutritional_info(text):
+    """Turn "Calories: 350, Protein: 10g, ..." into {"calories": 350.0, "protein": 10.0, ...}"""
+    values = {}
+    for part in text.split(","):
+        label, _, amount = part.partition(":")
+        number = re.search(r"\d+(?:\.\d+)?", amount)
+        if number:
+            values[label.strip().lower()] = float(number.group())
+    return values
+
+
+def stated_vector(recipe):
+    """A recipe's own per-serving figures as a NUTRIENT_COLUMNS vector, or None if it states none"""
+    info = parse_nutritional_info(recipe.get("nutritional_info", ""))
+    if not info:
+        return None
+    return np.array([info.get(column, 0.0) for column in NUTRIENT_COLUMNS], dtype=np.float64)
+
+
+def _unit_name(word):
+    for form in (word, singular(word)):
+        if form in UNIT_GRAMS or form in COUNT_UNITS:
+            return form
+    return None
+
+
+def parse_ingredient(text):
+    """Split "1 1/2 cups rolled oats, dry" into Ingredient(1.5, "cup", "rolled oats")
+
+    quantity is 0 for "to taste" lines and 1 when no number is given; unit is
+    None for counted items.
+    """
+    line = text.lower()
+    for symbol, fraction in UNICODE_FRACTIONS.items():
+        line = line.replace(symbol, f" {fraction}")
+    line = re.sub(r"\([^)]*\)", " ", line).split(",")[0]
+
+    quantity = 1.0
+    match = QUANTITY.match(line)
+    if match:
+        quantity = float(sum(Fraction(part) for part in match.group(1).split()))
+        line = line[match.end():]
+    elif "to taste" in line:
+        quantity = 0.0
+
+    unit = None
+    match = UNIT.match(line)
+    if match and _unit_name(match.group(1)):
+        unit = _unit_name(match.group(1))
+        line = line[match.end():]
+    name = " ".join(line.replace("to taste", " ").split())
+    return Ingredient(quantity, unit, name)
+
+
+def servings(ingredient):
+    """Food-row servings an ingredient amounts to"""
+    if ingredient.unit in UNIT_GRAMS:
+        return ingredient.quantity * UNIT_GRAMS[ingredient.unit] / SERVING_GRAMS
+    return ingredient.quantity
+
+
+def _forms(words):
+    """The name as written, then with its last word singular and plural"""
+    last = singular(words[-1])
+    return dict.fromkeys([" ".join(words), " ".join(words[:-1] + [last]), " ".join(words[:-1] + [plural(last)])])
+
+
+def resolve_food(name, food_data):
+    """Food key for an ingredient name, or None"""
+    words = name.split()
+    # The food is named last ("dry lentils", "almond milk"); try the longest ending first
+    for start in range(len(words)):
+        for form in _forms(words[start:]):
+            if form in food_data:
+                return form
+    return None
+
+
+def fingerprint(recipe):
+    """Checksum of everything a recipe's vector is computed from"""
+    text = "\n".join(recipe["ingredients"] + [recipe.get("nutritional_info", ""), str(recipe.get("servings", 1))])
+    return zlib.crc32(text.encode("utf-8"))
+
+
+class RecipeNutrients:
+    """Nutrients per serving of each recipe (rows follow the recipe list, columns NUTRIENT_COLUMNS)"""
+
+    def __init__(self, recipes, food_data):
+        self.food_data = food_data
+        self.recipes = []
+        self.matrix = np.zeros((0, len(NUTRIENT_COLUMNS)), dtype=np.float64)
+        self.estimates = np.zeros((0, len(NUTRIENT_COLUMNS)), dtype=np.float64)
+        self.fingerprints = []
+        self._stated = []
+        self._uses = []
+        self._users = defaultdict(set)
+        self._lines = {}
+        self._food_vectors = {}
+        self.add_recipes(recipes)
+
+    def __len__(self):
+        return len(self.recipes)
+
+    def vector(self, recipe_id):
+        return dict(zip(NUTRIENT_COLUMNS, self.matrix[recipe_id].tolist()))
+
+    def column(self, name):
+        return self.matrix[:, NUTRIENT_COLUMNS.index(name)]
+
+    def uses(self, recipe_id):
+        """(food key, servings) pairs one serving of the recipe is estimated from"""
+        return list(self._uses[recipe_id])
+
+    @property
+    def estimated(self):
+        """Per recipe, whether its vector is the ingredient estimate because it states no figures"""
+        return np.array([stated is None for stated in self._stated], dtype=bool)
+
+    @property
+    def resolved_ratio(self):
+        """Share of distinct ingredient lines matched to a food"""
+        return sum(use is not None for use in self._lines.values()) / len(self._lines) if self._lines else 0.0
+
+    def add_recipes(self, recipes):
+        """Append recipes and compute their vectors in one vectorised pass"""
+        start = len(self.recipes)
+        rows, foods, amounts = [], [], []
+        food_positions = {}
+        for offset, recipe in enumerate(recipes):
+            uses = self._parse(recipe)
+            self._set_uses(start + offset, recipe, uses)
+            for key, amount in uses:
+                rows.append(offset)
+                foods.append(food_positions.setdefault(key, len(food_positions)))
+                amounts.append(amount)
+
+        added = np.zeros((len(self.recipes) - start, len(NUTRIENT_COLUMNS)), dtype=np.float64)
+        if rows:
+            vectors = np.array([self._food_vector(key) for key in food_positions])
+            np.add.at(added, np.array(rows), np.array(amounts)[:, None] * vectors[np.array(foods)])
+        self.estimates = np.concatenate([self.estimates, added])
+        for offset, stated in enumerate(self._stated[start:]):
+            if stated is not None:
+                added[offset] = stated
+        self.matrix = np.concatenate([self.matrix, added])
+
+    def update_recipe(self, recipe_id, recipe):
+        """Recompute one recipe after it changed"""
+        self._set_uses(recipe_id, recipe, self._parse(recipe))
+        self._recompute([recipe_id])
+
+    def update_food(self, key):
+        """Recompute the recipes affected by a food row that changed, appeared or went away; returns their ids"""
+        self._food_vectors.pop(key, None)
+        affected = set(self._users.get(key, ()))
+        if affected and key in self.food_data:
+            affected = sorted(affected)
+            self._recompute(affected)
+            return affected
+
+        # A food that appeared or went away can change what ingredient lines
+        # resolve to; those lines contain its last word, singular or plural
+        last = singular(key.split()[-1]) if key.split() else key
+        forms = (last, plural(last))
+
+        def mentions(line):
+            line = line.lower()
+            return any(form in line for form in forms)
+
+        for line in [line for line in self._lines if mentions(line)]:
+            del self._lines[line]
+        for i, recipe in enumerate(self.recipes):
+            if i in affected or any(mentions(line) for line in recipe["ingredients"]):
+                uses = self._parse(recipe)
+                if i in affected or uses != self._uses[i]:
+                    self._set_uses(i, recipe, uses)
+                    affected.add(i)
+        affected = sorted(affected)
+        self._recompute(affected)
+        return affected
+
+    def save(self, path):
+        """Write vectors, estimates, ingredient resolutions and the food rows they were computed from"""
+        foods = sorted(key for key, users in self._users.items() if users)
+        food_ids = {key: i for i, key in enumerate(foods)}
+        offsets = np.zeros(len(self._uses) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(uses) for uses in self._uses])
+        with open(path, "wb") as f:
+            np.savez(
+                f,
+                matrix=self.matrix,
+                estimates=self.estimates,
+                stated=~self.estimated,
+                fingerprints=np.array(self.fingerprints, dtype=np.uint32),
+                offsets=offsets,
+                foods=np.array([food_ids[key] for uses in self._uses for key, _ in uses], dtype=np.int32),
+                amounts=np.array([amount for uses in self._uses for _, amount in uses], dtype=np.float64),
+                food_keys=np.array(foods, dtype=str),
+                food_rows=np.array([self._food_vector(key) for key in foods]).reshape(len(foods), len(NUTRIENT_COLUMNS)),
+            )
+
+    @classmethod
+    def load(cls, path, recipes, food_data):
+        """Vectors saved by save(), recomputed only for recipes that changed or whose foods changed since.
+
+        The ids of recomputed recipes are left in the `recomputed` attribute.
+        """
+        with np.load(path) as saved:
+            matrix, saved_prints, offsets = saved["matrix"], saved["fingerprints"].tolist(), saved["offsets"].tolist()
+            estimates, stated = saved["estimates"], saved["stated"].tolist()
+            foods, amounts = saved["foods"], saved["amounts"].tolist()
+            food_keys, food_rows = saved["food_keys"].tolist(), saved["food_rows"]
+
+        nutrients = cls([], food_data)
+        changed = np.array([key not in food_data or not np.array_equal(nutrients._food_vector(key), row)
+                            for key, row in zip(food_keys, food_rows)], dtype=bool)
+        # Running count of uses of changed foods, so a recipe's share is a difference of two entries
+        stale = np.zeros(len(foods) + 1, dtype=np.int64)
+        np.cumsum(changed[foods], out=stale[1:])
+        stale = stale.tolist()
+        pairs = list(zip([food_keys[food] for food in foods.tolist()], amounts))
+
+        nutrients.recipes = list(recipes)
+        nutrients.fingerprints = [fingerprint(recipe) for recipe in nutrients.recipes]
+        nutrients.matrix = np.zeros((len(nutrients.recipes), len(NUTRIENT_COLUMNS)), dtype=np.float64)
+        nutrients.estimates = np.zeros_like(nutrients.matrix)
+        nutrients.recomputed = []
+        kept = []
+        for i, recipe in enumerate(nutrients.recipes):
+            start, end = (offsets[i], offsets[i + 1]) if i < len(saved_prints) else (0, 0)
+            if i < len(saved_prints) and saved_prints[i] == nutrients.fingerprints[i] and stale[start] == stale[end]:
+                uses = pairs[start:end]
+                nutrients._stated.append(matrix[i].copy() if stated[i] else None)
+                kept.append(i)
+            else:
+                uses = nutrients._parse(recipe)
+                nutrients._stated.append(stated_vector(recipe))
+                nutrients.recomputed.append(i)
+            nutrients._uses.append(uses)
+            for key, _ in uses:
+                nutrients._users[key].add(i)
+        nutrients.matrix[kept] = matrix[kept]
+        nutrients.estimates[kept] = estimates[kept]
+        nutrients._recompute(nutrients.recomputed)
+        return nutrients
+
+    def _set_uses(self, recipe_id, recipe, uses):
+        if recipe_id == len(self.recipes):
+            self.recipes.append(recipe)
+            self.fingerprints.append(fingerprint(recipe))
+            self._stated.append(stated_vector(recipe))
+            self._uses.append(uses)
+        else:
+            for key, _ in self._uses[recipe_id]:
+                self._users[key].discard(recipe_id)
+            self.recipes[recipe_id] = recipe
+            self.fingerprints[recipe_id] = fingerprint(recipe)
+            self._stated[recipe_id] = stated_vector(recipe)
+            self._uses[recipe_id] = uses
+        for key, _ in uses:
+            self._users[key].add(recipe_id)
+
+    def _parse(self, recipe):
+        portions = recipe.get("servings") or 1
+        uses = []
+        for line in recipe["ingredients"]:
+            use = self._lines[line] if line in self._lines else self._parse_line(line)
+            if use is not None:
+                uses.append(use if portions == 1 else (use[0], use[1] / portions))
+        return uses
+
+    def _parse_line(self, line):
+        ingredient = parse_ingredient(line)
+        key = resolve_food(ingredient.name, self.food_data) if ingredient.quantity else None
+        use = self._lines[line] = (key, servings(ingredient)) if key else None
+        return use
+
+    def _food_vector(self, key):
+        vector = self._food_vectors.get(key)
+        if vector is None:
+            row = self.food_data[key]
+            vector = self._food_vectors[key] = np.array([row[column] for column in NUTRIENT_COLUMNS],
+                                                        dtype=np.float64)
+        return vector
+
+    def _recompute(self, recipe_ids):
+        for i in recipe_ids:
+            total = np.zeros(len(NUTRIENT_COLUMNS), dtype=np.float64)
+            for key, amount in self._uses[i]:
+                total += amount * self._food_vector(key)
+            self.estimates[i] = total
+            stated = self._stated[i]
+            self.matrix[i] = total if stated is None else stated
@@ -0,0 +1,94 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+# Intents whose reply depends only on the message text and the profile
+CACHEABLE_INTENTS = {"browse", "nutrition", "food", "diet", "healthy_eating", "breakfast", "fallback"}
+
+
+def response_cache_key(user_input, profile):
+    """Cache key for a lowercased message and the profile fields that can shape the answer"""
+    return (
+        user_input.strip(),
+        profile.goal,
+        tuple(profile.dietary_preferences),
+        tuple(profile.allergies),
+    )
+
+
+def _entry_size(key, value):
+    return sys.getsizeof(value) + sum(sys.getsizeof(part) for part in key)
+
+
+class ResponseCache:
+    """Thread-safe LRU cache for chat replies, bounded by approximate memory and entry age"""
+
+    def __init__(self, max_bytes=4 * 1024 * 1024, ttl=3600, clock=time.monotonic):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, size, stored_at = entry
+            if self.ttl is not None and self._clock() - stored_at > self.ttl:
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        size = _entry_size(key, value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, self._clock())
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def fresh(self):
+        """Empty cache with the same limits"""
+        return ResponseCache(max_bytes=self.max_bytes, ttl=self.ttl, clock=self._clock)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self.bytes -= size
@@ -0,0 +1,235 @@
+"""TF-IDF retrieval over nutrition facts and recipes, for questions without an exact keyword.
+
+    index = SemanticIndex(documents(load_nutrition_facts(), load_recipes()))
+    index.search("what helps my bones?", k=3)    # [Hit(kind="fact", key="calcium", score=0.39), ...]
+
+Build an index offline and save it next to the data:
+
+    python semantic_index.py build semantic_index.npz
+
+Documents are bags of lightly stemmed words weighted by (1 + log tf) * idf
+and scaled to unit length, so a score is the cosine similarity to the
+query. The weights are stored term by term (a compressed sparse column
+matrix), each term's postings sorted by weight, and a query adds up the
+columns of its terms with NumPy. A max_postings limit reads only the
+heaviest postings of each term: an approximate search whose cost no longer
+grows with the corpus. Indexes larger than APPROXIMATE_DOCS use
+DEFAULT_MAX_POSTINGS unless told otherwise; max_postings=0 always searches
+exactly.
+"""
+import argparse
+import math
+import re
+import sys
+import threading
+import zlib
+from collections import Counter, namedtuple
+
+import numpy as np
+
+from normalize import singular
+
+Document = namedtuple("Document", ["kind", "key", "text"])
+Hit = namedtuple("Hit", ["kind", "key", "score"])
+
+KINDS = ("fact", "recipe")
+
+# Indexes with more documents than this search approximately unless given a limit
+APPROXIMATE_DOCS = 250_000
+DEFAULT_MAX_POSTINGS = 10_000
+
+# Words too common in questions and recipes to say anything about the topic, including small talk
+# ("help", "lets eat", "is it healthy") and the ends of contractions ("let's" -> "let", "s")
+STOP_WORDS = {
+    "a", "about", "all", "am", "an", "and", "any", "are", "as", "at", "bad", "be", "been", "best", "better",
+    "but", "by", "can", "could", "d", "do", "does", "eat", "eating", "eats", "food", "foods", "for", "from",
+    "get", "give", "good", "had", "has", "have", "health", "healthy", "hello", "help", "helps", "hi", "how",
+    "i", "idea", "ideas", "if", "in", "into", "is", "it", "its", "just", "keep", "keeps", "know", "let",
+    "lets", "like", "ll", "lot", "m", "make", "many", "me", "more", "most", "much", "my", "need", "no",
+    "now", "of", "ok", "on", "or", "other", "our", "please", "re", "really", "s", "should", "so", "some",
+    "something", "t", "tell", "than", "thank", "thanks", "that", "the", "their", "them", "then", "there",
+    "these", "they", "thing", "things", "this", "tip", "tips", "to", "today", "too", "try", "up", "us",
+    "ve", "very", "want", "was", "we", "what", "when", "which", "who", "why", "will", "with", "would",
+    "yes", "you", "your",
+}
+
+WORD = re.compile(r"[a-z]+")
+
+# Changes whenever tokenize() maps words to terms differently
+TOKENIZER_VERSION = 3
+
+
+def stem(word):
+    """Fold plurals and -ing forms together ("bones" -> "bone", "berries" -> "berry", "filling" -> "fill")"""
+    if len(word) > 5 and word.endswith("ing"):
+        return word[:-3]
+    return singular(word)
+
+
+def tokenize(text):
+    return [stem(word) for word in WORD.findall(text.lower()) if word not in STOP_WORDS]
+
+
+def documents(nutrition_facts, recipes):
+    """One document per nutrition fact and per recipe"""
+    docs = [Document("fact", key, f"{key}. {fact}") for key, fact in nutrition_facts.items()]
+    for i, recipe in enumerate(recipes):
+        text = "\n".join([recipe["name"], *recipe["ingredients"], recipe["instructions"],
+                          recipe.get("meal_type", ""), " ".join(recipe.get("diet_types", []))])
+        docs.append(Document("recipe", i, text))
+    return docs
+
+
+def fingerprint(docs):
+    # Seeded with the tokenizer version, so an index saved with other terms is not taken as current
+    crc = TOKENIZER_VERSION
+    for doc in docs:
+        crc = zlib.crc32(f"{doc.kind}\0{doc.key}\0{doc.text}\0".encode("utf-8"), crc)
+    return crc
+
+
+class SemanticIndex:
+    def __init__(self, docs=(), max_postings=None):
+        docs = list(docs)
+        self.fingerprint = fingerprint(docs)
+        self.kinds = np.array([KINDS.index(doc.kind) for doc in docs], dtype=np.uint8)
+        self.keys = [doc.key for doc in docs]
+        self.terms = {}
+
+        term_ids, doc_ids, counts = [], [], []
+        for doc_id, doc in enumerate(docs):
+            for term, count in Counter(tokenize(doc.text)).items():
+                term_ids.append(self.terms.setdefault(term, len(self.terms)))
+                doc_ids.append(doc_id)
+                counts.append(count)
+        term_ids = np.array(term_ids, dtype=np.int64)
+        doc_ids = np.array(doc_ids, dtype=np.int32)
+
+        df = np.bincount(term_ids, minlength=len(self.terms))
+        self.idf = (np.log((1 + len(docs)) / (1 + df)) + 1).astype(np.float32)
+        weights = (1 + np.log(np.array(counts, dtype=np.float32))) * self.idf[term_ids]
+        norms = np.sqrt(np.bincount(doc_ids, weights=weights.astype(np.float64) ** 2, minlength=len(docs)))
+        weights = (weights / norms[doc_ids]).astype(np.float32)
+
+        # Term-major, heaviest postings first within each term
+        order = np.lexsort((-weights, term_ids))
+        self.doc_ids = doc_ids[order]
+        self.weights = weights[order]
+        self.offsets = np.zeros(len(self.terms) + 1, dtype=np.int64)
+        np.cumsum(df, out=self.offsets[1:])
+        self._local = threading.local()
+        self.max_postings = self._default_limit(max_postings)
+
+    def __len__(self):
+        return len(self.keys)
+
+    @property
+    def nbytes(self):
+        return self.doc_ids.nbytes + self.weights.nbytes + self.offsets.nbytes + self.idf.nbytes
+
+    def search(self, text, k=5, max_postings=None):
+        """Best k documents for a question, highest cosine similarity first"""
+        query = self._query(text)
+        if not query:
+            return []
+        limit = self.max_postings if max_postings is None else max_postings
+        scores = self._scores()
+        touched = []
+        for term, weight in query:
+            start, end = self.offsets[term], self.offsets[term + 1]
+            if limit:
+                end = min(end, start + limit)
+            ids = self.doc_ids[start:end]
+            # A document appears once per term, so the fancy-index add never collides
+            scores[ids] += weight * self.weights[start:end]
+            touched.append(ids)
+        candidates = np.concatenate(touched)
+        values = scores[candidates]
+        scores[candidates] = 0
+
+        # Each document repeats at most once per query term, so the best
+        # k * terms entries hold at least k distinct documents
+        take = min(k * len(query), len(candidates))
+        if take < len(candidates):
+            best = np.argpartition(-values, take - 1)[:take]
+            candidates, values = candidates[best], values[best]
+        candidates, first = np.unique(candidates, return_index=True)
+        values = values[first]
+        order = np.lexsort((candidates, -values))[:k]
+        return [Hit(KINDS[self.kinds[i]], self.keys[i], float(values[j]))
+                for i, j in zip(candidates[order].tolist(), order.tolist())]
+
+    def search_many(self, texts, k=5, max_postings=None):
+        return [self.search(text, k, max_postings) for text in texts]
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            np.savez(
+                f,
+                terms=np.array(list(self.terms), dtype=str),
+                idf=self.idf,
+                offsets=self.offsets,
+                doc_ids=self.doc_ids,
+                weights=self.weights,
+                kinds=self.kinds,
+                keys=np.array([str(key) for key in self.keys], dtype=str),
+                fingerprint=np.array([self.fingerprint], dtype=np.uint32),
+            )
+
+    @classmethod
+    def load(cls, path, max_postings=None):
+        """Index written by save(); compare its fingerprint with fingerprint(docs) to tell if it is current"""
+        index = cls.__new__(cls)
+        with np.load(path) as saved:
+            index.terms = {term: i for i, term in enumerate(saved["terms"].tolist())}
+            index.idf, index.offsets = saved["idf"], saved["offsets"]
+            index.doc_ids, index.weights, index.kinds = saved["doc_ids"], saved["weights"], saved["kinds"]
+            index.keys = [int(key) if kind == KINDS.index("recipe") else key
+                          for key, kind in zip(saved["keys"].tolist(), index.kinds.tolist())]
+            index.fingerprint = int(saved["fingerprint"][0])
+        index._local = threading.local()
+        index.max_postings = index._default_limit(max_postings)
+        return index
+
+    def _default_limit(self, max_postings):
+        if max_postings is None:
+            return DEFAULT_MAX_POSTINGS if len(self.keys) > APPROXIMATE_DOCS else 0
+        return max_postings
+
+    def _query(self, text):
+        # Words the index has never seen still count towards the query's length,
+        # with the idf of a term in no document, so they lower every score
+        unseen_idf = math.log(1 + len(self.keys)) + 1
+        weights, norm = {}, 0.0
+        for token, count in Counter(tokenize(text)).items():
+            term = self.terms.get(token)
+            weight = (1 + math.log(count)) * (unseen_idf if term is None else float(self.idf[term]))
+            norm += weight * weight
+            if term is not None:
+                weights[term] = weight
+        return [(term, weight / math.sqrt(norm)) for term, weight in weights.items()]
+
+    def _scores(self):
+        # One zeroed score buffer per thread; search() clears the entries it touched
+        scores = getattr(self._local, "scores", None)
+        if scores is None or len(scores) != len(self.keys):
+            scores = self._local.scores = np.zeros(len(self.keys), dtype=np.float32)
+        return scores
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build NutriBot semantic search indexes")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="index the bundled nutrition facts and recipes")
+    build.add_argument("output")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        from nutribot_engine import load_nutrition_facts, load_recipes
+        index = SemanticIndex(documents(load_nutrition_facts(), load_recipes()))
+        index.save(args.output)
+        print(f"Wrote {len(index)} documents, {len(index.terms)} terms to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
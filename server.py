@@ -0,0 +1,464 @@
+"""Asyncio HTTP + WebSocket server for the NutriBot engine.
+
+    python server.py [--host 127.0.0.1] [--port 8080] [--max-inflight 64] [--timeout 5] [--data-dir data]
+
+HTTP endpoints (JSON in, JSON out, keep-alive supported):
+
+    GET  /health                     -> status and data snapshot version
+    GET  /metrics                    -> Prometheus text (/metrics.json for JSON)
+    GET  /profile/<user_id>          -> profile and water tracker
+    PUT  /profile/<user_id>          <- UserProfile fields
+    POST /chat                       <- {"user_id", "message", "optimize"?}
+    POST /meal-plan                  <- {"user_id", "days"?, "optimize"?}
+
+WebSocket: connect to /ws?user_id=<id> and send text frames like
+{"type": "chat", "message": "..."} or {"type": "meal_plan", "days": 3};
+every frame gets one JSON reply.
+
+Profiles and water trackers live in a ProfileStore (see profile_store.py)
+at --profile-db, shared by all connections and kept across restarts.
+Engine calls run on a thread pool behind a semaphore (--max-inflight);
+when more than --max-queue requests are already waiting the server answers
+503 straight away, and requests not answered within --timeout, waiting
+included, get a 504.
+
+With --data-dir (or --food-db) the data files are watched and changes are
+swapped in without a restart (see data_catalog.py); each engine call runs
+on the snapshot current when it started.
+
+With --metrics the engine records per-intent and per-stage latency
+histograms; --profile-slow-ms additionally appends folded stacks of slower
+requests to --profile-path.
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import resource
+import signal
+import struct
+import sys
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import fields
+from urllib.parse import parse_qs, urlsplit
+
+from data_catalog import RELOAD_INTERVAL, DataCatalog
+from metrics import METRICS, SlowRequestProfiler
+from nutribot_engine import UserProfile
+from profile_store import DEFAULT_PATH, ProfileStore
+
+MAX_HEADER_BYTES = 16 * 1024
+MAX_BODY_BYTES = 64 * 1024
+# Per-user locks kept for idle users; past this the least recently used idle ones are dropped
+MAX_LOCKS = 100_000
+# WebSocket close code for a frame over MAX_BODY_BYTES
+CLOSE_TOO_BIG = 1009
+WEBSOCKET_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable",
+           504: "Gateway Timeout"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class SessionStore:
+    """Profile and water tracker per user id in a ProfileStore, plus a lock per user, shared by every connection"""
+
+    def __init__(self, profiles, max_locks=MAX_LOCKS):
+        self.profiles = profiles
+        self.max_locks = max_locks
+        # user id -> [lock, calls holding or waiting for it]
+        self._locks = OrderedDict()
+
+    def __len__(self):
+        return len(self._locks)
+
+    def get(self, user_id):
+        return self.profiles.get_profile(user_id) or UserProfile(), self.profiles.tracker(user_id)
+
+    def set_profile(self, user_id, profile):
+        self.profiles.save_profile(user_id, profile)
+
+    def hold(self, user_id):
+        """The user's lock, kept until a matching release(user_id)"""
+        entry = self._locks.get(user_id)
+        if entry is None:
+            entry = self._locks[user_id] = [asyncio.Lock(), 0]
+        else:
+            self._locks.move_to_end(user_id)
+        entry[1] += 1
+        self._drop_idle_locks()
+        return entry[0]
+
+    def release(self, user_id):
+        self._locks[user_id][1] -= 1
+
+    def close(self):
+        self.profiles.close()
+
+    def _drop_idle_locks(self):
+        # Only locks go, never user data; a lock some call holds or waits for stays, so one user
+        # never has two calls running at once
+        while len(self._locks) > self.max_locks:
+            for user_id, (_, calls) in self._locks.items():
+                if not calls:
+                    break
+            else:
+                return
+            del self._locks[user_id]
+
+
+class NutriBotServer:
+    def __init__(self, engine, store, max_inflight=64, max_queue=1024, timeout=5.0, catalog=None):
+        self._engine = engine
+        self.catalog = catalog
+        self.metrics = engine.metrics
+        self.store = store
+        self.timeout = timeout
+        self.max_queue = max_queue
+        self._slots = asyncio.Semaphore(max_inflight)
+        self._executor = ThreadPoolExecutor(max_workers=max_inflight)
+        self._waiting = 0
+
+    async def call_engine(self, user_id, fn, *args):
+        """Run an engine call for one user with backpressure and a timeout that includes the wait for it"""
+        if self._waiting >= self.max_queue:
+            self.metrics.inc("nutribot_http_rejected_total", status=503)
+            raise HTTPError(503, "server busy, retry later")
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        lock = self.store.hold(user_id)
+        self._waiting += 1
+        try:
+            # One call per user at a time keeps the water tracker consistent
+            await asyncio.wait_for(lock.acquire(), self.timeout)
+            try:
+                await asyncio.wait_for(self._slots.acquire(), deadline - loop.time())
+            except BaseException:
+                lock.release()
+                raise
+        except asyncio.TimeoutError:
+            self.store.release(user_id)
+            raise self.timed_out() from None
+        except BaseException:
+            self.store.release(user_id)
+            raise
+        finally:
+            self._waiting -= 1
+        if loop.time() >= deadline:
+            self._release(user_id, lock)
+            raise self.timed_out()
+        future = loop.run_in_executor(self._executor, fn, *args)
+        # A timed-out call still runs on its thread, so the user's lock and the slot are only given back
+        # when it returns: the next call for that user cannot overlap it, and the pool cannot pile up
+        future.add_done_callback(lambda _: self._release(user_id, lock))
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), deadline - loop.time())
+        except asyncio.TimeoutError:
+            raise self.timed_out() from None
+
+    def _release(self, user_id, lock):
+        self._slots.release()
+        lock.release()
+        self.store.release(user_id)
+
+    def close(self):
+        """Let running engine calls finish, then write out the store"""
+        self._executor.shutdown()
+        self.store.close()
+
+    def timed_out(self):
+        self.metrics.inc("nutribot_http_rejected_total", status=504)
+        return HTTPError(504, "request timed out")
+
+    async def dispatch(self, method, path, payload):
+        if path == "/health":
+            if self.catalog is not None:
+                return {"status": "ok", "data_version": self.catalog.version}
+            return {"status": "ok"}
+        if path == "/metrics":
+            return self.metrics.to_prometheus()
+        if path == "/metrics.json":
+            return self.metrics.to_json()
+        if path.startswith("/profile/"):
+            user_id = path[len("/profile/"):]
+            if method == "PUT":
+                self.store.set_profile(user_id, read_profile(payload))
+            elif method != "GET":
+                raise HTTPError(405, "use GET or PUT")
+            profile, tracker = self.store.get(user_id)
+            return {"profile": profile.to_dict(), "water_tracker": {"today": tracker.today, "glasses": tracker.glasses}}
+        if path not in ("/chat", "/meal-plan"):
+            raise HTTPError(404, f"no route for {path}")
+        if method != "POST":
+            raise HTTPError(405, "use POST")
+        return await self.handle_message("chat" if path == "/chat" else "meal_plan", payload)
+
+    @property
+    def engine(self):
+        """The catalog's current snapshot, if there is a catalog"""
+        return self.catalog.engine if self.catalog is not None else self._engine
+
+    async def handle_message(self, kind, payload):
+        user_id = str(payload.get("user_id", "anonymous"))
+        profile, tracker = self.store.get(user_id)
+        optimize = bool(payload.get("optimize", False))
+        if kind == "chat":
+            message = payload.get("message")
+            if not isinstance(message, str):
+                raise HTTPError(400, "message must be a string")
+            response = await self.call_engine(user_id, self.engine.respond, message, profile, tracker, optimize)
+            return {"response": response}
+        if kind == "meal_plan":
+            days = int(payload.get("days", 3))
+            if not 1 <= days <= 14:
+                raise HTTPError(400, "days must be between 1 and 14")
+            return await self.call_engine(user_id, self.engine.generate_meal_plan, profile.goal or "maintenance",
+                                          profile.dietary_preferences, profile.allergies, days, optimize)
+        raise HTTPError(404, f"unknown message type {kind!r}")
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request = await read_request(reader)
+                if request is None:
+                    break
+                method, target, headers, body = request
+                url = urlsplit(target)
+                if url.path == "/ws" and headers.get("upgrade", "").lower() == "websocket":
+                    await self.serve_websocket(reader, writer, headers, parse_qs(url.query))
+                    break
+                try:
+                    payload = json.loads(body) if body else {}
+                    if not isinstance(payload, dict):
+                        raise HTTPError(400, "expected a JSON object")
+                    status, result = 200, await self.dispatch(method, url.path, payload)
+                except HTTPError as error:
+                    status, result = error.status, {"error": str(error)}
+                except (ValueError, TypeError) as error:
+                    status, result = 400, {"error": str(error)}
+                except Exception:
+                    status, result = 500, self.internal_error()
+                keep_alive = headers.get("connection", "").lower() != "close"
+                write_response(writer, status, result, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except HTTPError as error:
+            write_response(writer, error.status, {"error": str(error)}, keep_alive=False)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception:
+            write_response(writer, 500, self.internal_error(), keep_alive=False)
+        finally:
+            writer.close()
+
+    def internal_error(self):
+        """Log the exception being handled and count it; the client only learns that something failed"""
+        traceback.print_exc(file=sys.stderr)
+        self.metrics.inc("nutribot_http_errors_total", status=500)
+        return {"error": "internal server error"}
+
+    async def serve_websocket(self, reader, writer, headers, query):
+        key = headers.get("sec-websocket-key", "").encode()
+        accept = base64.b64encode(hashlib.sha1(key + WEBSOCKET_GUID).digest()).decode()
+        writer.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                      f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode())
+        user_id = query.get("user_id", ["anonymous"])[0]
+        while True:
+            try:
+                opcode, data = await read_frame(reader)
+            except HTTPError as error:
+                # Past the 101 the stream is WebSocket frames, so the error is a close frame, not an HTTP response
+                writer.write(encode_frame(0x8, struct.pack("!H", CLOSE_TOO_BIG) + str(error).encode()))
+                break
+            if opcode == 0x8:
+                writer.write(encode_frame(0x8, data[:2]))
+                break
+            if opcode == 0x9:
+                writer.write(encode_frame(0xA, data))
+                continue
+            if opcode != 0x1:
+                continue
+            try:
+                message = json.loads(data)
+                message["user_id"] = user_id
+                result = await self.handle_message(message.get("type", "chat"), message)
+            except HTTPError as error:
+                result = {"error": str(error), "status": error.status}
+            except (ValueError, TypeError, AttributeError) as error:
+                result = {"error": str(error), "status": 400}
+            except Exception:
+                result = dict(self.internal_error(), status=500)
+            writer.write(encode_frame(0x1, json.dumps(result).encode()))
+            await writer.drain()
+        await writer.drain()
+
+
+def read_profile(payload):
+    """UserProfile from a PUT body; fields of the wrong type are a 400, unknown fields are ignored"""
+    for profile_field in fields(UserProfile):
+        if profile_field.name not in payload:
+            continue
+        value = payload[profile_field.name]
+        if profile_field.type is list:
+            if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+                raise HTTPError(400, f"{profile_field.name} must be a list of strings")
+        elif not isinstance(value, profile_field.type):
+            raise HTTPError(400, f"{profile_field.name} must be a {profile_field.type.__name__}")
+    return UserProfile.from_dict(payload)
+
+
+async def read_request(reader):
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError as error:
+        if error.partial.strip():
+            raise HTTPError(400, "incomplete request") from None
+        return None
+    except asyncio.LimitOverrunError:
+        raise HTTPError(413, "headers too large") from None
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, _ = lines[0].split(" ", 2)
+    except ValueError:
+        raise HTTPError(400, "malformed request line") from None
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        if name:
+            headers[name.strip().lower()] = value.strip()
+    if "transfer-encoding" in headers:
+        raise HTTPError(400, "chunked bodies are not supported, send Content-Length")
+    length = headers.get("content-length", "0") or "0"
+    if not length.isdigit():
+        raise HTTPError(400, "invalid Content-Length")
+    length = int(length)
+    if length > MAX_BODY_BYTES:
+        raise HTTPError(413, "body too large")
+    body = await reader.readexactly(length) if length else b""
+    return method, target, headers, body
+
+
+def write_response(writer, status, payload, keep_alive=True):
+    """Send payload as JSON, or as plain text when it is a string"""
+    if isinstance(payload, str):
+        body, content_type = payload.encode(), "text/plain; version=0.0.4"
+    else:
+        body, content_type = json.dumps(payload).encode(), "application/json"
+    writer.write((f"HTTP/1.1 {status} {REASONS.get(status, 'Error')}\r\n"
+                  f"Content-Type: {content_type}\r\n"
+                  f"Content-Length: {len(body)}\r\n"
+                  f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+                  + ("Retry-After: 1\r\n" if status == 503 else "")
+                  + "\r\n").encode() + body)
+
+
+async def read_frame(reader):
+    """Read one client WebSocket frame, joining continuation frames"""
+    opcode, chunks = None, []
+    while True:
+        first, second = await reader.readexactly(2)
+        length = second & 0x7F
+        if length == 126:
+            length = struct.unpack("!H", await reader.readexactly(2))[0]
+        elif length == 127:
+            length = struct.unpack("!Q", await reader.readexactly(8))[0]
+        if length > MAX_BODY_BYTES:
+            raise HTTPError(413, "frame too large")
+        mask = await reader.readexactly(4) if second & 0x80 else None
+        data = await reader.readexactly(length)
+        if mask:
+            repeated = (mask * (length // 4 + 1))[:length]
+            data = (int.from_bytes(data, "big") ^ int.from_bytes(repeated, "big")).to_bytes(length, "big")
+        if opcode is None:
+            opcode = first & 0x0F
+        chunks.append(data)
+        if first & 0x80:
+            return opcode, b"".join(chunks)
+
+
+def encode_frame(opcode, data, mask=None):
+    """Encode a final WebSocket frame; clients must pass a 4-byte mask"""
+    length = len(data)
+    mask_bit = 0x80 if mask else 0
+    if length < 126:
+        header = struct.pack("!BB", 0x80 | opcode, mask_bit | length)
+    elif length < 1 << 16:
+        header = struct.pack("!BBH", 0x80 | opcode, mask_bit | 126, length)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, mask_bit | 127, length)
+    if mask:
+        repeated = (mask * (length // 4 + 1))[:length]
+        data = (int.from_bytes(data, "big") ^ int.from_bytes(repeated, "big")).to_bytes(length, "big")
+        return header + mask + data
+    return header + data
+
+
+def raise_open_file_limit():
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+async def serve(host, port, engine, **options):
+    app = NutriBotServer(engine, **options)
+    server = await asyncio.start_server(app.handle_connection, host, port, limit=MAX_HEADER_BYTES, backlog=4096)
+    print(f"NutriBot listening on http://{host}:{port}")
+    # SIGTERM stops the server like Ctrl-C does, so queued profile writes are flushed on the way out
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        app.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve NutriBot over HTTP and WebSocket")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--food-db", help="memory-mapped food database built with `python food_db.py build`")
+    parser.add_argument("--data-dir", help="directory of data files to serve and watch (`python data_catalog.py export`)")
+    parser.add_argument("--reload-interval", type=float, default=RELOAD_INTERVAL, help="seconds between data file checks")
+    parser.add_argument("--max-inflight", type=int, default=64, help="engine calls running at once")
+    parser.add_argument("--max-queue", type=int, default=1024, help="waiting requests before answering 503")
+    parser.add_argument("--timeout", type=float, default=5.0, help="seconds before an engine call gets a 504")
+    parser.add_argument("--profile-db", default=DEFAULT_PATH, help="SQLite file profiles and water history are kept in")
+    parser.add_argument("--metrics", action="store_true", help="record latency histograms, served at /metrics")
+    parser.add_argument("--profile-slow-ms", type=float, help="dump stacks of requests slower than this (implies --metrics)")
+    parser.add_argument("--profile-path", default="slow_requests.folded", help="file the slow-request stacks go to")
+    args = parser.parse_args()
+
+    raise_open_file_limit()
+    METRICS.enabled = args.metrics or args.profile_slow_ms is not None
+    if args.profile_slow_ms is not None:
+        METRICS.profiler = SlowRequestProfiler(args.profile_path, threshold=args.profile_slow_ms / 1000)
+    if args.data_dir:
+        catalog = DataCatalog.from_directory(args.data_dir, args.food_db, interval=args.reload_interval)
+    else:
+        catalog = DataCatalog({"food_data": args.food_db}, interval=args.reload_interval)
+    # Build the spelling index before listening, not on the first message that needs it; reloads rebuild it
+    catalog.engine.fuzzy_index
+    if args.data_dir or args.food_db:
+        catalog.start()
+    os.makedirs(os.path.dirname(os.path.abspath(args.profile_db)), exist_ok=True)
+    store = SessionStore(ProfileStore(args.profile_db))
+    try:
+        asyncio.run(serve(args.host, args.port, catalog.engine, store=store,
+                          max_inflight=args.max_inflight, max_queue=args.max_queue, timeout=args.timeout,
+                          catalog=catalog))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Allergen matching on known ingredient lines, look-alikes included. Run from the repository root:
+
+    python -m pytest tests
+"""
+import pytest
+
+from allergens import ALLERGENS, ingredient_allergens, parse_allergies, recipe_matches
+from recipe_index import RecipeIndex
+
+LINES = {
+    "1 cup Greek yogurt": {"dairy"},
+    "1/2 tsp ground nutmeg": set(),
+    "1 cup almond milk": {"tree_nut"},
+    "1 cup unsweetened coconut milk": set(),
+    "2 tbsp peanut butter": {"peanut"},
+    "2 Eggs, beaten": {"egg"},
+    "1 eggplant, diced": set(),
+    "1 tsp cream of tartar": set(),
+    "30g dairy-free cheese": set(),
+    "1 tbsp vegan butter": set(),
+    "2 tbsp soy sauce": {"soy", "wheat", "gluten"},
+    "2 slices whole grain bread": {"wheat", "gluten"},
+    "1 cup buckwheat flour": set(),
+    "1/4 cup mixed nuts": {"peanut", "tree_nut"},
+    "2 tbsp pesto": {"dairy", "tree_nut"},
+    "100g shrimp": {"shellfish"},
+    "1 tbsp tahini": {"sesame"},
+}
+
+# (ingredients, allergy, whether the allergy rules the recipe out)
+VERDICTS = [
+    (["1/2 tsp nutmeg", "1 cup oats"], "nuts", False),
+    (["1 cup almond milk"], "nuts", True),
+    (["1 cup almond milk"], "dairy", False),
+    (["2 tbsp peanut butter"], "dairy", False),
+    (["1 cup greek yogurt"], "Dairy", True),
+    (["1 eggplant"], "eggs", False),
+    (["2 tbsp soy sauce"], "gluten", True),
+    (["100g prawns"], "seafood", True),
+    (["1 cup strawberries"], "strawberries", True),
+    (["1 cup strawberries"], "berry", False),
+    (["2 tbsp honey"], "honey", True),
+    (["1 cup sweet potato"], "sweet potato", True),
+    (["1 cup potato, 1 tbsp sweet chili"], "sweet potato", False),
+]
+
+PARSED = {
+    "nuts, dairy": ["nuts", "dairy"],
+    "nuts,dairy": ["nuts", "dairy"],
+    "Shellfish; eggs and soy": ["Shellfish", "eggs", "soy"],
+    "  ": [],
+}
+
+
+@pytest.mark.parametrize("line, expected", LINES.items())
+def test_ingredient_allergens(line, expected):
+    mask = ingredient_allergens(line)
+    assert {name for bit, name in enumerate(ALLERGENS) if mask >> bit & 1} == expected
+
+
+@pytest.mark.parametrize("ingredients, allergy, excluded", VERDICTS)
+def test_recipe_matches(ingredients, allergy, excluded):
+    assert recipe_matches(ingredients, allergy) == excluded
+
+
+@pytest.mark.parametrize("ingredients, allergy, excluded", VERDICTS)
+def test_recipe_index_filter(ingredients, allergy, excluded):
+    index = RecipeIndex([{"ingredients": ingredients, "diet_types": [], "meal_type": "lunch"}])
+    assert index.filter(allergies=[allergy]) == (0 if excluded else 1)
+
+
+@pytest.mark.parametrize("text, expected", PARSED.items())
+def test_parse_allergies(text, expected):
+    assert parse_allergies(text) == expected
@@ -0,0 +1,26 @@
+"""Reading cohort profiles from JSON lines. Run from the repository root:
+
+    python -m pytest tests
+"""
+import pytest
+
+from cohort_plans import read_profiles
+
+
+def test_read_profiles():
+    lines = ['{"id": "a", "goal": "Weight Loss", "preferences": ["vegan"]}\n', "\n", '{"allergies": ["nuts"]}\n']
+    (first_id, first), (second_id, second) = read_profiles(lines)
+    assert (first_id, first.goal, first.dietary_preferences) == ("a", "Weight Loss", ["vegan"])
+    # Without an id a profile is numbered by its line
+    assert (second_id, second.allergies) == (3, ["nuts"])
+
+
+@pytest.mark.parametrize("line, message", [
+    ("[1, 2]", "line 2: expected a JSON object, got list"),
+    ("42", "line 2: expected a JSON object, got int"),
+    ('"vegan"', "line 2: expected a JSON object, got str"),
+    ("{oops", "line 2: Expecting property name"),
+])
+def test_bad_lines_name_their_line(line, message):
+    with pytest.raises(ValueError, match=message):
+        list(read_profiles(['{"id": "a"}', line]))
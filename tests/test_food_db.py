@@ -0,0 +1,43 @@
+"""Food database sources: every format ends up with the lowercased names lookups use. Run from the repository root:
+
+    python -m pytest tests
+"""
+import json
+
+import pytest
+
+from food_db import FoodDatabase, read_source, write_database
+
+INFO = {"calories": 105, "protein": 1.3, "carbs": 27, "fat": 0.4, "fiber": 3.1, "category": "fruit"}
+
+
+def write_json_dict(path):
+    path = path / "foods.json"
+    path.write_text(json.dumps({"Banana": INFO, " Salmon ": INFO}))
+    return path
+
+
+def write_json_records(path):
+    path = path / "foods.json"
+    path.write_text(json.dumps([dict(INFO, name="Banana"), dict(INFO, name=" Salmon ")]))
+    return path
+
+
+def write_csv(path):
+    path = path / "foods.csv"
+    columns = ["name", *INFO]
+    rows = [",".join(columns)] + [",".join([name, *map(str, INFO.values())]) for name in ("Banana", " Salmon ")]
+    path.write_text("\n".join(rows) + "\n")
+    return path
+
+
+@pytest.mark.parametrize("write", [write_json_dict, write_json_records, write_csv])
+def test_names_are_lowercased(write, tmp_path):
+    foods = read_source(str(write(tmp_path)))
+    assert sorted(foods) == ["banana", "salmon"]
+
+    path = str(tmp_path / "foods.nfdb")
+    write_database(foods, path)
+    database = FoodDatabase.open(path)
+    assert "banana" in database and "salmon" in database
+    assert database["banana"]["calories"] == 105
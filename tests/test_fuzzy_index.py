@@ -0,0 +1,60 @@
+"""Spelling correction of food and nutrient names, and the real words it must leave alone. Run from the repository root:
+
+    python -m pytest tests
+"""
+import pytest
+
+from fuzzy_index import FuzzyIndex, edit_distance
+from nutribot_engine import NutriBot, UserProfile
+
+BOT = NutriBot()
+INDEX = FuzzyIndex(["fat", "oats", "eggs", "protein", "fiber", "calcium", "chicken breast"])
+
+
+@pytest.mark.parametrize("a, b, expected", [
+    ("protien", "protein", 1),
+    ("fate", "fat", 1),
+    ("eggz", "eggs", 1),
+    ("oath", "oats", 1),
+    ("kitten", "sitting", 3),
+    ("ca", "abc", 3),
+])
+def test_edit_distance(a, b, expected):
+    assert edit_distance(a, b) == expected
+
+
+@pytest.mark.parametrize("word, key", [
+    ("protien", "protein"),
+    ("fibre", "fiber"),
+    ("calcuim", "calcium"),
+    ("eggz", "eggs"),
+])
+def test_typos_are_corrected(word, key):
+    assert INDEX.best_word(word).key == key
+
+
+# Everyday short words that share enough trigrams with a key to pass the threshold
+@pytest.mark.parametrize("word", ["fate", "oath"])
+def test_real_words_are_kept(word):
+    assert INDEX.best(word) is not None
+    assert INDEX.best_word(word) is None
+
+
+def test_phrases_still_match():
+    span = INDEX.find_in("is chiken breast good")
+    assert (span.key, span.start, span.end) == ("chicken breast", 3, 16)
+
+
+@pytest.mark.parametrize("message, fact", [
+    ("what is protien", "Protein"),
+    ("what is fat", "Fat"),
+    ("tell me about fats", "Fat"),
+])
+def test_nutrient_facts(message, fact):
+    assert BOT.respond(message, UserProfile()).startswith(f"**{fact}**")
+
+
+@pytest.mark.parametrize("message", ["what is fate", "what is the environment"])
+def test_names_inside_words_are_not_nutrients(message):
+    assert BOT.route_message(message)[1].intent == "fallback"
+    assert "**Fat**" not in BOT.respond(message, UserProfile())
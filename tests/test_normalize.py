@@ -0,0 +1,47 @@
+"""Singular and plural forms, and the modules that fold words with them. Run from the repository root:
+
+    python -m pytest tests
+"""
+import pytest
+
+from allergens import words
+from normalize import plural, singular
+from recipe_nutrients import resolve_food
+from semantic_index import stem
+
+FORMS = [
+    ("berries", "berry"),
+    ("peaches", "peach"),
+    ("dishes", "dish"),
+    ("boxes", "box"),
+    ("tomatoes", "tomato"),
+    ("eggs", "egg"),
+    ("almonds", "almond"),
+    ("glasses", "glass"),
+]
+
+# Words that end like a plural but are not one
+UNCHANGED = ["hummus", "asparagus", "grass", "tahini", "couscous", "focus", "gas"]
+
+
+@pytest.mark.parametrize("word, expected", FORMS)
+def test_singular(word, expected):
+    assert singular(word) == expected
+
+
+@pytest.mark.parametrize("word, expected", FORMS)
+def test_plural_inverts_singular(word, expected):
+    assert plural(expected) == word
+
+
+@pytest.mark.parametrize("word", UNCHANGED)
+def test_singular_leaves_look_alikes(word):
+    assert singular(word) == word
+
+
+@pytest.mark.parametrize("word, expected", FORMS + [(word, word) for word in UNCHANGED])
+def test_modules_fold_alike(word, expected):
+    assert words(word) == [expected]
+    assert stem(word) == expected
+    assert resolve_food(word, {expected: {}}) == expected
+    assert resolve_food(expected, {word: {}}) == word
@@ -0,0 +1,31 @@
+"""Batch replies from NutriBot.respond_many. Run from the repository root:
+
+    python -m pytest tests
+"""
+import pytest
+
+from nutribot_engine import NutriBot, UserProfile, WaterTracker
+
+BOT = NutriBot()
+QUERIES = ["tell me about iron", "log water", "log water"]
+
+
+def test_one_reply_per_query():
+    replies = BOT.respond_many(QUERIES, UserProfile())
+    assert len(replies) == len(QUERIES)
+    assert replies == [BOT.respond(query, UserProfile()) for query in QUERIES]
+
+
+def test_single_tracker_is_shared():
+    tracker = WaterTracker()
+    BOT.respond_many(QUERIES, UserProfile(), tracker)
+    assert tracker.glasses == 2
+
+
+@pytest.mark.parametrize("profiles, trackers", [
+    ([UserProfile()] * 2, None),
+    (UserProfile(), [WaterTracker()] * 4),
+])
+def test_length_mismatch_raises(profiles, trackers):
+    with pytest.raises(ValueError, match="3 queries"):
+        BOT.respond_many(QUERIES, profiles, trackers)
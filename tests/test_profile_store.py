@@ -0,0 +1,100 @@
+"""ProfileStore: coalesced writes, day rollover and history, and surviving a failed flush. Run from the repository root:
+
+    python -m pytest tests
+"""
+import sqlite3
+import time
+
+import pytest
+
+from nutribot_engine import UserProfile
+from profile_store import ProfileStore
+
+
+class Today:
+    def __init__(self, day):
+        self.day = day
+
+    def __call__(self):
+        return self.day
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "users.db")
+
+
+def test_writes_wait_for_flush_and_survive_reopening(path):
+    store = ProfileStore(path, flush_interval=0)
+    store.save_profile("u1", UserProfile(name="Sam"))
+    store.save_profile("u1", UserProfile(name="Sam", goal="Weight Loss"))
+    for _ in range(3):
+        store.tracker("u1").add_glass()
+    assert store.get_profile("u1").goal == "Weight Loss"
+    assert sqlite3.connect(path).execute("SELECT COUNT(*) FROM profiles").fetchone() == (0,)
+
+    # Two saves of one profile and three glasses on one day are one row each
+    assert store.flush() == 2
+    assert store.flush() == 0
+    store.close()
+
+    reopened = ProfileStore(path, flush_interval=0)
+    assert reopened.get_profile("u1") == UserProfile(name="Sam", goal="Weight Loss")
+    assert reopened.get_profile("nobody") is None
+    assert reopened.glasses("u1") == 3
+    reopened.close()
+
+
+def test_glasses_restart_at_zero_on_a_new_day(path):
+    today = Today("2024-05-01")
+    store = ProfileStore(path, flush_interval=0, today=today)
+    tracker = store.tracker("u1")
+    tracker.add_glass()
+    tracker.add_glass()
+    store.flush()
+    today.day = "2024-05-02"
+    assert (tracker.today, tracker.glasses) == ("2024-05-02", 0)
+    assert tracker.add_glass() == 1
+    assert store.history("u1") == [("2024-05-02", 1), ("2024-05-01", 2)]
+    # Days that fall out of the window leave the history
+    today.day = "2024-05-08"
+    assert store.history("u1") == [("2024-05-02", 1)]
+    store.close()
+
+
+def test_history_counts_unflushed_days(path):
+    today = Today("2024-05-01")
+    store = ProfileStore(path, flush_interval=0, today=today)
+    store.add_glass("u1")
+    today.day = "2024-05-02"
+    assert store.history("u1") == [("2024-05-01", 1)]
+    store.close()
+
+
+def test_full_queue_flushes_at_once(path):
+    store = ProfileStore(path, flush_interval=0, max_pending=3)
+    for user in ("a", "b", "c"):
+        store.save_profile(user, UserProfile(name=user))
+    assert (store.flushes, store.rows_written) == (1, 3)
+    store.close()
+
+
+def test_background_flush_keeps_running_after_a_failure(path):
+    store = ProfileStore(path, flush_interval=0.05)
+    blocker = sqlite3.connect(path)
+    blocker.execute("BEGIN EXCLUSIVE")
+    store._writer.execute("PRAGMA busy_timeout = 0")
+    store.add_glass("u1")
+    deadline = time.monotonic() + 5
+    while not store.failed_flushes and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert store.failed_flushes and "locked" in store.last_error
+    assert store.glasses("u1") == 1
+
+    blocker.rollback()
+    deadline = time.monotonic() + 5
+    while not store.flushes and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert store.rows_written == 1
+    store.close()
+    assert sqlite3.connect(path).execute("SELECT glasses FROM water").fetchall() == [(1,)]
@@ -0,0 +1,50 @@
+"""RecipeBrowser pages against a scan of the whole catalog, and cursors carried through chat. Run from the repository root:
+
+    python -m pytest tests
+"""
+import pytest
+
+from nutribot_engine import load_food_data, load_recipes
+from recipe_browser import Query, RecipeBrowser, encode_cursor, parse_query
+from recipe_index import RecipeIndex
+from recipe_nutrients import RecipeNutrients
+from benchmarks.bench_recipe_browser import QUERIES, all_pages, naive
+from benchmarks.synthetic import synthetic_recipes
+
+RECIPES = load_recipes() + synthetic_recipes(2000, seed=1)
+BROWSER = RecipeBrowser(RecipeIndex(RECIPES), RecipeNutrients(RECIPES, load_food_data()))
+
+
+@pytest.mark.parametrize("limit", [1, 7, 50])
+@pytest.mark.parametrize("name", list(QUERIES))
+def test_pages_follow_the_full_scan(name, limit):
+    query = QUERIES[name]
+    expected = naive(RECIPES, BROWSER.values, query)
+    assert all_pages(BROWSER, query, limit) == expected
+    assert BROWSER.search(query, limit=limit).total == len(expected)
+
+
+def test_cursor_resumes_after_the_page():
+    query = Query(sort="protein", descending=True)
+    first = BROWSER.search(query, limit=10)
+    second = BROWSER.search(query, first.next_cursor, limit=10)
+    assert first.ids + second.ids == BROWSER.search(query, limit=20).ids
+
+
+def test_cursor_round_trips_through_a_message():
+    query = Query(diets=("vegan",), meal_type="dinner", sort="protein", descending=True)
+    page = BROWSER.search(query, limit=5)
+    parsed, cursor = parse_query(f"browse vegan dinner recipes by most protein after {page.next_cursor}")
+    assert (parsed, cursor) == (query, page.next_cursor)
+    assert BROWSER.search(parsed, cursor, limit=5).ids == naive(RECIPES, BROWSER.values, query)[5:10]
+
+
+def test_cursor_for_another_order_is_rejected():
+    with pytest.raises(ValueError, match="another sort order"):
+        BROWSER.search(Query(sort="fat"), encode_cursor(Query(sort="protein"), 3))
+
+
+def test_last_page_has_no_cursor():
+    query = QUERIES["narrow: paleo breakfast, 3 excl."]
+    total = BROWSER.search(query).total
+    assert BROWSER.search(query, limit=total + 1).next_cursor is None
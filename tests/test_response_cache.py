@@ -0,0 +1,69 @@
+"""ResponseCache eviction by size and expiry by age. Run from the repository root:
+
+    python -m pytest tests
+"""
+from nutribot_engine import UserProfile
+from response_cache import ResponseCache, _entry_size, response_cache_key
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def key(text):
+    return response_cache_key(text, UserProfile())
+
+
+def test_least_recently_used_is_evicted():
+    size = _entry_size(key("a"), "x" * 100)
+    cache = ResponseCache(max_bytes=size * 2)
+    cache.put(key("a"), "x" * 100)
+    cache.put(key("b"), "x" * 100)
+    assert cache.get(key("a")) is not None  # "b" is now the oldest
+    cache.put(key("c"), "x" * 100)
+    assert cache.get(key("b")) is None
+    assert cache.get(key("a")) is not None and cache.get(key("c")) is not None
+    assert (len(cache), cache.evictions) == (2, 1)
+    assert cache.bytes <= cache.max_bytes
+
+
+def test_oversized_entry_is_not_stored():
+    cache = ResponseCache(max_bytes=1000)
+    cache.put(key("a"), "x" * 2000)
+    assert len(cache) == 0 and cache.bytes == 0
+
+
+def test_replacing_an_entry_keeps_the_byte_count():
+    cache = ResponseCache()
+    cache.put(key("a"), "short")
+    cache.put(key("a"), "a longer reply")
+    assert cache.get(key("a")) == "a longer reply"
+    assert cache.bytes == _entry_size(key("a"), "a longer reply")
+
+
+def test_entries_expire_after_ttl():
+    clock = Clock()
+    cache = ResponseCache(ttl=60, clock=clock)
+    cache.put(key("a"), "reply")
+    clock.now = 60
+    assert cache.get(key("a")) == "reply"
+    clock.now = 61
+    assert cache.get(key("a")) is None
+    assert (len(cache), cache.bytes, cache.expirations) == (0, 0, 1)
+
+
+def test_no_ttl_never_expires():
+    clock = Clock()
+    cache = ResponseCache(ttl=None, clock=clock)
+    cache.put(key("a"), "reply")
+    clock.now = 10 ** 9
+    assert cache.get(key("a")) == "reply"
+
+
+def test_profile_fields_are_part_of_the_key():
+    assert response_cache_key("Iron ", UserProfile(goal="Weight Loss")) != response_cache_key("Iron", UserProfile())
+    assert response_cache_key("iron ", UserProfile(name="Sam")) == response_cache_key("iron", UserProfile())
@@ -0,0 +1,44 @@
+"""Which unmatched messages the semantic fallback answers, and which get the help text. Run from the repository root:
+
+    python -m pytest tests
+"""
+import pytest
+
+from nutribot_engine import NutriBot, UserProfile
+from semantic_index import tokenize
+
+BOT = NutriBot()
+
+HELP_TEXT = "I'm your nutrition advisor."
+
+# Small talk with no topic word: the baseline's help text, not a guess
+FALLS_BACK = ["help", "can you help me", "lets eat", "let's eat", "is pizza healthy", "what should i eat today"]
+
+# Questions with a topic word the index knows, and the fact they should get
+MATCHES = [
+    ("what helps my bones?", "calcium"),
+    ("food for strong bones", "calcium"),
+    ("foods with iron", "iron"),
+    ("gut health", "probiotics"),
+    ("muscle building food", "protein"),
+]
+
+
+@pytest.mark.parametrize("message", FALLS_BACK)
+def test_small_talk_falls_back(message):
+    assert BOT.semantic_match(message) is None
+    assert BOT.respond(message, UserProfile()).startswith(HELP_TEXT)
+
+
+@pytest.mark.parametrize("message, fact", MATCHES)
+def test_topic_matches(message, fact):
+    hit = BOT.semantic_match(message)
+    assert (hit.kind, hit.key) == ("fact", fact)
+
+
+def test_fallback_answers_with_the_fact():
+    assert "**Calcium**" in BOT.respond("what helps my bones?", UserProfile())
+
+
+def test_contractions_leave_no_terms():
+    assert tokenize("let's eat, I'm hungry") == ["hungry"]
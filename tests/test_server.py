@@ -0,0 +1,168 @@
+"""Server backpressure (503), timeouts (504), oversized requests (413, WebSocket 1009) and shared profiles.
+
+Each test runs the server on an ephemeral port inside asyncio.run. Run from
+the repository root:
+
+    python -m pytest tests
+"""
+import asyncio
+import json
+import struct
+import time
+
+import pytest
+
+from nutribot_engine import NutriBot
+from profile_store import ProfileStore
+from server import (CLOSE_TOO_BIG, MAX_BODY_BYTES, HTTPError, NutriBotServer, SessionStore, encode_frame,
+                    read_frame)
+
+ENGINE = NutriBot()
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    apps = []
+
+    def make(**options):
+        app = NutriBotServer(ENGINE, SessionStore(ProfileStore(str(tmp_path / "users.db"), flush_interval=0)),
+                             **options)
+        apps.append(app)
+        return app
+
+    yield make
+    for app in apps:
+        app.close()
+
+
+async def status_of(call):
+    try:
+        await call
+        return 200
+    except HTTPError as error:
+        return error.status
+
+
+async def serving(app, client):
+    server = await asyncio.start_server(app.handle_connection, "127.0.0.1", 0)
+    async with server:
+        reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+        try:
+            return await client(reader, writer)
+        finally:
+            writer.close()
+
+
+async def request(reader, writer, method, path, body=b"", headers=""):
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: test\r\nContent-Length: {len(body)}\r\n{headers}\r\n".encode()
+                 + body)
+    head = await reader.readuntil(b"\r\n\r\n")
+    length = int(head.lower().split(b"content-length:")[1].split(b"\r\n")[0])
+    return int(head.split(b" ", 2)[1]), json.loads(await reader.readexactly(length))
+
+
+def test_full_queue_answers_503(make_app):
+    app = make_app(max_inflight=1, max_queue=1, timeout=5)
+
+    async def run():
+        running = asyncio.ensure_future(app.call_engine("a", time.sleep, 0.3))
+        await asyncio.sleep(0.05)
+        waiting = asyncio.ensure_future(app.call_engine("b", time.sleep, 0))
+        await asyncio.sleep(0.05)
+        rejected = await status_of(app.call_engine("c", time.sleep, 0))
+        return rejected, await status_of(running), await status_of(waiting)
+
+    assert asyncio.run(run()) == (503, 200, 200)
+
+
+def test_slow_call_answers_504(make_app):
+    app = make_app(timeout=0.1)
+    start = time.perf_counter()
+    assert asyncio.run(status_of(app.call_engine("a", time.sleep, 0.5))) == 504
+    assert time.perf_counter() - start < 0.4
+
+
+@pytest.mark.parametrize("second_user", ["a", "b"])
+def test_time_spent_waiting_counts_towards_the_timeout(make_app, second_user):
+    # "a" holds both its own lock and the only slot, so a second call waits for one or the other
+    app = make_app(max_inflight=1, timeout=0.2)
+
+    async def run():
+        first = asyncio.ensure_future(app.call_engine("a", time.sleep, 0.6))
+        await asyncio.sleep(0.05)
+        start = time.perf_counter()
+        second = await status_of(app.call_engine(second_user, time.sleep, 0))
+        return second, time.perf_counter() - start, await status_of(first)
+
+    second, waited, first = asyncio.run(run())
+    assert (second, first) == (504, 504)
+    assert waited < 0.5
+
+
+def test_oversized_body_answers_413(make_app):
+    async def client(reader, writer):
+        writer.write(f"POST /chat HTTP/1.1\r\nContent-Length: {MAX_BODY_BYTES + 1}\r\n\r\n".encode())
+        head = await reader.readuntil(b"\r\n\r\n")
+        return int(head.split(b" ", 2)[1])
+
+    assert asyncio.run(serving(make_app(), client)) == 413
+
+
+def test_oversized_websocket_frame_closes_with_1009(make_app):
+    async def client(reader, writer):
+        writer.write(b"GET /ws?user_id=a HTTP/1.1\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                     b"Sec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==\r\n\r\n")
+        head = await reader.readuntil(b"\r\n\r\n")
+        chat = json.dumps({"type": "chat", "message": "tell me about iron"}).encode()
+        writer.write(encode_frame(0x1, chat, mask=b"abcd"))
+        _, reply = await read_frame(reader)
+        writer.write(struct.pack("!BBQ", 0x81, 0x80 | 127, MAX_BODY_BYTES + 1) + b"abcd")
+        opcode, data = await read_frame(reader)
+        return head.split(b" ", 2)[1], json.loads(reply), opcode, struct.unpack("!H", data[:2])[0], await reader.read()
+
+    status, reply, opcode, code, rest = asyncio.run(serving(make_app(), client))
+    assert status == b"101" and "Iron" in reply["response"]
+    assert (opcode, code, rest) == (0x8, CLOSE_TOO_BIG, b"")
+
+
+def test_profiles_and_water_persist_in_the_store(make_app, tmp_path):
+    app = make_app()
+
+    async def client(reader, writer):
+        await request(reader, writer, "PUT", "/profile/sam", json.dumps({"name": "Sam", "goal": "Weight Loss"}).encode())
+        for _ in range(2):
+            await request(reader, writer, "POST", "/chat", json.dumps({"user_id": "sam", "message": "log water"}).encode())
+        return await request(reader, writer, "GET", "/profile/sam")
+
+    status, body = asyncio.run(serving(app, client))
+    assert status == 200 and body["profile"]["goal"] == "Weight Loss" and body["water_tracker"]["glasses"] == 2
+
+    app.close()
+    reopened = ProfileStore(str(tmp_path / "users.db"), flush_interval=0)
+    assert (reopened.get_profile("sam").name, reopened.glasses("sam")) == ("Sam", 2)
+    reopened.close()
+
+
+def test_idle_locks_are_dropped_but_not_profiles(make_app):
+    app = make_app()
+    app.store.max_locks = 2
+
+    async def run():
+        for user in ("a", "b", "c"):
+            await app.call_engine(user, app.store.profiles.add_glass, user)
+
+    asyncio.run(run())
+    assert len(app.store) == 2
+    assert [app.store.get(user)[1].glasses for user in ("a", "b", "c")] == [1, 1, 1]
+
+
+@pytest.mark.parametrize("payload, status", [
+    ({"name": 3}, 400),
+    ({"allergies": "nuts"}, 400),
+    ({"allergies": ["nuts"], "unknown": 1}, 200),
+])
+def test_profile_fields_are_checked(make_app, payload, status):
+    async def client(reader, writer):
+        return (await request(reader, writer, "PUT", "/profile/a", json.dumps(payload).encode()))[0]
+
+    assert asyncio.run(serving(make_app(), client)) == status